@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Microbenchmarks for :class:`funimationlater.utils.CaseInsensitiveDict`
+against the original implementation that stored `(key, value)` tuples.
+
+Usage::
+
+    python benchmarks/case_insensitive_dict.py --number 100000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from funimationlater._compat import MutableMapping, Mapping  # noqa: E402
+from funimationlater.utils import CaseInsensitiveDict  # noqa: E402
+
+
+class LegacyCaseInsensitiveDict(MutableMapping):
+    def __init__(self, data=None, **kwargs):
+        self._store = {}
+        if data is None:
+            data = {}
+        self.update(data, **kwargs)
+
+    def __setitem__(self, key, value):
+        self._store[key.lower()] = (key, value)
+
+    def __getitem__(self, key):
+        return self._store[key.lower()][1]
+
+    def __len__(self):
+        return len(self._store)
+
+    def __iter__(self):
+        return (k for k, _ in self._store.values())
+
+    def __delitem__(self, key):
+        del self._store[key.lower()]
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            other = LegacyCaseInsensitiveDict(other)
+        else:
+            raise NotImplementedError
+        return dict(self.lower_items()) == dict(other.lower_items())
+
+    def lower_items(self):
+        return ((k, v) for k, v in self._store.items())
+
+    def copy(self):
+        return LegacyCaseInsensitiveDict(self._store.values())
+
+
+DATA = {'player': 1, 'Authorization': 2, 'Content-Type': 3}
+DATA.update(('Key{}'.format(i), i) for i in range(20))
+
+CASES = [
+    ('init', lambda cls, d: cls(DATA)),
+    ('get lowercase', lambda cls, d: d['player']),
+    ('get mixed case', lambda cls, d: d['Authorization']),
+    ('contains', lambda cls, d: 'content-type' in d),
+    ('eq', lambda cls, d: d == DATA),
+    ('copy', lambda cls, d: d.copy()),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--number', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('{:<16} {:>12} {:>12} {:>8}'.format('case', 'legacy ns', 'new ns',
+                                              'speedup'))
+    for name, func in CASES:
+        times = []
+        for cls in (LegacyCaseInsensitiveDict, CaseInsensitiveDict):
+            d = cls(DATA)
+            times.append(min(timeit.repeat(
+                lambda: func(cls, d), repeat=args.repeat,
+                number=args.number)) / args.number * 1e9)
+        print('{:<16} {:12.0f} {:12.0f} {:7.2f}x'.format(
+            name, times[0], times[1], times[0] / times[1]))
+
+
+if __name__ == '__main__':
+    main()
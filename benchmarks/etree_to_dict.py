@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Compare :func:`funimationlater.utils.etree_to_dict` with the original
+recursive implementation on the recorded responses in `test/resources`.
+
+Usage::
+
+    python benchmarks/etree_to_dict.py --repeat 5 --number 20
+"""
+from __future__ import print_function
+
+import argparse
+import collections
+import os
+import sys
+import timeit
+import xml.etree.ElementTree as Et
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from funimationlater._compat import iteritems  # noqa: E402
+from funimationlater.utils import etree_to_dict  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), os.pardir, 'test',
+                         'resources')
+
+
+def legacy_etree_to_dict(t):
+    attrib = t.attrib
+    tag = t.tag
+    d = {tag: {} if attrib else None}
+    children = list(t)
+    if children:
+        dd = collections.defaultdict(list)
+        for dc in map(legacy_etree_to_dict, children):
+            for k, v in iteritems(dc):
+                dd[k].append(v)
+        d = {tag: {k: v[0] if len(v) == 1 else v for k, v in iteritems(dd)}}
+    if attrib:
+        d[tag].update({'@' + k: v for k, v in iteritems(attrib)})
+    text = t.text.strip() if t.text else ''
+    if text:
+        if children or attrib:
+            d[tag]['#text'] = text
+        else:
+            d[tag] = text
+    return d
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    for name in sorted(os.listdir(RESOURCES)):
+        if not name.endswith('.xml'):
+            continue
+        root = Et.parse(os.path.join(RESOURCES, name)).getroot()
+        assert etree_to_dict(root) == legacy_etree_to_dict(root)
+        times = {}
+        for func in (legacy_etree_to_dict, etree_to_dict):
+            times[func] = min(timeit.repeat(
+                lambda: func(root), repeat=args.repeat,
+                number=args.number)) / args.number
+        print('{:<20} legacy {:8.3f} ms  new {:8.3f} ms  {:5.2f}x'.format(
+            name, times[legacy_etree_to_dict] * 1000,
+            times[etree_to_dict] * 1000,
+            times[legacy_etree_to_dict] / times[etree_to_dict]))
+
+
+if __name__ == '__main__':
+    main()
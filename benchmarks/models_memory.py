@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Compare the memory used by the models with and without the parsed
+responses retained.
+
+Builds a synthetic catalog from the recorded responses in `test/resources`,
+every show gets `--episodes` episodes, and reports the memory still
+allocated once the catalog is built.
+
+Usage::
+
+    python benchmarks/models_memory.py --shows 5000 --episodes 24
+
+Requires Python 3.4+ for :mod:`tracemalloc`.
+"""
+from __future__ import print_function
+
+import argparse
+import copy
+import gc
+import os
+import sys
+import tracemalloc
+import xml.etree.ElementTree as Et
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from funimationlater.models import Media, Show, Episode  # noqa: E402
+from funimationlater.utils import etree_to_dict  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), os.pardir, 'test',
+                         'resources')
+
+
+def load_item(name, index=0):
+    root = Et.parse(os.path.join(RESOURCES, name)).getroot()
+    return etree_to_dict(root.findall('.//item')[index])['item']
+
+
+def build_catalog(show, episode, shows, episodes):
+    catalog = []
+    for show_id in range(shows):
+        data = copy.deepcopy(show)
+        data['id'] = str(show_id)
+        catalog.append(Show(data, None))
+        for number in range(episodes):
+            data = copy.deepcopy(episode)
+            data['content']['metadata']['episodeNumber'] = str(number)
+            catalog.append(Episode(data, None))
+    return catalog
+
+
+def measure(retain, show, episode, shows, episodes):
+    Media.retain_data = retain
+    gc.collect()
+    tracemalloc.start()
+    catalog = build_catalog(show, episode, shows, episodes)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del catalog
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--shows', type=int, default=2000)
+    parser.add_argument('--episodes', type=int, default=12)
+    args = parser.parse_args()
+
+    show = load_item('all_shows.xml')
+    episode = load_item('season.xml')
+    objects = args.shows * (1 + args.episodes)
+    results = {}
+    for retain in (True, False):
+        results[retain] = measure(retain, show, episode, args.shows,
+                                  args.episodes)
+        print('{:<14} {:>10.1f} MiB {:>8.0f} bytes/model'.format(
+            'retain_data' if retain else 'compact',
+            results[retain] / 1024.0 / 1024, results[retain] / objects))
+    print('compact uses {:.1%} of the memory'.format(
+        float(results[False]) / results[True]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Compare building models from the full `etree_to_dict` conversion with
+extracting only the paths in their schema.
+
+`convert` times turning already parsed elements into models, `stream`
+includes parsing the response with the streaming handler.
+
+Usage::
+
+    python benchmarks/parse_models.py --copies 50
+
+`--copies` repeats the items of the recorded responses to make a larger
+response.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import sys
+import timeit
+import xml.etree.ElementTree as Et
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from funimationlater.models import Show, Episode  # noqa: E402
+from funimationlater.response_handler import StreamingXMLResponse  # noqa
+from funimationlater.utils import etree_to_dict  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), os.pardir, 'test',
+                         'resources')
+
+
+def load(name, copies):
+    with open(os.path.join(RESOURCES, name), 'rb') as fp:
+        xml = fp.read()
+    items = b''.join(re.findall(b'<item>.*?</item>', xml, re.S))
+    return b'<longlist><items>' + items * copies + b'</items></longlist>'
+
+
+def stream(model, handler, xml):
+    return [model(item, None) for item in handler(xml, None).handle()]
+
+
+def convert(model, elements, extract):
+    return [model(extract(elem), None) for elem in elements]
+
+
+def etree_item(elem):
+    return etree_to_dict(elem)['item']
+
+
+def best(func, repeat):
+    return min(timeit.repeat(func, repeat=repeat, number=1)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--copies', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:<8} {:<7} {:>12} {:>12}'.format('model', 'mode', 'convert ms',
+                                             'stream ms'))
+    for model, name in ((Show, 'all_shows.xml'), (Episode, 'season.xml')):
+        xml = load(name, args.copies)
+        elements = list(Et.fromstring(xml).find('items'))
+        modes = (('dict', etree_item, StreamingXMLResponse),
+                 ('schema', model.schema.extract, model.schema.handler(True)))
+        for mode, extract, handler in modes:
+            print('{:<8} {:<7} {:12.2f} {:12.2f}'.format(
+                model.__name__, mode,
+                best(lambda: convert(model, elements, extract), args.repeat),
+                best(lambda: stream(model, handler, xml), args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Query latency of :class:`funimationlater.index.CatalogIndex` on a
+synthetic catalog, and how long saving and loading it takes.
+
+Usage::
+
+    python benchmarks/search_index.py --shows 5000
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from funimationlater.index import CatalogIndex  # noqa: E402
+
+QUERIES = ['a', 'at', 'attack on t', 'pokemon', 'zzqx']
+
+
+def make_title(rng):
+    words = [''.join(rng.choice(string.ascii_lowercase)
+                     for _ in range(rng.randint(2, 9)))
+             for _ in range(rng.randint(1, 5))]
+    return ' '.join(words).title()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--shows', type=int, default=5000)
+    parser.add_argument('--number', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = CatalogIndex()
+    start = time.time()
+    for show_id in range(args.shows):
+        index.add(show_id, make_title(rng), show_id)
+    index.add(args.shows, u'Attack on Titan', args.shows)
+    index.add(args.shows + 1, u'Pokémon: XY', args.shows)
+    print('build {:.1f} ms'.format((time.time() - start) * 1e3))
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        start = time.time()
+        index.save(path)
+        print('save  {:.1f} ms'.format((time.time() - start) * 1e3))
+        start = time.time()
+        CatalogIndex.load(path)
+        print('load  {:.1f} ms'.format((time.time() - start) * 1e3))
+    finally:
+        os.remove(path)
+
+    # the n-gram index is built by the first fuzzy query
+    index.search('zzqx')
+    print('{:<16} {:>10}'.format('query', 'us'))
+    for query in QUERIES:
+        seconds = min(timeit.repeat(lambda: index.search(query, 10),
+                                    repeat=3, number=args.number))
+        print('{:<16} {:10.1f}'.format(query, seconds / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Compare sharing the catalog as a pickle of the models with a
+:mod:`funimationlater.snapshot` file.
+
+Builds a synthetic catalog from the recorded responses in `test/resources`,
+every show gets one season of `--episodes` episodes, and reports the file
+sizes and how long it takes to write and load each one.
+
+Usage::
+
+    python benchmarks/snapshot.py --shows 5000 --episodes 24
+"""
+from __future__ import print_function
+
+import argparse
+import copy
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from funimationlater.models import (Episode, Season, Show,  # noqa: E402
+                                    parse_items)
+from funimationlater.snapshot import Snapshot, SnapshotWriter  # noqa: E402
+
+RESOURCES = os.path.join(os.path.dirname(__file__), os.pardir, 'test',
+                         'resources')
+
+
+def read(name):
+    with open(os.path.join(RESOURCES, name), 'rb') as fp:
+        return fp.read()
+
+
+def build_catalog(shows, episodes):
+    show = parse_items(read('all_shows.xml'), Show)[0]
+    episode = parse_items(read('season.xml'), Episode)[0]
+    catalog = []
+    for show_id in range(shows):
+        item = copy.copy(show)
+        item.id = show_id
+        item.title = 'Show {}'.format(show_id)
+        season = Season({'item': []}, None, 'Season 1', 1)
+        season._episodes = []
+        for number in range(episodes):
+            ep = copy.copy(episode)
+            ep.title = 'Episode {}'.format(number)
+            ep.episode_number = float(number)
+            season._episodes.append(ep)
+        catalog.append((item, [season]))
+    return catalog
+
+
+def timed(func):
+    start = time.time()
+    result = func()
+    return result, (time.time() - start) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--shows', type=int, default=5000)
+    parser.add_argument('--episodes', type=int, default=24)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.shows, args.episodes)
+    tmp = tempfile.mkdtemp()
+    pickle_path = os.path.join(tmp, 'catalog.pickle')
+    snapshot_path = os.path.join(tmp, 'catalog.snap')
+    try:
+        def write_pickle():
+            with open(pickle_path, 'wb') as fp:
+                pickle.dump(catalog, fp, pickle.HIGHEST_PROTOCOL)
+
+        def write_snapshot():
+            writer = SnapshotWriter()
+            for show, seasons in catalog:
+                writer.add(show, seasons)
+            writer.write(snapshot_path)
+
+        def load_pickle():
+            with open(pickle_path, 'rb') as fp:
+                return pickle.load(fp)
+
+        _, pickle_write = timed(write_pickle)
+        _, snapshot_write = timed(write_snapshot)
+        _, pickle_load = timed(load_pickle)
+        snapshot, snapshot_load = timed(lambda: Snapshot.open(snapshot_path))
+        _, lookup = timed(lambda: [snapshot.show(i).seasons[0].episodes[-1]
+                                   .title for i in range(args.shows)])
+        snapshot.close()
+        print('{:<10} {:>10} {:>10} {:>10}'.format(
+            'format', 'KiB', 'write ms', 'load ms'))
+        for name, path, write, load in [
+                ('pickle', pickle_path, pickle_write, pickle_load),
+                ('snapshot', snapshot_path, snapshot_write, snapshot_load)]:
+            print('{:<10} {:10.0f} {:10.1f} {:10.1f}'.format(
+                name, os.path.getsize(path) / 1024.0, write, load))
+        print('snapshot: last episode of every show in {:.1f} ms'.format(
+            lookup))
+    finally:
+        for path in (pickle_path, snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,43 @@
 # -*- coding: utf-8 -*-
 # noinspection PyUnresolvedReferences
 import logging
+import sys
 # noinspection PyUnresolvedReferences
 from .error import *
 # noinspection PyUnresolvedReferences
 from .models import (Show, ShowDetails, Season, Episode,
                      EpisodeDetails, EpisodeContainer)
-from .funimationlater import FunimationLater
+from .funimationlater import FunimationLater, BulkResult
 # noinspection PyUnresolvedReferences
 from .constants import ShowTypes
 # noinspection PyUnresolvedReferences
-from .httpclient import HTTPClientBase
+from .httpclient import HTTPClientBase, HTTPClient, PooledHTTPClient
 # noinspection PyUnresolvedReferences
 from .response_handler import ResponseHandler
+# noinspection PyUnresolvedReferences
+from .cache import ResponseCache, SQLiteStore
+# noinspection PyUnresolvedReferences
+from .singleflight import SingleFlight
+# noinspection PyUnresolvedReferences
+from .throttle import Throttle
+# noinspection PyUnresolvedReferences
+from .retry import RetryPolicy
+# noinspection PyUnresolvedReferences
+from .timeouts import Timeout, deadline
+# noinspection PyUnresolvedReferences
+from .index import CatalogIndex
+# noinspection PyUnresolvedReferences
+from .sync import CatalogSync, ChangeSet
+# noinspection PyUnresolvedReferences
+from .hls import MasterPlaylist, PlaylistCache, Variant
+
+if sys.version_info >= (3,):
+    # noinspection PyUnresolvedReferences
+    from .snapshot import Snapshot, SnapshotWriter
+
+if sys.version_info >= (3, 6):
+    # noinspection PyUnresolvedReferences
+    from .aio import AsyncFunimationLater, AsyncHTTPClient, AsyncSingleFlight
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
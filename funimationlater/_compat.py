@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import sys
 
 PY2 = sys.version_info[0] == 2
@@ -6,5 +7,16 @@ PY2 = sys.version_info[0] == 2
 if PY2:
     # noinspection PyCompatibility
     iteritems = lambda d: d.iteritems()
+    text_type = unicode  # noqa
+    string_types = (str, unicode)  # noqa
+    intern = intern  # noqa
+    from collections import Mapping, MutableMapping  # noqa
 else:
     iteritems = lambda d: iter(d.items())
+    text_type = str
+    string_types = (bytes, str)
+    from sys import intern  # noqa
+    from collections.abc import Mapping, MutableMapping  # noqa
+
+# NOTE(Sinap): os.rename can't replace an existing file on Windows.
+replace_file = getattr(os, 'replace', os.rename)
@@ -0,0 +1,745 @@
+# -*- coding: utf-8 -*-
+"""asyncio support, requires Python 3.6 or newer.
+
+Every model method that follows a pointer (`Show.get_details`,
+`ShowDetails.get_season`, `Episode.get_dub`...) returns an awaitable when the
+model was created by :class:`AsyncFunimationLater`::
+
+    api = AsyncFunimationLater()
+    details = await api.get_show(91448)
+    season = await details.get_season(1)
+"""
+import asyncio
+import collections
+import functools
+import inspect
+import logging
+import socket
+import time
+from urllib.error import URLError
+from urllib.parse import urlencode, urljoin, urlsplit
+from urllib.request import Request
+
+from .constants import ShowTypes, SortBy, SortOrder
+from .encoding import ContentDecoder, TransferStats
+from .error import (DetailedHTTPError, LoginRequired, RequestTimeout,
+                    UnknownShow, UnknownEpisode)
+from .funimationlater import FunimationLater
+from .hls import fetch_playlists
+from .sync import CatalogSync, _NEXT_PAGE
+from .httpclient import HTTPClientBase
+from .singleflight import SingleFlight
+from .models import Show, ShowDetails, EpisodeDetails, parse_items
+from .response_handler import NullHandler, XMLResponse
+from .timeouts import Timeout, current_deadline, as_request_timeout
+from .utils import CaseInsensitiveDict
+
+__all__ = ['AsyncHTTPClient', 'AsyncFunimationLater', 'AsyncSingleFlight',
+           'AsyncCatalogSync', 'bounded_gather']
+
+
+def require_login(func):
+    """:func:`funimationlater.funimationlater.require_login` for coroutine
+    functions, the error is raised when the coroutine is awaited.
+
+    Args:
+        func: The coroutine function to wrap
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        if not self.logged_in:
+            raise LoginRequired('must be logged in')
+        return await func(self, *args, **kwargs)
+
+    return wrapper
+
+
+async def bounded_gather(func, iterable, limit=10, return_exceptions=False):
+    """Await `func` for every item in `iterable`, at most `limit` at a time.
+
+    Args:
+        func: A coroutine function that takes one argument.
+        iterable: The arguments.
+        limit (int): The maximum number of calls running at once.
+        return_exceptions (bool): Return exceptions in place of results
+            instead of raising the first one.
+
+    Returns:
+        list: The results in the same order as `iterable`.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*[run(item) for item in iterable],
+                                return_exceptions=return_exceptions)
+
+
+class AsyncSingleFlight(SingleFlight):
+    """A :class:`SingleFlight` for coroutines.
+
+    If the coroutine that is running the call is cancelled the ones waiting
+    for it are cancelled too.
+    """
+
+    async def do(self, key, func):
+        """Await `func()` unless a call for `key` is already running.
+
+        Args:
+            key: Any hashable value.
+            func: Returns an awaitable when called without arguments.
+
+        Returns: The result of awaiting `func()`.
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.get_event_loop().create_future()
+        self._in_flight[key] = future
+        self.calls += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            # NOTE(Sinap): nobody might be waiting, don't log that the
+            # exception was never retrieved.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._in_flight[key]
+        return result
+
+
+class _Connection(object):
+    __slots__ = ['reader', 'writer', 'last_used']
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.time()
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncHTTPClient(HTTPClientBase):
+    """An asyncio HTTP/1.1 client with keep-alive connections.
+
+    It works like :class:`funimationlater.httpclient.PooledHTTPClient` except
+    :meth:`get`, :meth:`post` and :meth:`fetch` are coroutines. It must only
+    be used from one event loop.
+
+    Attributes:
+        host (str): This will be used when building the URL.
+        headers (dict): The headers that are sent in the requests.
+        handle_response: The response handler class.
+        transfer_stats (TransferStats): Bytes received on the wire and after
+            `gzip`/`deflate` decoding.
+    """
+    asynchronous = True
+    chunk_size = 64 * 1024
+    throttle_poll = 0.01
+    redirect_codes = (301, 302, 303, 307, 308)
+    max_redirects = 10
+    resend_methods = frozenset(['GET', 'HEAD'])
+
+    def __init__(self, host, response_handler=None, pool_size=10,
+                 idle_timeout=60.0, single_flight=None, throttle=None,
+                 retry=None, timeout=None):
+        """
+        Args:
+            host (str): This is usually a domain.
+            response_handler: See :class:`HTTPClient`.
+            pool_size (int): The number of idle connections to keep per host.
+            idle_timeout (float): Seconds before an idle connection is closed.
+            single_flight (Optional[AsyncSingleFlight]): Coalesce identical
+                GETs that are in flight at the same time.
+            throttle (Optional[Throttle]): See :class:`HTTPClient`.
+            retry (Optional[RetryPolicy]): See :class:`HTTPClient`.
+            timeout (Union[None, float, Timeout]): See :class:`HTTPClient`,
+                except the read timeout limits reading the whole response.
+        """
+        super(AsyncHTTPClient, self).__init__(host)
+        self.headers = {
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'Python:FunimationLater:v0.0.1'
+        }
+        if response_handler is None:
+            self.handle_response = XMLResponse
+        else:
+            self.handle_response = response_handler
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.single_flight = single_flight
+        self.throttle = throttle
+        self.retry = retry
+        self.timeout = Timeout.coerce(timeout)
+        self.transfer_stats = TransferStats()
+        self._idle = collections.defaultdict(collections.deque)
+        self._log = logging.getLogger(__name__)
+        self._previous_requests = collections.deque(maxlen=5)
+
+    async def get(self, uri, qry=None, handler=None, timeout=None):
+        """Send a GET request to `host` + `uri`
+
+        Args:
+            uri (str): This will be concatenated to `host`.
+            qry (Optional[dict]): Optional query string to add to the URL.
+            handler: Optional response handler for this request only.
+            timeout (Union[None, float, Timeout]): Overrides :attr:`timeout`
+                for this request only.
+
+        Returns: Whatever is returned by the response handler.
+        """
+        return await self._request(self._add_query(uri, qry), handler=handler,
+                                   timeout=timeout)
+
+    async def post(self, uri, data, handler=None, timeout=None):
+        """Send a POST request to `host` + `uri` with `data` as the body.
+
+        Args:
+            uri (str): This will be concatenated to `host`.
+            data (dict): Data is urlencoded before the request is sent.
+            handler: Optional response handler for this request only.
+            timeout (Union[None, float, Timeout]): See :meth:`get`.
+
+        Returns: Whatever is returned by the response handler.
+        """
+        return await self._request(uri, urlencode(data).encode('utf-8'),
+                                   handler, timeout)
+
+    async def fetch(self, uri, qry, callback, handler=None):
+        return callback(await self.get(uri, qry, handler=handler))
+
+    async def fetch_many(self, requests, callback, max_workers=None):
+        results = await bounded_gather(lambda request: self.fetch(*request),
+                                       requests, max_workers or self.pool_size)
+        return callback(results)
+
+    async def result(self, value):
+        return value
+
+    async def then(self, value, callback):
+        result = callback(await value)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def add_headers(self, headers):
+        """Add headers to all requests.
+
+        Args:
+            headers (dict): Will overwrite existing keys
+        """
+        if not isinstance(headers, dict):
+            raise TypeError('argument must be of type `dict`')
+        self.headers.update(headers)
+
+    def close(self):
+        """Close all idle connections."""
+        for idle in self._idle.values():
+            while idle:
+                idle.pop().close()
+
+    async def _request(self, uri, data=None, handler=None, timeout=None):
+        if handler is None:
+            handler = self.handle_response
+        url = self._build_url(uri)
+        req = Request(url, headers=self.headers)
+        self._log.debug('Calling %s on %s',
+                        'GET' if data is None else 'POST', url)
+        self._previous_requests.appendleft(req)
+        method = 'GET' if data is None else 'POST'
+        headers = dict(req.header_items())
+        if data is not None:
+            headers.setdefault('Content-type',
+                               'application/x-www-form-urlencoded')
+        timeout = self.timeout.merge(timeout)
+        deadline = current_deadline()
+        try:
+            if data is None and self.single_flight is not None:
+                key = (url, headers.get('Authorization'))
+                url, status, reason, resp_headers, chunks = \
+                    await self.single_flight.do(key, lambda: self._exchange(
+                        method, url, data, headers, timeout, deadline))
+            else:
+                url, status, reason, resp_headers, chunks = \
+                    await self._exchange(method, url, data, headers, timeout,
+                                         deadline)
+        except (URLError, socket.timeout) as err:
+            timeout_error = as_request_timeout(err, url, timeout)
+            if timeout_error is None:
+                raise
+            raise timeout_error
+        if status >= 400:
+            raise DetailedHTTPError(url, status, reason, resp_headers, None)
+        if not getattr(handler, 'streaming', False):
+            chunks = b''.join(chunks)
+        return handler(chunks, req).handle()
+
+    async def _exchange(self, method, url, data, headers, timeout, deadline):
+        """Send the request, follow redirects and retry it if it failed."""
+        args = (method, url, data, headers, timeout, deadline)
+        if self.retry is None:
+            return await self._attempt(*args)
+        attempts = self.retry.attempts(method, deadline)
+        while True:
+            try:
+                result = await self._attempt(*args)
+            except Exception as err:
+                delay = attempts.delay(err)
+                if delay is None:
+                    raise
+            else:
+                delay = attempts.delay(status=result[1], headers=result[3])
+                if delay is None:
+                    return result
+            self._log.debug('Retrying %s in %.2fs', url, delay)
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, method, url, data, headers, timeout, deadline):
+        if self.throttle is None:
+            return await self._follow(method, url, data, headers, timeout,
+                                      deadline)
+        host = urlsplit(url).netloc
+        await self._acquire_throttle(host)
+        try:
+            result = await self._follow(method, url, data, headers, timeout,
+                                        deadline)
+        except BaseException:
+            self.throttle.release(host)
+            raise
+        status, resp_headers = result[1], result[3]
+        self.throttle.release(host, status, resp_headers.get('Retry-After'))
+        return result
+
+    async def _acquire_throttle(self, host):
+        waited = False
+        while True:
+            wait = self.throttle.try_acquire(host)
+            if wait == 0:
+                break
+            waited = True
+            # NOTE(Sinap): the throttle can't wake up coroutines when a
+            # request is released so poll while waiting for one.
+            await asyncio.sleep(self.throttle_poll if wait is None else wait)
+        if waited:
+            self.throttle.waits += 1
+
+    async def _follow(self, method, url, data, headers, timeout, deadline):
+        for _ in range(self.max_redirects + 1):
+            if deadline is not None:
+                remaining = deadline.remaining()
+                if remaining <= 0:
+                    raise RequestTimeout(url, 'deadline')
+                hop_timeout = timeout.capped(remaining)
+            else:
+                hop_timeout = timeout
+            status, reason, resp_headers, chunks = await self._send(
+                method, url, data, headers, hop_timeout)
+            location = resp_headers.get('Location')
+            if status not in self.redirect_codes or not location:
+                break
+            url = urljoin(url, location)
+            if status == 303 or (status in (301, 302) and method == 'POST'):
+                method, data = 'GET', None
+                headers = dict(headers)
+                headers.pop('Content-type', None)
+        return url, status, reason, resp_headers, chunks
+
+    async def _send(self, method, url, body, headers, timeout):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path = '{}?{}'.format(path, parts.query)
+        lines = ['{} {} HTTP/1.1'.format(method, path),
+                 'Host: {}'.format(parts.netloc)]
+        lines.extend('{}: {}'.format(k, v) for k, v in headers.items())
+        if body is not None:
+            lines.append('Content-Length: {}'.format(len(body)))
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        if body is not None:
+            request += body
+        while True:
+            conn, reused = await self._acquire(key, timeout.connect)
+            try:
+                conn.writer.write(request)
+                status_line = await asyncio.wait_for(
+                    self._read_status(conn), timeout.read)
+            except asyncio.TimeoutError:
+                conn.close()
+                raise socket.timeout('timed out')
+            except OSError as err:
+                conn.close()
+                if reused and method in self.resend_methods:
+                    # See PooledHTTPClient._send
+                    self._log.debug('Reused connection failed: %s', err)
+                    continue
+                if reused:
+                    # NOTE(Sinap): the request may have reached the server,
+                    # leave it to the retry policy like a read error.
+                    raise
+                raise URLError(err)
+            try:
+                status, reason, resp_headers, chunks, keep_alive = \
+                    await asyncio.wait_for(
+                        self._read_response(conn.reader, status_line, method),
+                        timeout.read)
+            except asyncio.TimeoutError:
+                conn.close()
+                raise socket.timeout('timed out')
+            except BaseException:
+                conn.close()
+                raise
+            if keep_alive:
+                self._release(key, conn)
+            else:
+                conn.close()
+            return status, reason, resp_headers, chunks
+
+    @staticmethod
+    async def _read_status(conn):
+        await conn.writer.drain()
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed')
+        return status_line
+
+    async def _read_response(self, reader, status_line, method):
+        version, _, rest = status_line.decode('latin-1').strip().partition(
+            ' ')
+        status, _, reason = rest.partition(' ')
+        status = int(status)
+        headers = CaseInsensitiveDict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name, value = name.strip(), value.strip()
+            if name in headers:
+                value = '{}, {}'.format(headers[name], value)
+            headers[name] = value
+
+        encoding = headers.get('Content-Encoding', '').strip().lower()
+        decoder = None
+        if encoding and encoding != 'identity':
+            decoder = ContentDecoder(encoding)
+        chunks = []
+        stats = self.transfer_stats
+        stats.count_response()
+
+        def add(data):
+            decoded = decoder.decompress(data) if decoder else data
+            stats.add(len(data), len(decoded))
+            if decoded:
+                chunks.append(decoded)
+
+        keep_alive = (version == 'HTTP/1.1' and
+                      headers.get('Connection', '').lower() != 'close')
+        if method == 'HEAD' or status in (204, 304) or status < 200:
+            pass
+        elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    # skip any trailers
+                    while (await reader.readline()) not in (b'\r\n', b'\n',
+                                                            b''):
+                        pass
+                    break
+                add(await reader.readexactly(size))
+                await reader.readexactly(2)
+        elif 'Content-Length' in headers:
+            remaining = int(headers['Content-Length'])
+            while remaining:
+                data = await reader.read(min(self.chunk_size, remaining))
+                if not data:
+                    raise asyncio.IncompleteReadError(b'', remaining)
+                remaining -= len(data)
+                add(data)
+        else:
+            keep_alive = False
+            while True:
+                data = await reader.read(self.chunk_size)
+                if not data:
+                    break
+                add(data)
+        if decoder:
+            data = decoder.flush()
+            stats.add(0, len(data))
+            if data:
+                chunks.append(data)
+        return status, reason, headers, chunks, keep_alive
+
+    async def _acquire(self, key, timeout=None):
+        idle = self._idle[key]
+        now = time.time()
+        while idle:
+            conn = idle.pop()
+            if (now - conn.last_used > self.idle_timeout or
+                    conn.reader.at_eof()):
+                conn.close()
+                continue
+            return conn, True
+        scheme, host, port = key
+        if port is None:
+            port = 443 if scheme == 'https' else 80
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(
+                host, port, ssl=scheme == 'https'), timeout)
+        except asyncio.TimeoutError:
+            raise URLError(socket.timeout('timed out'))
+        except OSError as err:
+            raise URLError(err)
+        return _Connection(reader, writer), False
+
+    def _release(self, key, conn):
+        idle = self._idle[key]
+        if len(idle) < self.pool_size:
+            conn.last_used = time.time()
+            idle.append(conn)
+        else:
+            conn.close()
+
+    def __repr__(self):
+        return '<AsyncHTTPClient: {}>'.format(self.host)
+
+
+class AsyncCatalogSync(CatalogSync):
+    """A :class:`funimationlater.sync.CatalogSync` for
+    :class:`AsyncFunimationLater`, :meth:`sync` is a coroutine.
+    """
+
+    async def sync(self, full=False, page_size=None):
+        changes = None
+        if self._incremental_due(full):
+            changes = await self._incremental(page_size or self.page_size)
+        if changes is None:
+            changes = self._diff(await self.api.get_all_shows(), full=True)
+        return self._finish(changes)
+
+    async def _incremental(self, page_size):
+        seen = []
+        for page in range(self.max_pages):
+            shows = await self.api.get_shows(
+                **self._page_params(page, page_size)) or []
+            changes = self._scan(shows, seen, page_size)
+            if changes is not _NEXT_PAGE:
+                return changes
+        self._log.debug('Watermark not reached after %s pages',
+                        self.max_pages)
+        return None
+
+
+class AsyncFunimationLater(FunimationLater):
+    """An asyncio version of :class:`FunimationLater`.
+
+    Every public method is a coroutine. Use :meth:`login` instead of passing
+    the username and password to the constructor and ``async for`` instead of
+    ``for`` to page through all shows.
+    """
+
+    sync_class = AsyncCatalogSync
+
+    def __init__(self, http_client=None, parse_pool=None):
+        """
+        Args:
+            http_client: Must be a subclass of HTTPClientBase, or an instance
+                of one, whose methods are coroutines. Defaults to
+                :class:`AsyncHTTPClient`.
+            parse_pool (Optional[concurrent.futures.Executor]): See
+                :class:`FunimationLater`.
+        """
+        if http_client is None:
+            http_client = AsyncHTTPClient
+        super(AsyncFunimationLater, self).__init__(http_client=http_client,
+                                                   parse_pool=parse_pool)
+
+    async def login(self, username, password):
+        resp = await self.client.post(
+            '/auth/login/?', {'username': username, 'password': password})
+        self._handle_login(resp)
+
+    @require_login
+    async def get_my_queue(self):
+        return self._parse_queue(
+            await self.client.get('/myqueue/get-items/?'))
+
+    @require_login
+    async def add_to_queue(self, show_stub):
+        await self.client.get('myqueue/add/', {'id': show_stub})
+
+    @require_login
+    async def remove_from_queue(self, show_stub):
+        await self.client.get('myqueue/remove/', {'id': show_stub})
+
+    @require_login
+    async def get_history(self):
+        return self._parse_history(
+            await self.client.get('/history/get-items/?'))
+
+    async def get_shows(self, show_type, sort_by=SortBy.TITLE,
+                        sort_order=SortOrder.DESC,
+                        limit=FunimationLater.default_limit, offset=0,
+                        **kwargs):
+        return await self._get_content(
+            **self._content_params(show_type, sort_by, sort_order, limit,
+                                   offset, **kwargs))
+
+    async def get_show(self, show_id):
+        try:
+            resp = await self.client.get('detail/', {'pk': show_id})
+            if resp:
+                return ShowDetails(resp['list2d'], self.client)
+        except DetailedHTTPError as err:
+            if err.code >= 500:
+                raise
+        raise UnknownShow('Show with ID {} not found'.format(show_id))
+
+    async def get_episode(self, show_id, episode_id, audio_type=None):
+        params = {'id': episode_id, 'show': show_id}
+        if audio_type is not None:
+            params['audio'] = audio_type
+        try:
+            resp = await self.client.get(
+                'player/', params, handler=EpisodeDetails.response_handler())
+            if resp:
+                return EpisodeDetails(resp['player'], self.client)
+        except DetailedHTTPError as err:
+            if err.code >= 500:
+                raise
+        raise UnknownEpisode("Episode ID {} for show {} doesn't exist".format(
+            episode_id, show_id))
+
+    async def get_shows_many(self, show_ids, limit=10,
+                             return_exceptions=False):
+        """Get the details of many shows at once.
+
+        Args:
+            show_ids (iterable[int]):
+            limit (int): The maximum number of requests in flight.
+            return_exceptions (bool): See :func:`bounded_gather`.
+
+        Returns:
+            list[funimationlater.models.ShowDetails]: In the same order as
+                `show_ids`.
+        """
+        return await bounded_gather(self.get_show, show_ids, limit,
+                                    return_exceptions)
+
+    async def get_episodes_many(self, episodes, limit=10,
+                                return_exceptions=False):
+        """Get the details of many episodes at once.
+
+        Args:
+            episodes (iterable[tuple]): (show_id, episode_id) or
+                (show_id, episode_id, audio_type) tuples.
+            limit (int): The maximum number of requests in flight.
+            return_exceptions (bool): See :func:`bounded_gather`.
+
+        Returns:
+            list[funimationlater.models.EpisodeDetails]: In the same order as
+                `episodes`.
+        """
+        async def get_episode(args):
+            return await self.get_episode(*args)
+        return await bounded_gather(get_episode, episodes, limit,
+                                    return_exceptions)
+
+    async def get_playlists_many(self, episodes, limit=10):
+        """Get the master playlists of many episodes at once.
+
+        Args:
+            episodes (iterable[funimationlater.models.EpisodeDetails]):
+            limit (int): The maximum number of requests in flight.
+
+        Returns:
+            list[funimationlater.hls.MasterPlaylist]: In the same order as
+                `episodes`.
+        """
+        return await fetch_playlists(
+            self.client, [e.video_url for e in episodes],
+            EpisodeDetails.playlist_cache, limit)
+
+    async def search(self, query):
+        return await self.get_shows(ShowTypes.SEARCH, q=query)
+
+    async def get_all_shows(self):
+        shows = await self.get_shows(ShowTypes.SHOWS, limit=-1)
+        return shows or []
+
+    async def search_local(self, query, limit=10):
+        if self.index is None:
+            await self.build_index()
+        return self.index.search(query, limit)
+
+    async def build_index(self):
+        self.catalog_sync = self.sync_class(self,
+                                            page_size=self.default_limit)
+        return self._build_index(await self.catalog_sync.sync(full=True))
+
+    async def refresh_index(self, page_size=None):
+        if self._needs_build():
+            return len(await self.build_index())
+        return self._apply_changes(
+            await self.catalog_sync.sync(page_size=page_size))
+
+    async def get_simulcasts(self):
+        return await self.get_shows(ShowTypes.SIMULCAST)
+
+    async def _get_content(self, **kwargs):
+        if self.parse_pool is not None:
+            body = await self.client.get('/longlist/content/page/', kwargs,
+                                         handler=NullHandler)
+            if len(body) < self.parse_threshold:
+                return parse_items(body, Show, self.client) or None
+            items = await asyncio.get_event_loop().run_in_executor(
+                self.parse_pool, parse_items, body, Show)
+            return self._attach(items) or None
+        handler = Show.response_handler(streaming=True)
+        items = await self.client.get('/longlist/content/page/', kwargs,
+                                      handler=handler)
+        return [Show(x, self.client) for x in items] or None
+
+    def __iter__(self):
+        raise TypeError('use `async for` with {}'.format(
+            self.__class__.__name__))
+
+    def iter_shows(self, *args, **kwargs):
+        raise TypeError('use `async for` with {}'.format(
+            self.__class__.__name__))
+
+    def iter_all_shows(self):
+        raise TypeError('use `await get_all_shows()` with {}'.format(
+            self.__class__.__name__))
+
+    async def __getitem__(self, item):
+        """`await api[show_id]`, see :meth:`FunimationLater.__getitem__`."""
+        if isinstance(item, int):
+            try:
+                return await self.get_show(item)
+            except DetailedHTTPError:
+                return None
+
+    async def __aiter__(self):
+        offset = 0
+        limit = self.default_limit
+        while True:
+            shows = await self.get_shows(ShowTypes.SHOWS, limit=limit,
+                                         offset=offset)
+            for show in shows or []:
+                yield show
+            if shows is None or len(shows) < limit:
+                break
+            offset += limit
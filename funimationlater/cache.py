@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import collections
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+except ImportError:
+    from urlparse import urlsplit, urlunsplit, parse_qsl
+    from urllib import urlencode
+
+__all__ = ['CacheStats', 'CacheEntry', 'LRUCache', 'SQLiteStore',
+           'ResponseCache']
+
+
+class CacheStats(object):
+    """Counters for a cache.
+
+    Attributes:
+        hits (int): Lookups that found a fresh entry.
+        misses (int): Lookups that didn't.
+        evictions (int): Entries dropped to make room for new ones.
+        expirations (int): Entries dropped because they were too old.
+        revalidations (int): Stale entries the server said are unchanged.
+    """
+
+    def __init__(self):
+        super(CacheStats, self).__init__()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def __repr__(self):
+        return '<CacheStats: hits={} misses={} evictions={} ' \
+               'expirations={} revalidations={}>'.format(
+                   self.hits, self.misses, self.evictions, self.expirations,
+                   self.revalidations)
+
+
+class CacheEntry(object):
+    """A cached response body.
+
+    Attributes:
+        body (bytes): The decoded body.
+        headers (dict): The response headers used to revalidate the entry,
+            `ETag` and `Last-Modified`.
+        stored_at (float): When the entry was stored or last revalidated.
+        ttl (float): Seconds the entry is fresh for.
+    """
+    __slots__ = ['body', 'headers', 'stored_at', 'ttl']
+
+    def __init__(self, body, headers=None, stored_at=None, ttl=0):
+        self.body = body
+        self.headers = headers or {}
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.ttl = ttl
+
+    @property
+    def expires(self):
+        return self.stored_at + self.ttl
+
+    def is_fresh(self, now=None):
+        return (time.time() if now is None else now) < self.expires
+
+    @property
+    def validators(self):
+        """dict: The headers for a conditional request, empty if the entry
+        can't be revalidated.
+        """
+        validators = {}
+        if self.headers.get('ETag'):
+            validators['If-None-Match'] = self.headers['ETag']
+        if self.headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = self.headers['Last-Modified']
+        return validators
+
+    def __repr__(self):
+        return '<CacheEntry: {} bytes>'.format(len(self.body))
+
+
+class LRUCache(object):
+    """A thread-safe mapping that drops the least recently used items once
+    it holds more than `maxsize` of them.
+    """
+
+    def __init__(self, maxsize=256, stats=None):
+        """
+        Args:
+            maxsize (int): The maximum number of items.
+            stats (Optional[CacheStats]): Evictions are counted here.
+        """
+        super(LRUCache, self).__init__()
+        self.maxsize = maxsize
+        self.stats = stats or CacheStats()
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                return default
+            self._data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.incr('evictions')
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteStore(object):
+    """Keeps cache entries in an SQLite database on disk.
+
+    Bodies are stored compressed and keyed by a hash of the cache key. The
+    database can be shared by several processes and threads, writes are done
+    in short transactions and SQLite's locking keeps them consistent. Once
+    the stored size is over `max_size` the least recently used entries are
+    deleted.
+
+    Attributes:
+        path (str): The database file.
+        max_size (int): The maximum size of the stored entries in bytes.
+        stats (CacheStats):
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            headers TEXT NOT NULL,
+            stored_at REAL NOT NULL,
+            ttl REAL NOT NULL,
+            size INTEGER NOT NULL,
+            accessed REAL NOT NULL
+        )"""
+
+    def __init__(self, path, max_size=64 * 1024 * 1024, timeout=30.0,
+                 stats=None):
+        """
+        Args:
+            path (str): The database file, created if it doesn't exist.
+            max_size (int): The maximum size of the stored entries in bytes.
+            timeout (float): Seconds to wait for another process holding the
+                lock.
+            stats (Optional[CacheStats]): Evictions are counted here.
+        """
+        super(SQLiteStore, self).__init__()
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.stats = stats or CacheStats()
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(self.schema)
+            db.execute('CREATE INDEX IF NOT EXISTS responses_accessed '
+                       'ON responses (accessed)')
+
+    def get(self, key, default=None):
+        db = self._connect()
+        digest = self._hash(key)
+        row = db.execute('SELECT body, headers, stored_at, ttl '
+                         'FROM responses WHERE key = ?', (digest,)).fetchone()
+        if row is None:
+            return default
+        db.execute('UPDATE responses SET accessed = ? WHERE key = ?',
+                   (time.time(), digest))
+        body, headers, stored_at, ttl = row
+        return CacheEntry(zlib.decompress(bytes(body)), json.loads(headers),
+                          stored_at, ttl)
+
+    def set(self, key, entry):
+        body = zlib.compress(entry.body)
+        headers = json.dumps(entry.headers)
+        size = len(body) + len(headers)
+        with self._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO responses VALUES '
+                       '(?, ?, ?, ?, ?, ?, ?)',
+                       (self._hash(key), sqlite3.Binary(body), headers,
+                        entry.stored_at, entry.ttl, size, time.time()))
+            self._evict(db)
+
+    def delete(self, key):
+        with self._transaction() as db:
+            db.execute('DELETE FROM responses WHERE key = ?',
+                       (self._hash(key),))
+
+    def clear(self):
+        with self._transaction() as db:
+            db.execute('DELETE FROM responses')
+
+    def size(self):
+        """
+        Returns:
+            int: The size of the stored entries in bytes.
+        """
+        db = self._connect()
+        return db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def _evict(self, db):
+        excess = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses'
+                            ).fetchone()[0] - self.max_size
+        if excess <= 0:
+            return
+        keys = []
+        for key, size in db.execute('SELECT key, size FROM responses '
+                                    'ORDER BY accessed'):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany('DELETE FROM responses WHERE key = ?', keys)
+        self.stats.incr('evictions', len(keys))
+
+    def _connect(self):
+        # NOTE(Sinap): sqlite3 connections can't be shared between threads.
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.timeout,
+                                 isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+    def __contains__(self, key):
+        return self._connect().execute(
+            'SELECT 1 FROM responses WHERE key = ?',
+            (self._hash(key),)).fetchone() is not None
+
+    def __len__(self):
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+class ResponseCache(object):
+    """Caches the bodies of GET responses for :class:`HTTPClient`.
+
+    Bodies are stored after content decoding and parsed again on every hit,
+    so callers never share the objects the response handler creates.
+
+    Stale entries that have an `ETag` or `Last-Modified` header are kept so
+    the client can revalidate them with a conditional request, when the
+    server answers `304 Not Modified` the stored body is used again.
+
+    The time to live is picked using the longest prefix in `ttls` that
+    matches the request URI, paths are compared without the leading `/`.
+    URIs matching a prefix in `exclude` are never cached, by default these
+    are the endpoints that depend on the logged in user. The values of the
+    `vary` headers are part of the key so responses are never shared between
+    users either way.
+
+    Attributes:
+        ttl (float): The default time to live in seconds.
+        ttls (dict[str,float]): Time to live per URI prefix.
+        exclude (tuple[str]): URI prefixes that are never cached.
+        vary (tuple[str]): Request headers that are part of the key.
+        stats (CacheStats):
+    """
+    default_ttls = {
+        'longlist/': 3600,
+        'detail/': 3600,
+    }
+    default_exclude = ('auth/', 'myqueue/', 'history/')
+
+    def __init__(self, maxsize=256, ttl=300, ttls=None, exclude=None,
+                 vary=('Authorization',), store=None):
+        """
+        Args:
+            maxsize (int): The maximum number of responses kept in memory.
+            ttl (float): The default time to live in seconds.
+            ttls (Optional[dict[str,float]]): Time to live per URI prefix,
+                defaults to `default_ttls`.
+            exclude (Optional[tuple[str]]): URI prefixes to never cache,
+                defaults to `default_exclude`.
+            vary (tuple[str]): Request headers that are part of the key.
+            store: Where entries are kept, defaults to a :class:`LRUCache`
+                of `maxsize` entries. Use a :class:`SQLiteStore` to keep them
+                on disk.
+        """
+        super(ResponseCache, self).__init__()
+        if store is None:
+            store = LRUCache(maxsize)
+        self.store = store
+        self.stats = store.stats
+        self.ttl = ttl
+        self.ttls = self.default_ttls if ttls is None else ttls
+        self.exclude = self.default_exclude if exclude is None else exclude
+        self.vary = vary
+
+    def ttl_for(self, uri):
+        """Get the time to live for `uri`.
+
+        Args:
+            uri (str): The URI as passed to the client.
+
+        Returns:
+            float: None if responses for `uri` shouldn't be cached.
+        """
+        path = uri.lstrip('/')
+        if path.startswith(self.exclude):
+            return None
+        matches = [p for p in self.ttls if path.startswith(p)]
+        if matches:
+            return self.ttls[max(matches, key=len)]
+        return self.ttl
+
+    def key(self, url, headers):
+        """Build the key for a request.
+
+        Args:
+            url (str): The full URL.
+            headers (dict): The request headers.
+
+        Returns:
+            tuple:
+        """
+        headers = dict((k.lower(), v) for k, v in headers.items())
+        return (canonical_url(url),) + tuple(
+            headers.get(name.lower()) for name in self.vary)
+
+    def get(self, key):
+        """Get a fresh entry.
+
+        Returns:
+            CacheEntry: None if there's no fresh entry for `key`.
+        """
+        entry = self.lookup(key)
+        if entry is not None and entry.is_fresh():
+            return entry
+
+    def lookup(self, key):
+        """Get a fresh entry or a stale one that can be revalidated.
+
+        Returns:
+            CacheEntry: None if there's no usable entry for `key`.
+        """
+        entry = self.store.get(key)
+        if entry is not None and not entry.is_fresh():
+            if not entry.validators:
+                self.store.delete(key)
+                self.stats.incr('expirations')
+                entry = None
+            self.stats.incr('misses')
+        else:
+            self.stats.incr('misses' if entry is None else 'hits')
+        return entry
+
+    def set(self, key, body, ttl, headers=None):
+        """Store a response.
+
+        Args:
+            key (tuple): See :meth:`key`.
+            body (bytes): The decoded body.
+            ttl (float): Seconds the entry is fresh for.
+            headers (Optional[dict]): The response headers, only the ones
+                needed to revalidate the entry are kept.
+
+        Returns:
+            CacheEntry:
+        """
+        entry = CacheEntry(body, _validator_headers(headers), ttl=ttl)
+        self.store.set(key, entry)
+        return entry
+
+    def revalidated(self, key, entry, ttl, headers=None):
+        """Mark a stale entry as fresh after the server said it's
+        unchanged.
+
+        Returns:
+            CacheEntry:
+        """
+        entry.headers.update(_validator_headers(headers))
+        entry.stored_at = time.time()
+        entry.ttl = ttl
+        self.store.set(key, entry)
+        self.stats.incr('revalidations')
+        return entry
+
+    def clear(self):
+        self.store.clear()
+
+
+def _validator_headers(headers):
+    if not headers:
+        return {}
+    validators = {}
+    for name in ('ETag', 'Last-Modified'):
+        value = headers.get(name)
+        if value:
+            validators[name] = value
+    return validators
+
+
+def canonical_url(url):
+    """Normalize `url` so equivalent URLs are equal.
+
+    The scheme and host are lowercased and the query parameters sorted.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                       parts.path or '/', query, ''))
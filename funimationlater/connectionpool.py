@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import collections
+import logging
+import select
+import threading
+import time
+
+try:
+    from http.client import HTTPConnection, HTTPSConnection
+except ImportError:
+    from httplib import HTTPConnection, HTTPSConnection
+
+__all__ = ['ConnectionPool', 'PoolManager']
+
+
+def is_connection_dropped(conn):
+    """Check if an idle connection was closed by the other end.
+
+    An idle keep-alive socket should never be readable. If it is then the
+    server either closed it or sent something we didn't ask for, in both
+    cases the connection can't be reused.
+
+    Args:
+        conn (httplib.HTTPConnection): The connection to check.
+
+    Returns:
+        bool: True if the connection should be discarded.
+    """
+    sock = getattr(conn, 'sock', None)
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0.0)
+    except (select.error, ValueError):
+        return True
+    return bool(readable)
+
+
+class ConnectionPool(object):
+    """Keeps idle HTTP/1.1 connections to a single host so they can be reused.
+
+    Connections are handed out to one caller at a time and must be given back
+    with :meth:`put` once the response body has been fully read. The pool
+    never blocks, if every connection is in use a new one is opened and only
+    `maxsize` of them are kept around afterwards.
+
+    Attributes:
+        scheme (str): Either `http` or `https`.
+        host (str): The host name.
+        port (int): The port, None for the scheme default.
+        maxsize (int): The maximum number of idle connections to keep.
+        idle_timeout (float): Seconds an idle connection is kept before it's
+            closed instead of reused.
+    """
+
+    def __init__(self, scheme, host, port=None, maxsize=10, idle_timeout=60.0):
+        super(ConnectionPool, self).__init__()
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._idle = collections.deque()
+        self._lock = threading.Lock()
+        self._log = logging.getLogger(__name__)
+
+    def get(self):
+        """Get a connection, reusing an idle one when possible.
+
+        Returns:
+            tuple(httplib.HTTPConnection, bool): The connection and whether it
+                was reused.
+        """
+        now = time.time()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            if now - last_used > self.idle_timeout:
+                self._log.debug('Closing idle connection to %s', self.host)
+                conn.close()
+            elif is_connection_dropped(conn):
+                self._log.debug('Replacing stale connection to %s', self.host)
+                conn.close()
+            else:
+                return conn, True
+        return self._new_conn(), False
+
+    def put(self, conn):
+        """Give a connection back to the pool.
+
+        Args:
+            conn (httplib.HTTPConnection): A connection returned by :meth:`get`
+                that has no pending response.
+        """
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, collections.deque()
+        for conn, _ in idle:
+            conn.close()
+
+    def _new_conn(self):
+        self._log.debug('Opening connection to %s://%s', self.scheme,
+                        self.host)
+        if self.scheme == 'https':
+            return HTTPSConnection(self.host, self.port)
+        return HTTPConnection(self.host, self.port)
+
+    def __len__(self):
+        return len(self._idle)
+
+    def __repr__(self):
+        return '<ConnectionPool: {}://{} idle={}>'.format(
+            self.scheme, self.host, len(self))
+
+
+class PoolManager(object):
+    """Hands out a :class:`ConnectionPool` per scheme, host and port."""
+
+    def __init__(self, maxsize=10, idle_timeout=60.0):
+        super(PoolManager, self).__init__()
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool_for(self, scheme, host, port=None):
+        """
+        Args:
+            scheme (str):
+            host (str):
+            port (Optional[int]):
+
+        Returns:
+            funimationlater.connectionpool.ConnectionPool:
+        """
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(scheme, host, port, self.maxsize,
+                                      self.idle_timeout)
+                self._pools[key] = pool
+            return pool
+
+    def close(self):
+        """Close all idle connections in every pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+import zlib
+
+try:
+    from http.client import IncompleteRead
+except ImportError:
+    from httplib import IncompleteRead
+
+from .error import UnsupportedEncoding
+
+__all__ = ['ContentDecoder', 'TransferStats', 'iter_body',
+           'content_encoding', 'content_length']
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ContentDecoder(object):
+    """Incrementally decodes a `gzip` or `deflate` encoded body.
+
+    Servers disagree on what `deflate` means, some send a zlib stream and
+    others a raw deflate stream, so the first two bytes decide which one is
+    used.
+    """
+
+    def __init__(self, encoding):
+        """
+        Args:
+            encoding (str): The value of the `Content-Encoding` header.
+
+        Raises:
+            funimationlater.error.UnsupportedEncoding: If the encoding isn't
+                supported.
+        """
+        super(ContentDecoder, self).__init__()
+        self.encoding = encoding
+        self._head = None
+        self._empty = True
+        if encoding in ('gzip', 'x-gzip'):
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._obj = None
+            self._head = b''
+        else:
+            raise UnsupportedEncoding(
+                'unsupported Content-Encoding {}'.format(encoding))
+
+    def decompress(self, data):
+        """
+        Args:
+            data (bytes): The next chunk of the encoded body.
+
+        Returns:
+            bytes: The decoded data, can be empty.
+        """
+        if data:
+            self._empty = False
+        if self._obj is None:
+            self._head += data
+            if len(self._head) < 2:
+                return b''
+            data, self._head = self._head, None
+            self._obj = zlib.decompressobj(
+                zlib.MAX_WBITS if _is_zlib_header(data) else -zlib.MAX_WBITS)
+        return self._obj.decompress(data)
+
+    def flush(self):
+        """
+        Returns:
+            bytes: The rest of the decoded data.
+
+        Raises:
+            IncompleteRead: If the body ended before the compressed stream
+                did.
+        """
+        if self._obj is None:
+            # NOTE(Sinap): less than two bytes can't be a zlib stream.
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            data = self._obj.decompress(self._head) + self._obj.flush()
+        else:
+            data = self._obj.flush()
+        # NOTE(Sinap): Python 2 can't tell, and an empty body has nothing to
+        # decode.
+        if not self._empty and not getattr(self._obj, 'eof', True):
+            raise IncompleteRead(data)
+        return data
+
+
+def _is_zlib_header(data):
+    cmf, flg = bytearray(data[:2])
+    return cmf & 0x0f == 8 and (cmf << 8 | flg) % 31 == 0
+
+
+class TransferStats(object):
+    """Counts bytes received on the wire and the size after decoding.
+
+    Attributes:
+        responses (int): The number of response bodies read.
+        wire_bytes (int): Bytes read from the socket.
+        decoded_bytes (int): Bytes after content decoding.
+    """
+
+    def __init__(self):
+        super(TransferStats, self).__init__()
+        self.responses = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, wire, decoded):
+        with self._lock:
+            self.wire_bytes += wire
+            self.decoded_bytes += decoded
+
+    def count_response(self):
+        with self._lock:
+            self.responses += 1
+
+    @property
+    def ratio(self):
+        """float: Wire bytes divided by decoded bytes, lower is better."""
+        if not self.decoded_bytes:
+            return 1.0
+        return float(self.wire_bytes) / self.decoded_bytes
+
+    def __repr__(self):
+        return '<TransferStats: responses={} wire={} decoded={}>'.format(
+            self.responses, self.wire_bytes, self.decoded_bytes)
+
+
+def _headers(resp):
+    headers = getattr(resp, 'headers', None)
+    if headers is None and hasattr(resp, 'info'):
+        headers = resp.info()
+    return headers
+
+
+def content_encoding(resp):
+    """Get the lowercased `Content-Encoding` of `resp`, None if there isn't
+    one.
+    """
+    headers = _headers(resp)
+    if headers is None:
+        return None
+    encoding = headers.get('Content-Encoding')
+    if not isinstance(encoding, str) or not encoding.strip():
+        return None
+    encoding = encoding.strip().lower()
+    return None if encoding == 'identity' else encoding
+
+
+def content_length(resp):
+    """Get the `Content-Length` of `resp`, None if there isn't a valid one.
+    """
+    headers = _headers(resp)
+    if headers is None:
+        return None
+    length = headers.get('Content-Length')
+    if not isinstance(length, str):
+        return None
+    try:
+        length = int(length)
+    except ValueError:
+        return None
+    return length if length >= 0 else None
+
+
+def iter_body(resp, stats=None, chunk_size=CHUNK_SIZE):
+    """Read `resp` in chunks, decoding them as they arrive.
+
+    Args:
+        resp: A file like response object.
+        stats (Optional[TransferStats]): Updated as the body is read.
+        chunk_size (int): The number of bytes to read at a time.
+
+    Yields:
+        bytes: The decoded body in chunks.
+
+    Raises:
+        IncompleteRead: If the body is shorter than its `Content-Length` or
+            the compressed stream was cut off.
+        funimationlater.error.UnsupportedEncoding:
+    """
+    encoding = content_encoding(resp)
+    decoder = ContentDecoder(encoding) if encoding else None
+    # NOTE(Sinap): on Python 3 `read(amt)` returns an empty string when the
+    # connection closes early instead of raising, so count what arrived.
+    expected = content_length(resp)
+    received = 0
+    if stats is not None:
+        stats.count_response()
+    try:
+        while True:
+            chunk = resp.read(chunk_size)
+            if not chunk:
+                break
+            received += len(chunk)
+            data = decoder.decompress(chunk) if decoder else chunk
+            if stats is not None:
+                stats.add(len(chunk), len(data))
+            if data:
+                yield data
+    except GeneratorExit:
+        # the body wasn't read to the end so the connection can't be reused
+        if hasattr(resp, 'close'):
+            resp.close()
+        raise
+    if expected is not None and received < expected:
+        raise IncompleteRead(b'', expected - received)
+    if decoder:
+        data = decoder.flush()
+        if stats is not None:
+            stats.add(0, len(data))
+        if data:
+            yield data
@@ -6,7 +6,7 @@ except ImportError:
 
 __all__ = ['AuthenticationFailed', 'LoginRequired', 'UnknowResponse',
            'UnknownSeason', 'UnknownEpisode', 'UnknownShow',
-           'DetailedHTTPError']
+           'DetailedHTTPError', 'RequestTimeout', 'UnsupportedEncoding']
 
 
 class AuthenticationFailed(Exception):
@@ -21,6 +21,10 @@ class UnknowResponse(Exception):
     pass
 
 
+class UnsupportedEncoding(UnknowResponse):
+    """The response has a `Content-Encoding` that can't be decoded."""
+
+
 class UnknownSeason(Exception):
     pass
 
@@ -39,3 +43,24 @@ class DetailedHTTPError(HTTPError):
     def __str__(self):
         return 'HTTP Error {}: URL: {} MSG: {}'.format(
             self.code, self.filename, self.msg)
+
+
+class RequestTimeout(Exception):
+    """A request took longer than its timeout or deadline.
+
+    Attributes:
+        url (str):
+        phase (str): `connect`, `read` or `deadline`.
+        timeout (float): The timeout that was exceeded, None for deadlines.
+    """
+    def __init__(self, url, phase, timeout=None):
+        super(RequestTimeout, self).__init__(url, phase, timeout)
+        self.url = url
+        self.phase = phase
+        self.timeout = timeout
+
+    def __str__(self):
+        if self.timeout is None:
+            return 'Timed out ({}): URL: {}'.format(self.phase, self.url)
+        return 'Timed out ({} after {}s): URL: {}'.format(
+            self.phase, self.timeout, self.url)
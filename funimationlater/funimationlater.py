@@ -1,13 +1,35 @@
 # -*- coding: utf-8 -*-
+import collections
+import itertools
 from functools import wraps
 
+try:
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+except ImportError:
+    # NOTE(Sinap): Python 2 needs the `futures` backport.
+    ThreadPoolExecutor = as_completed = None
+
 from .error import (UnknowResponse, LoginRequired, AuthenticationFailed,
                     DetailedHTTPError, UnknownShow, UnknownEpisode)
+from .hls import fetch_playlists
 from .httpclient import HTTPClient, HTTPClientBase
-from .models import Show, ShowDetails, EpisodeDetails
+from .index import CatalogIndex
+from .sync import CatalogSync
+from .models import Show, ShowDetails, EpisodeDetails, parse_items
+from .response_handler import NullHandler
+from .timeouts import bind, deadline
 from .constants import ShowTypes, SortBy, SortOrder
 
-__all__ = ['FunimationLater']
+__all__ = ['FunimationLater', 'BulkResult']
+
+BulkResult = collections.namedtuple('BulkResult', ['key', 'result', 'error'])
+BulkResult.__doc__ = """The outcome of one item of a bulk request.
+
+Attributes:
+    key: The item that was requested, a show ID or an episode tuple.
+    result: The model, None if the request failed.
+    error (Exception): Why the request failed, None if it didn't.
+"""
 
 
 def require_login(func):
@@ -32,18 +54,34 @@ class FunimationLater(object):
     base_path = '/xml'
     protocol = 'https'
     default_limit = 20
+    max_workers = 8
+    parse_threshold = 256 * 1024
+    sync_class = CatalogSync
 
-    def __init__(self, username=None, password=None, http_client=None):
+    def __init__(self, username=None, password=None, http_client=None,
+                 parse_pool=None):
         """
 
         Args:
             username (str): The users email address
             password (str): The password
-            http_client: Must be an instance of HTTPClient
+            http_client: Must be a subclass of HTTPClientBase or an instance
+                of one. Instances must already point at the API's URL.
+            parse_pool (Optional[concurrent.futures.Executor]): Show lists
+                of at least `parse_threshold` bytes are parsed here, usually
+                a `ProcessPoolExecutor` so parsing doesn't hold the GIL of
+                this process. The caller is responsible for shutting it down.
         """
+        self.parse_pool = parse_pool
+        self.index = None
+        # NOTE(Sinap): the shows behind `index`, refresh_index diffs the
+        # catalog against them.
+        self.catalog_sync = None
         full_url = '{}://{}{}'.format(self.protocol, self.host, self.base_path)
         if http_client is None:
             self.client = HTTPClient(full_url)
+        elif isinstance(http_client, HTTPClientBase):
+            self.client = http_client
         else:
             # NOTE(Sinap): using assert instead of raise here because we should
             # never use a client that is not a subclass of HTTPClientBase.
@@ -54,6 +92,27 @@ class FunimationLater(object):
         if username and password:
             self.login(username, password)
 
+    @staticmethod
+    def deadline(seconds):
+        """Limit every request made inside a `with` block to `seconds` in
+        total, see :func:`funimationlater.timeouts.deadline`::
+
+            with api.deadline(10):
+                details = api.get_show(91448)
+                episodes = details.get_season(1)
+
+        It also applies to the bulk methods, whose requests run on other
+        threads, and to coroutines of :class:`AsyncFunimationLater`.
+
+        Args:
+            seconds (float):
+
+        Raises:
+            funimationlater.error.RequestTimeout: From the request that was
+                running when it passed.
+        """
+        return deadline(seconds)
+
     def login(self, username, password):
         """Login and set the authentication headers
 
@@ -63,6 +122,9 @@ class FunimationLater(object):
         """
         resp = self.client.post('/auth/login/?',
                                 {'username': username, 'password': password})
+        self._handle_login(resp)
+
+    def _handle_login(self, resp):
         if 'error' in resp['authentication']:
             raise AuthenticationFailed('username or password is incorrect')
         # the API returns what headers should be set
@@ -76,7 +138,9 @@ class FunimationLater(object):
         Returns:
             list[funimationlater.models.Show]:
         """
-        resp = self.client.get('/myqueue/get-items/?')
+        return self._parse_queue(self.client.get('/myqueue/get-items/?'))
+
+    def _parse_queue(self, resp):
         if resp['watchlist']['items'] is not None:
             return [Show(x['item'], self.client) for x in
                     resp['watchlist']['items']['item']]
@@ -111,7 +175,9 @@ class FunimationLater(object):
         Raises:
             funimationlater.error.UnknowResponse:
         """
-        resp = self.client.get('/history/get-items/?')
+        return self._parse_history(self.client.get('/history/get-items/?'))
+
+    def _parse_history(self, resp):
         if 'watchlist' in resp:
             return [Show(x['item'], self.client) for x in
                     resp['watchlist']['items']['historyitem']]
@@ -133,6 +199,14 @@ class FunimationLater(object):
             list[funimationlater.models.Show]:
         """
         resp = self._get_content(
+            **self._content_params(show_type, sort_by, sort_order, limit,
+                                   offset, **kwargs))
+        return resp
+
+    @staticmethod
+    def _content_params(show_type, sort_by, sort_order, limit, offset,
+                        **kwargs):
+        return dict(
             id=show_type,
             sort=sort_by,
             sort_direction=sort_order,
@@ -143,7 +217,6 @@ class FunimationLater(object):
             limit=limit,
             **kwargs
         )
-        return resp
 
     def get_show(self, show_id):
         """Get the :class:`funimationlater.models.ShowDetails` for `show_id`.
@@ -156,16 +229,18 @@ class FunimationLater(object):
 
         Raises:
             funimationlater.error.UnknownShow:
+            funimationlater.error.DetailedHTTPError: On server errors.
         """
         try:
             resp = self.client.get('detail/', {'pk': show_id})
             if resp:
                 return ShowDetails(resp['list2d'], self.client)
-        except DetailedHTTPError:
-            # So we don't need the same code twice, just pass on HTTPError
-            # then raise UnknownShow. If it's a different error it should
-            # raise that error instead.
-            pass
+        except DetailedHTTPError as err:
+            # So we don't need the same code twice, just pass on client
+            # errors then raise UnknownShow. Server errors don't mean the
+            # show doesn't exist so those are raised as is.
+            if err.code >= 500:
+                raise
         raise UnknownShow('Show with ID {} not found'.format(show_id))
 
     def get_episode(self, show_id, episode_id, audio_type=None):
@@ -181,20 +256,101 @@ class FunimationLater(object):
 
         Raises:
             funimationlater.error.UnknownEpisode:
+            funimationlater.error.DetailedHTTPError: On server errors.
         """
         params = {'id': episode_id, 'show': show_id}
         if audio_type is not None:
             params['audio'] = audio_type
         try:
-            resp = self.client.get('player/', params)
+            resp = self.client.get(
+                'player/', params, handler=EpisodeDetails.response_handler())
             if resp:
                 return EpisodeDetails(resp['player'], self.client)
-        except DetailedHTTPError:
-            # See get_episodes note.
-            pass
+        except DetailedHTTPError as err:
+            # See get_show note.
+            if err.code >= 500:
+                raise
         raise UnknownEpisode("Episode ID {} for show {} doesn't exist".format(
             episode_id, show_id))
 
+    def get_shows_many(self, show_ids, max_workers=None, ordered=True):
+        """Get the details of many shows using a thread pool.
+
+        A show that fails doesn't stop the others, its error is reported in
+        its :class:`BulkResult` instead.
+
+        Args:
+            show_ids (iterable[int]):
+            max_workers (Optional[int]): The number of threads, defaults to
+                `max_workers`.
+            ordered (bool): Yield results in the same order as `show_ids`
+                instead of as they complete.
+
+        Returns:
+            generator[BulkResult]: Each `result` is a
+                :class:`funimationlater.models.ShowDetails`.
+        """
+        return self._fetch_many(self.get_show, ((x,) for x in show_ids),
+                                max_workers, ordered)
+
+    def get_episodes_many(self, episodes, max_workers=None, ordered=True):
+        """Get the details of many episodes using a thread pool.
+
+        Args:
+            episodes (iterable[tuple]): (show_id, episode_id) or
+                (show_id, episode_id, audio_type) tuples.
+            max_workers (Optional[int]): The number of threads, defaults to
+                `max_workers`.
+            ordered (bool): Yield results in the same order as `episodes`
+                instead of as they complete.
+
+        Returns:
+            generator[BulkResult]: Each `result` is a
+                :class:`funimationlater.models.EpisodeDetails`.
+        """
+        return self._fetch_many(self.get_episode, episodes, max_workers,
+                                ordered)
+
+    def get_playlists_many(self, episodes, max_workers=None):
+        """Get the master playlists of many episodes at once.
+
+        A playlist is requested once however many of the episodes share it,
+        and not at all if it's in :attr:`EpisodeDetails.playlist_cache`.
+        Use :meth:`funimationlater.hls.MasterPlaylist.stream_url` to pick a
+        quality.
+
+        Args:
+            episodes (iterable[funimationlater.models.EpisodeDetails]):
+            max_workers (Optional[int]): The number of requests sent at once,
+                defaults to `max_workers`.
+
+        Returns:
+            list[funimationlater.hls.MasterPlaylist]: In the same order as
+                `episodes`.
+        """
+        return fetch_playlists(self.client, [e.video_url for e in episodes],
+                               EpisodeDetails.playlist_cache,
+                               max_workers or self.max_workers)
+
+    def _fetch_many(self, func, arguments, max_workers, ordered):
+        pool = ThreadPoolExecutor(max_workers or self.max_workers)
+        futures = collections.OrderedDict()
+        func = bind(func)
+        try:
+            for args in arguments:
+                futures[pool.submit(func, *args)] = args
+            for future in (futures if ordered else as_completed(futures)):
+                args = futures[future]
+                key = args[0] if len(args) == 1 else tuple(args)
+                try:
+                    yield BulkResult(key, future.result(), None)
+                except Exception as err:
+                    yield BulkResult(key, None, err)
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+
     def search(self, query):
         """Perform a search using the API.
 
@@ -207,18 +363,89 @@ class FunimationLater(object):
         resp = self.get_shows(ShowTypes.SEARCH, q=query)
         return resp
 
+    def search_local(self, query, limit=10):
+        """Search the titles in :attr:`index` without asking the API.
+
+        The index is built with :meth:`build_index` the first time, after
+        that it's only updated by :meth:`refresh_index`. Set :attr:`index`
+        to a :meth:`CatalogIndex.load` -ed one to skip the first build.
+
+        Args:
+            query (str): Whole words and the start of the last one are
+                enough, e.g. `attack on t`.
+            limit (int): The most results to return.
+
+        Returns:
+            list[funimationlater.index.SearchHit]: The best matches first.
+        """
+        if self.index is None:
+            self.build_index()
+        return self.index.search(query, limit)
+
+    def build_index(self):
+        """Index every show, replacing :attr:`index`.
+
+        Returns:
+            funimationlater.index.CatalogIndex:
+        """
+        self.catalog_sync = self.sync_class(self,
+                                            page_size=self.default_limit)
+        return self._build_index(self.catalog_sync.sync(full=True))
+
+    def _build_index(self, changes):
+        self.index = CatalogIndex()
+        self.index.apply(changes)
+        return self.index
+
+    def refresh_index(self, page_size=None):
+        """Update :attr:`index` with the shows that changed since it was
+        built or last refreshed.
+
+        This is a :class:`funimationlater.sync.CatalogSync`, usually only
+        the first page of the newest shows is requested. An index that
+        wasn't built by :meth:`build_index`, e.g. a loaded one, is built
+        again.
+
+        Args:
+            page_size (Optional[int]): Shows per request, defaults to
+                `default_limit`.
+
+        Returns:
+            int: The number of shows that were added or updated.
+        """
+        if self._needs_build():
+            return len(self.build_index())
+        return self._apply_changes(
+            self.catalog_sync.sync(page_size=page_size))
+
+    def _needs_build(self):
+        return self.index is None or self.catalog_sync is None
+
+    def _apply_changes(self, changes):
+        self.index.apply(changes)
+        return len(changes.added) + len(changes.updated)
+
     def get_all_shows(self):
         """Get a list of all shows.
 
         Returns:
             List[funimationlater.models.Show]:
         """
+        return list(self.iter_all_shows())
+
+    def iter_all_shows(self):
+        """Get all shows one at a time.
+
+        The response is parsed as it's read and each show is created as soon
+        as its item is parsed, so memory use doesn't grow with the size of
+        the catalog.
+
+        Returns:
+            generator[funimationlater.models.Show]:
+        """
         # limit=-1 appears to return all shows
-        shows = self.get_shows(ShowTypes.SHOWS, limit=-1)
-        if shows is None:
-            return []
-        else:
-            return shows
+        return self._iter_content(**self._content_params(
+            ShowTypes.SHOWS, SortBy.TITLE, SortOrder.DESC, -1, 0))
 
     def get_simulcasts(self):
         """Get a list of all shows being simulcasted.
@@ -236,30 +463,102 @@ class FunimationLater(object):
         return shows
 
     def _get_content(self, **kwargs):
-        resp = self.client.get('/longlist/content/page/', kwargs)['items']
-        if not resp or isinstance(resp, (tuple, str)):
-            return None
-        resp = resp['item']
-        if isinstance(resp, list):
-            return [Show(x, self.client) for x in resp]
-        else:
-            return [Show(resp, self.client)]
+        return list(self._iter_content(**kwargs)) or None
+
+    def _iter_content(self, **kwargs):
+        if self.parse_pool is not None:
+            body = self.client.get('/longlist/content/page/', kwargs,
+                                   handler=NullHandler)
+            return iter(self._parse_items(body, Show))
+        handler = Show.response_handler(streaming=True)
+        items = self.client.get('/longlist/content/page/', kwargs,
+                                handler=handler)
+        return (Show(x, self.client) for x in items)
+
+    def _parse_items(self, body, model):
+        """Parse `body` in :attr:`parse_pool` if it's large enough."""
+        if len(body) < self.parse_threshold:
+            return parse_items(body, model, self.client)
+        items = self.parse_pool.submit(parse_items, body, model).result()
+        return self._attach(items)
+
+    def _attach(self, items):
+        for item in items:
+            item.client = self.client
+        return items
+
+    def iter_shows(self, show_type=ShowTypes.SHOWS, page_size=None,
+                   prefetch=1, **kwargs):
+        """Page through shows, fetching the next pages in the background.
+
+        While the caller handles one page the next `prefetch` pages are
+        requested on a thread pool so the network and the caller overlap.
+        Iteration stops after the first page with less than `page_size`
+        shows.
 
-    def __iter__(self):
-        """
-        Returns:
-            funimationlater.models.Show:
+        Args:
+            show_type (str): See :meth:`get_shows`.
+            page_size (Optional[int]): Shows per request, defaults to
+                `default_limit`.
+            prefetch (int): The number of pages to request ahead, 0 to only
+                request a page once the previous one was consumed.
+            **kwargs: Passed on to :meth:`get_shows`.
 
+        Returns:
+            generator[funimationlater.models.Show]:
         """
+        page_size = page_size or self.default_limit
+        if not prefetch:
+            return self._iter_pages(show_type, page_size, **kwargs)
+        return self._iter_prefetched(show_type, page_size, prefetch, **kwargs)
+
+    def _iter_pages(self, show_type, page_size, **kwargs):
         offset = 0
-        limit = self.default_limit
         while True:
-            shows = self.get_shows(ShowTypes.SHOWS, limit=limit, offset=offset)
+            shows = self.get_shows(show_type, limit=page_size, offset=offset,
+                                   **kwargs) or []
             for show in shows:
                 yield show
-            if len(shows) < limit:
+            if len(shows) < page_size:
                 break
-            offset += limit
+            offset += page_size
+
+    def _iter_prefetched(self, show_type, page_size, prefetch, **kwargs):
+        pool = ThreadPoolExecutor(prefetch)
+        pending = collections.deque()
+        offsets = itertools.count(0, page_size)
+        get_shows = bind(self.get_shows)
+
+        def request_page():
+            pending.append(pool.submit(get_shows, show_type,
+                                       limit=page_size, offset=next(offsets),
+                                       **kwargs))
+        try:
+            # the page the caller is waiting for plus the ones ahead of it
+            for _ in range(prefetch + 1):
+                request_page()
+            while pending:
+                shows = pending.popleft().result() or []
+                if len(shows) < page_size:
+                    for show in shows:
+                        yield show
+                    break
+                request_page()
+                for show in shows:
+                    yield show
+        finally:
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=False)
+
+    def __iter__(self):
+        """Iterate over all shows, see :meth:`iter_shows`.
+
+        Returns:
+            funimationlater.models.Show:
+
+        """
+        return self.iter_shows()
 
     def __getitem__(self, item):
         """
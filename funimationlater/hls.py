@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""Parsing of the HLS master playlists the episodes are streamed from.
+
+A master playlist lists one variant stream per quality::
+
+    #EXTM3U
+    #EXT-X-STREAM-INF:BANDWIDTH=2000000,RESOLUTION=1280x720,CODECS="..."
+    video_Layer5.m3u8
+
+Funimation names the variants after their quality, `Layer5` is quality 5.
+"""
+from __future__ import absolute_import
+
+import collections
+import re
+import time
+
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin
+
+from ._compat import text_type
+from .cache import LRUCache
+from .response_handler import ResponseHandler
+
+__all__ = ['Variant', 'MasterPlaylist', 'PlaylistHandler', 'PlaylistCache',
+           'parse_master_playlist', 'fetch_playlists']
+
+Variant = collections.namedtuple('Variant', ['uri', 'bandwidth',
+                                             'resolution', 'codecs',
+                                             'quality'])
+Variant.__doc__ = """A variant stream of a :class:`MasterPlaylist`.
+
+Attributes:
+    uri (str): The absolute URL of the variant's media playlist.
+    bandwidth (int): The peak bits per second.
+    resolution (tuple[int, int]): Width and height, None if not given.
+    codecs (tuple[str]): Empty if not given.
+    quality (int): The number of the `Layer` in the URI, None if it has
+        none.
+"""
+
+_attribute_re = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+_layer_re = re.compile(r'Layer(\d+)')
+STREAM_INF = '#EXT-X-STREAM-INF:'
+
+
+def parse_attributes(text):
+    """Parse an attribute list such as `BANDWIDTH=1,CODECS="a,b"`.
+
+    Returns:
+        dict: The values by name, quoted strings without their quotes.
+    """
+    return dict((name, value[1:-1] if value.startswith('"') else value)
+                for name, value in _attribute_re.findall(text))
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _variant(attributes, uri):
+    resolution = attributes.get('RESOLUTION')
+    if resolution is not None:
+        width, _, height = resolution.lower().partition('x')
+        resolution = (_int(width), _int(height))
+        if None in resolution:
+            resolution = None
+    codecs = attributes.get('CODECS')
+    codecs = tuple(c.strip() for c in codecs.split(',')) if codecs else ()
+    layer = _layer_re.search(uri)
+    return Variant(uri, _int(attributes.get('BANDWIDTH')), resolution,
+                   codecs, int(layer.group(1)) if layer else None)
+
+
+def parse_master_playlist(text, url):
+    """
+    Args:
+        text (str): The playlist.
+        url (str): Where the playlist came from, relative variant URIs are
+            resolved against it.
+
+    Returns:
+        MasterPlaylist:
+    """
+    if not isinstance(text, text_type):
+        text = text.decode('utf-8')
+    variants = []
+    attributes = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith(STREAM_INF):
+            attributes = parse_attributes(line[len(STREAM_INF):])
+        elif line.startswith('#'):
+            continue
+        elif attributes is not None:
+            variants.append(_variant(attributes, urljoin(url, line)))
+            attributes = None
+    return MasterPlaylist(url, variants)
+
+
+class MasterPlaylist(object):
+    """The variants of a master playlist, in the order they're listed.
+
+    Attributes:
+        url (str): The URL of the playlist itself.
+        variants (list[Variant]):
+    """
+
+    def __init__(self, url, variants):
+        super(MasterPlaylist, self).__init__()
+        self.url = url
+        self.variants = variants
+        self._by_quality = dict((v.quality, v) for v in reversed(variants)
+                                if v.quality is not None)
+
+    @property
+    def qualities(self):
+        """list[int]: The qualities there are variants for, lowest first."""
+        return sorted(self._by_quality)
+
+    def get(self, quality):
+        """
+        Returns:
+            Variant: The first variant of `quality`, None if there is none.
+        """
+        return self._by_quality.get(quality)
+
+    def best(self):
+        """
+        Returns:
+            Variant: The variant with the highest bandwidth, None if there
+                are no variants.
+        """
+        if not self.variants:
+            return None
+        return max(self.variants, key=lambda v: v.bandwidth or 0)
+
+    def stream_url(self, quality=None):
+        """The URL to stream `quality` from.
+
+        Returns:
+            str: The variant's URL, or the URL of the playlist itself, which
+                lets the player choose, when there is no such quality.
+        """
+        variant = None if quality is None else self.get(quality)
+        return self.url if variant is None else variant.uri
+
+    def __iter__(self):
+        return iter(self.variants)
+
+    def __len__(self):
+        return len(self.variants)
+
+    def __repr__(self):
+        return '<MasterPlaylist: {} variants>'.format(len(self))
+
+
+class PlaylistHandler(ResponseHandler):
+    """Parses the body into a :class:`MasterPlaylist`."""
+
+    def handle(self):
+        return parse_master_playlist(self._resp, self._req.get_full_url())
+
+
+class PlaylistCache(object):
+    """Keeps parsed playlists by URL for `ttl` seconds.
+
+    The playlist URLs are signed and expire, so the TTL should be shorter
+    than their lifetime. The cache is safe to share between threads.
+    """
+
+    def __init__(self, ttl=300, maxsize=1024):
+        """
+        Args:
+            ttl (float): Seconds a playlist is kept.
+            maxsize (int): The most playlists to keep.
+        """
+        super(PlaylistCache, self).__init__()
+        self.ttl = ttl
+        self._playlists = LRUCache(maxsize)
+
+    def get(self, url):
+        """
+        Returns:
+            MasterPlaylist: None if it isn't cached or expired.
+        """
+        entry = self._playlists.get(url)
+        if entry is None:
+            return None
+        expires, playlist = entry
+        if expires < time.time():
+            self._playlists.delete(url)
+            return None
+        return playlist
+
+    def set(self, url, playlist):
+        self._playlists.set(url, (time.time() + self.ttl, playlist))
+        return playlist
+
+    def clear(self):
+        self._playlists.clear()
+
+    def __len__(self):
+        return len(self._playlists)
+
+
+def fetch_playlists(client, urls, cache=None, max_workers=None):
+    """Get many master playlists at once, each URL is requested once.
+
+    Args:
+        client (funimationlater.httpclient.HTTPClientBase):
+        urls (iterable[str]):
+        cache (Optional[PlaylistCache]): Playlists in it aren't requested
+            and the ones that are get added.
+        max_workers (Optional[int]): See
+            :meth:`funimationlater.httpclient.HTTPClientBase.fetch_many`.
+
+    Returns:
+        list[MasterPlaylist]: In the same order as `urls`, or an awaitable
+            of it when the client is asynchronous.
+    """
+    urls = list(urls)
+    playlists = {}
+    missing = []
+    for url in urls:
+        if url in playlists:
+            continue
+        playlist = cache.get(url) if cache is not None else None
+        playlists[url] = playlist
+        if playlist is None:
+            missing.append(url)
+
+    def collect(results):
+        for url, playlist in zip(missing, results):
+            if cache is not None:
+                cache.set(url, playlist)
+            playlists[url] = playlist
+        return [playlists[url] for url in urls]
+    if not missing:
+        return client.result(collect([]))
+    return client.fetch_many(
+        [(url, None, lambda playlist: playlist, PlaylistHandler)
+         for url in missing], collect, max_workers)
@@ -2,32 +2,198 @@
 from __future__ import absolute_import
 
 import collections
+import io
 import logging
+import socket
+import threading
+import time
 
 try:
-    from urllib.parse import urlencode
-    from urllib.request import urlopen, Request
-    from urllib.error import HTTPError
+    from concurrent.futures import ThreadPoolExecutor
 except ImportError:
+    # NOTE(Sinap): Python 2 needs the `futures` backport.
+    ThreadPoolExecutor = None
+
+try:
+    from http.client import HTTPException
+    from urllib.parse import urlencode, urljoin, urlsplit
+    from urllib.request import (HTTPHandler, HTTPSHandler, Request,
+                                build_opener)
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from httplib import HTTPException
     from urllib import urlencode
-    from urllib2 import urlopen, Request, HTTPError
+    from urlparse import urljoin, urlsplit
+    from urllib2 import (HTTPHandler, HTTPSHandler, Request, build_opener,
+                         HTTPError, URLError)
 
+from .connectionpool import PoolManager
+from .encoding import TransferStats, content_encoding, iter_body
 from .response_handler import XMLResponse
-from .error import DetailedHTTPError
-__all__ = ['HTTPClientBase', 'HTTPClient']
+from .error import DetailedHTTPError, RequestTimeout
+from .timeouts import (Timeout, current_deadline, bind, as_request_timeout,
+                       guard_body)
+__all__ = ['HTTPClientBase', 'HTTPClient', 'PooledHTTPClient']
+
+
+def _seconds(timeout):
+    """A socket timeout, None uses the default."""
+    return socket.getdefaulttimeout() if timeout is None else timeout
+
+
+_connection_classes = {}
+
+
+def _split_timeouts(base):
+    """Get a subclass of the connection class `base` that takes a
+    :class:`Timeout`, it connects with the connect timeout and then
+    switches the socket to the read timeout.
+    """
+    cls = _connection_classes.get(base)
+    if cls is not None:
+        return cls
+
+    class Connection(base):
+        def __init__(self, host, **kwargs):
+            timeout = kwargs.get('timeout')
+            self._timeouts = timeout if isinstance(timeout, Timeout) \
+                else None
+            if self._timeouts is not None:
+                kwargs['timeout'] = _seconds(timeout.connect)
+            base.__init__(self, host, **kwargs)
+
+        def connect(self):
+            base.connect(self)
+            if self._timeouts is not None:
+                self.sock.settimeout(_seconds(self._timeouts.read))
+
+    Connection.__name__ = base.__name__
+    cls = _connection_classes[base] = Connection
+    return cls
+
+
+class _HTTPHandler(HTTPHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return HTTPHandler.do_open(self, _split_timeouts(http_class), req,
+                                   **kwargs)
+
+
+class _HTTPSHandler(HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return HTTPSHandler.do_open(self, _split_timeouts(http_class), req,
+                                    **kwargs)
+
+
+_opener = build_opener(_HTTPHandler, _HTTPSHandler)
+
+
+def urlopen(req, data=None, timeout=None):
+    """:func:`urllib2.urlopen` with separate connect and read timeouts.
+
+    The timeout is kept on the request, so it applies to the redirects too.
+    Openers installed with :func:`urllib2.install_opener` aren't used.
+
+    Args:
+        req (urllib2.Request):
+        data (Optional[str]): The body of a POST.
+        timeout (Optional[Timeout]):
+    """
+    return _opener.open(req, data, timeout or Timeout())
 
 
 class HTTPClientBase(object):
+    """
+    Attributes:
+        asynchronous (bool): True if the methods return awaitables.
+    """
+    asynchronous = False
+
     def __init__(self, host):
         super(HTTPClientBase, self).__init__()
         self.host = host
 
-    def get(self, uri, qry=None):
+    def get(self, uri, qry=None, handler=None, timeout=None):
         raise NotImplementedError
 
-    def post(self, uri, data):
+    def post(self, uri, data, handler=None, timeout=None):
         raise NotImplementedError
 
+    def fetch(self, uri, qry, callback, handler=None):
+        """Send a GET request and pass the response to `callback`.
+
+        The models use this instead of :meth:`get` so they work the same with
+        clients that return awaitables, those clients override this to return
+        an awaitable of the result of `callback`.
+
+        Args:
+            uri (str):
+            qry (Optional[dict]):
+            callback: Called with the response.
+            handler (Optional[ResponseHandler]): See :meth:`get`.
+
+        Returns: Whatever is returned by `callback`.
+        """
+        return callback(self.get(uri, qry, handler=handler))
+
+    def fetch_many(self, requests, callback, max_workers=None):
+        """Like :meth:`fetch` for several requests at once.
+
+        Args:
+            requests: `(uri, qry, callback)` or
+                `(uri, qry, callback, handler)` tuples, see :meth:`fetch`.
+            callback: Called with the list of results.
+            max_workers (Optional[int]): The number of requests sent at once,
+                1 sends them one after the other.
+
+        Returns: Whatever is returned by `callback`.
+        """
+        requests = list(requests)
+        if max_workers == 1 or len(requests) < 2 or ThreadPoolExecutor is None:
+            return callback([self.fetch(*request) for request in requests])
+        pool = ThreadPoolExecutor(max_workers or min(len(requests), 8))
+        fetch = bind(self.fetch)
+        try:
+            futures = [pool.submit(fetch, *request)
+                       for request in requests]
+            return callback([future.result() for future in futures])
+        finally:
+            pool.shutdown(wait=False)
+
+    def result(self, value):
+        """Return `value` the way :meth:`fetch` returns results.
+
+        The models use this to hand out something they already have without
+        a request, clients that return awaitables override this.
+        """
+        return value
+
+    def then(self, value, callback):
+        """Pass `value`, a result of :meth:`fetch` or :meth:`result`, to
+        `callback` once it's there.
+
+        The models use this to follow one request with another, clients that
+        return awaitables override this to await `value` and whatever
+        `callback` returns.
+
+        Returns: Whatever is returned by `callback`.
+        """
+        return callback(value)
+
+    @staticmethod
+    def _add_query(uri, qry):
+        if qry:
+            query = urlencode(qry) if isinstance(qry, dict) else qry
+            uri = '{}?{}'.format(uri, query)
+        return uri
+
+    def _build_url(self, uri):
+        if uri.startswith('http'):
+            return uri
+        if uri[0] == '/':
+            return self.host + uri
+        else:
+            return self.host + '/' + uri
+
 
 class HTTPClient(HTTPClientBase):
     """Used to handle POST and GET requests.
@@ -40,15 +206,44 @@ class HTTPClient(HTTPClientBase):
         headers (dict): The headers that are sent in the requests.
         handle_response: This function is called for all requests and is passed
             the results of the request as a string.
+        transfer_stats (TransferStats): Bytes received on the wire and after
+            `gzip`/`deflate` decoding.
+        cache (ResponseCache): Caches GET responses, None to disable.
+        single_flight (SingleFlight): Shares the response of identical GETs
+            that are sent at the same time, None to disable.
+        throttle (Throttle): Limits the request rate and concurrency per
+            host, None to disable.
+        retry (RetryPolicy): Sends failed requests again, None to disable.
+        timeout (Timeout): The connect and read timeouts of every request.
+
+    A client can be shared between threads. Pass a handler to :meth:`get`
+    or :meth:`post` rather than changing :attr:`handle_response`, and use
+    :meth:`add_headers` rather than changing :attr:`headers` in place.
     """
 
-    def __init__(self, host, response_handler=None):
+    def __init__(self, host, response_handler=None, cache=None,
+                 single_flight=None, throttle=None, retry=None,
+                 timeout=None):
         """Init the HTTPClient
 
         Args:
             host (str): This is usually a domain.
             response_handler: This function must take 1 argument and return
                 something.
+            cache (Optional[ResponseCache]): Cache GET responses.
+            single_flight (Optional[SingleFlight]): Coalesce identical GETs
+                that are in flight at the same time. The body is shared and
+                every caller parses it with its own handler.
+            throttle (Optional[Throttle]): Wait before sending requests
+                when a host is sent too many, and back off when it answers
+                `429` or `503`.
+            retry (Optional[RetryPolicy]): Retry requests that failed with
+                a connection error or a status code the policy allows.
+                Errors while the body is read are retried too, handlers that
+                parse lazily are given the whole body for that.
+            timeout (Union[None, float, Timeout]): Seconds to wait for the
+                connection and for each read, a number sets both. Requests
+                that time out raise :class:`RequestTimeout`.
         """
         super(HTTPClient, self).__init__(host)
         self.headers = {
@@ -61,31 +256,49 @@ class HTTPClient(HTTPClientBase):
             self.handle_response = response_handler
         self._log = logging.getLogger(__name__)
         self._previous_requests = collections.deque(maxlen=5)
+        # NOTE(Sinap): guards `headers` and `_previous_requests`, requests are
+        # created from many threads when the client is shared.
+        self._lock = threading.Lock()
+        self.transfer_stats = TransferStats()
+        self.cache = cache
+        self.single_flight = single_flight
+        self.throttle = throttle
+        self.retry = retry
+        self.timeout = Timeout.coerce(timeout)
 
-    def get(self, uri, qry=None):
+    def get(self, uri, qry=None, handler=None, timeout=None):
         """Send a GET request to `host` + `uri`
 
         Args:
             uri (str): This will be concatenated to `host`.
             qry (Optional[dict]): Optional query string to add to the URL.
+            handler: Optional response handler to use instead of
+                `handle_response` for this request only.
+            timeout (Union[None, float, Timeout]): Overrides :attr:`timeout`
+                for this request only.
 
-        Returns: Whatever is returned by `handle_response`.
+        Returns: Whatever is returned by the response handler.
+
+        Raises:
+            funimationlater.error.DetailedHTTPError:
+            funimationlater.error.RequestTimeout:
         """
-        if qry:
-            query = urlencode(qry) if isinstance(qry, dict) else qry
-            uri = '{}?{}'.format(uri, query)
-        return self._request(uri)
+        return self._request(self._add_query(uri, qry), handler=handler,
+                             timeout=timeout)
 
-    def post(self, uri, data):
+    def post(self, uri, data, handler=None, timeout=None):
         """Send a POST request to `host` + `uri` with `data` as the body.
 
         Args:
             uri (str): This will be concatenated to `host`.
             data (dict): Data is urlencoded before the request is sent.
+            handler: Optional response handler to use instead of
+                `handle_response` for this request only.
+            timeout (Union[None, float, Timeout]): See :meth:`get`.
 
-        Returns: Whatever is returned by `handle_response`.
+        Returns: Whatever is returned by the response handler.
         """
-        return self._request(uri, urlencode(data))
+        return self._request(uri, urlencode(data), handler, timeout)
 
     def add_headers(self, headers):
         """Add headers to all requests.
@@ -95,22 +308,194 @@ class HTTPClient(HTTPClientBase):
         """
         if not isinstance(headers, dict):
             raise TypeError('argument must be of type `dict`')
-        self.headers.update(headers)
+        with self._lock:
+            self.headers.update(headers)
 
-    def _request(self, uri, data=None):
+    def _request(self, uri, data=None, handler=None, timeout=None):
+        if handler is None:
+            handler = self.handle_response
         req = self._create_request(uri)
-        self._previous_requests.appendleft(req)
+        # NOTE(Sinap): carried on the request so every attempt, redirect and
+        # revalidation of it can check how much time is left.
+        req.timeouts = self.timeout.merge(timeout)
+        req.deadline = current_deadline()
+        ttl = None
+        if data is None and self.cache is not None:
+            ttl = self.cache.ttl_for(uri)
         try:
-            resp = urlopen(req, data)
-            handler = self.handle_response(resp.read(), req)
-            return handler.handle()
+            if data is None and self.single_flight is not None:
+                key = (req.get_full_url(), req.headers.get('Authorization'))
+                body = self.single_flight.do(
+                    key, lambda: self._retry(
+                        req, lambda: self._shared_body(req, ttl)))
+                if getattr(handler, 'streaming', False):
+                    body = [body]
+            elif ttl is None:
+                return self._retry(req, lambda: self._handle(
+                    self._send_request(req, data), handler, req), data)
+            else:
+                body = self._retry(
+                    req, lambda: self._cached_body(req, ttl, handler))
+            return handler(body, req).handle()
         except HTTPError as err:
             raise DetailedHTTPError(err.filename, err.code, err.msg, err.hdrs,
                                     err.fp)
+        except (URLError, socket.timeout) as err:
+            timeout_error = as_request_timeout(err, req.get_full_url(),
+                                               req.timeouts)
+            if timeout_error is None:
+                raise
+            raise timeout_error
+
+    def _retry(self, req, func, data=None):
+        """Call `func` until it succeeds or :attr:`retry` gives up."""
+        if self.retry is None:
+            return func()
+        attempts = self.retry.attempts('GET' if data is None else 'POST',
+                                       req.deadline)
+        while True:
+            try:
+                return func()
+            except Exception as err:
+                delay = attempts.delay(err)
+                if delay is None:
+                    raise
+                self._log.debug('Retrying %s in %.2fs: %s',
+                                req.get_full_url(), delay, err)
+            time.sleep(delay)
+
+    def _handle(self, resp, handler, req):
+        """Read the body of `resp` and pass it to `handler`.
+
+        This runs inside :meth:`_retry`, so a connection that fails partway
+        through the body is retried like one that fails before it. Handlers
+        that parse lazily would only read the body after that, they're given
+        the whole body instead when there is a retry policy.
+        """
+        if self.retry is not None and getattr(handler, 'lazy', False):
+            body = [b''.join(self._read_body(resp, handler, req))]
+        else:
+            body = self._read_body(resp, handler, req)
+        return handler(body, req).handle()
+
+    def _send_request(self, req, data=None):
+        """:meth:`_open` `req` once :attr:`throttle` allows it."""
+        if self.throttle is None:
+            return self._open(req, data)
+        host = urlsplit(req.get_full_url()).netloc
+        self.throttle.acquire(host)
+        try:
+            resp = self._open(req, data)
+        except HTTPError as err:
+            self.throttle.release(host, err.code, err.hdrs and
+                                  err.hdrs.get('Retry-After'))
+            raise
+        except BaseException:
+            self.throttle.release(host)
+            raise
+        self.throttle.release(host, getattr(resp, 'code', 200))
+        return resp
+
+    def _open(self, req, data=None):
+        """Send `req` and return a file like response object.
+
+        Subclasses can override this to change how requests are sent, it must
+        raise :class:`HTTPError` for error responses the same way
+        :func:`urlopen` does and use :meth:`_timeout` for the timeouts.
+        """
+        return urlopen(req, data, self._timeout(req))
+
+    @staticmethod
+    def _timeout(req):
+        """The timeouts for the next attempt or redirect of `req`, limited
+        by what is left of its deadline.
+
+        Raises:
+            RequestTimeout: If the deadline passed.
+        """
+        timeout = getattr(req, 'timeouts', None) or Timeout()
+        deadline = getattr(req, 'deadline', None)
+        if deadline is None:
+            return timeout
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise RequestTimeout(req.get_full_url(), 'deadline')
+        return timeout.capped(remaining)
+
+    def _read_body(self, resp, handler, req=None):
+        """Read and decode the body of `resp`.
+
+        Streaming handlers get the decoded chunks as they arrive so the body
+        is never held in memory twice, other handlers get the whole body.
+
+        Args:
+            resp: The object returned by :meth:`_open`.
+            handler: The response handler that will be used.
+            req (Optional[urllib2.Request]): The request, its timeouts and
+                deadline apply to reading a streamed body.
+
+        Returns:
+            str, iterable[str]:
+        """
+        if getattr(handler, 'streaming', False):
+            chunks = iter_body(resp, self.transfer_stats)
+            if req is None:
+                return chunks
+            return guard_body(chunks, req.get_full_url(),
+                              getattr(req, 'timeouts', None) or Timeout(),
+                              getattr(req, 'deadline', None))
+        if content_encoding(resp) is None:
+            body = resp.read()
+            self.transfer_stats.count_response()
+            self.transfer_stats.add(len(body), len(body))
+            return body
+        return b''.join(iter_body(resp, self.transfer_stats))
+
+    def _shared_body(self, req, ttl):
+        """Read the whole body for `req` so it can be given to every caller
+        waiting for it.
+
+        A body that was cut off raises :class:`IncompleteRead` in every
+        caller instead of being shared.
+        """
+        if ttl is None:
+            return b''.join(iter_body(self._send_request(req),
+                                      self.transfer_stats))
+        return self._cached_body(req, ttl, None)
+
+    def _cached_body(self, req, ttl, handler):
+        """Get the body for `req` from the cache, sending the request and
+        storing its body on a miss.
+        """
+        key = self.cache.key(req.get_full_url(), req.headers)
+        entry = self.cache.lookup(key)
+        if entry is None or not entry.is_fresh():
+            entry = self._revalidate(req, key, entry, ttl)
+        if getattr(handler, 'streaming', False):
+            return [entry.body]
+        return entry.body
+
+    def _revalidate(self, req, key, entry, ttl):
+        """Send `req`, conditionally if there is a stale entry, and store the
+        response.
+        """
+        if entry is not None:
+            for name, value in entry.validators.items():
+                req.add_header(name, value)
+        try:
+            resp = self._send_request(req)
+        except HTTPError as err:
+            if err.code == 304 and entry is not None:
+                return self.cache.revalidated(key, entry, ttl, err.hdrs)
+            raise
+        # NOTE(Sinap): iter_body raises for a body that was cut off, so only
+        # complete ones are stored.
+        body = b''.join(iter_body(resp, self.transfer_stats))
+        return self.cache.set(key, body, ttl, getattr(resp, 'headers', None))
 
     def _create_request(self, uri):
         """Builds :class:`urllib2.Request` object using `uri` and sets the
-        headers to `headers`.
+        headers to a copy of `headers`.
 
         Args:
             uri (str): This will be concatenated to `host`
@@ -119,18 +504,166 @@ class HTTPClient(HTTPClientBase):
             urllib2.Request: A request object that will be used by
                 :class:`urllib2.urlopen`
         """
-        req = Request(self._build_url(uri), headers=self.headers)
+        url = self._build_url(uri)
+        with self._lock:
+            req = Request(url, headers=self.headers)
+            self._previous_requests.appendleft(req)
         self._log.debug(
             'Calling %s on %s', req.get_method(), req.get_full_url())
         return req
 
-    def _build_url(self, uri):
-        if uri.startswith('http'):
-            return uri
-        if uri[0] == '/':
-            return self.host + uri
+    def __repr__(self):
+        return '<HTTPClient: {}>'.format(self.host)
+
+
+class _PooledResponse(object):
+    """Wraps a response so the connection goes back to the pool once the body
+    has been read.
+    """
+
+    def __init__(self, resp, conn, pool, url):
+        self._resp = resp
+        self._conn = conn
+        self._pool = pool
+        self.url = url
+        self.code = self.status = resp.status
+        self.msg = self.reason = resp.reason
+        self.headers = resp.msg
+
+    def read(self, amt=None):
+        if self._conn is None:
+            return b''
+        try:
+            data = self._resp.read() if amt is None else self._resp.read(amt)
+        except Exception:
+            self.close()
+            raise
+        if not data and self._resp.length:
+            # the server closed the connection before the whole body
+            # arrived
+            self.close()
+        elif amt is None or not data:
+            self._release()
+        return data
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+    def close(self):
+        """Close the response, a partially read body can't be reused so the
+        connection is closed too.
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _release(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._resp.will_close:
+            conn.close()
         else:
-            return self.host + '/' + uri
+            self._pool.put(conn)
+
+
+class PooledHTTPClient(HTTPClient):
+    """An :class:`HTTPClient` that keeps HTTP/1.1 connections alive.
+
+    Connections are pooled per scheme, host and port so consecutive requests
+    skip the TCP and TLS handshakes. Idle connections that were closed by the
+    server are detected and replaced, and a request that fails on a reused
+    connection before a response arrives is sent again on a new one. Only
+    `resend_methods` are sent again once the request went out, the others
+    are left to :attr:`retry`.
+
+    The client is safe to share between threads.
+    """
+    redirect_codes = (301, 302, 303, 307, 308)
+    max_redirects = 10
+    resend_methods = frozenset(['GET', 'HEAD'])
+
+    def __init__(self, host, response_handler=None, pool_size=10,
+                 idle_timeout=60.0, **kwargs):
+        """
+        Args:
+            host (str): This is usually a domain.
+            response_handler: See :class:`HTTPClient`.
+            pool_size (int): The number of idle connections to keep per host.
+            idle_timeout (float): Seconds before an idle connection is closed.
+            **kwargs: Passed on to :class:`HTTPClient`.
+        """
+        super(PooledHTTPClient, self).__init__(host, response_handler,
+                                               **kwargs)
+        self.pools = PoolManager(pool_size, idle_timeout)
+
+    def close(self):
+        """Close all idle connections."""
+        self.pools.close()
+
+    def _open(self, req, data=None):
+        url = req.get_full_url()
+        method = 'GET' if data is None else 'POST'
+        headers = dict(req.header_items())
+        if data is not None:
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            headers.setdefault('Content-type',
+                               'application/x-www-form-urlencoded')
+        for _ in range(self.max_redirects + 1):
+            resp = self._send(method, url, data, headers, self._timeout(req))
+            location = resp.headers.get('Location')
+            if resp.code not in self.redirect_codes or not location:
+                break
+            resp.read()
+            url = urljoin(url, location)
+            if resp.code == 303 or (resp.code in (301, 302) and
+                                    method == 'POST'):
+                method, data = 'GET', None
+                headers.pop('Content-type', None)
+        if not 200 <= resp.code < 300:
+            # NOTE(Sinap): same as urlopen, read the body so the connection
+            # can go back to the pool.
+            raise HTTPError(url, resp.code, resp.reason, resp.headers,
+                            io.BytesIO(resp.read()))
+        return resp
+
+    def _send(self, method, url, body, headers, timeout):
+        parts = urlsplit(url)
+        pool = self.pools.pool_for(parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path = '{}?{}'.format(path, parts.query)
+        while True:
+            conn, reused = pool.get()
+            sent = False
+            try:
+                if conn.sock is None:
+                    conn.timeout = _seconds(timeout.connect)
+                    conn.connect()
+                conn.sock.settimeout(_seconds(timeout.read))
+                conn.request(method, path, body, headers)
+                sent = True
+                resp = conn.getresponse()
+            except (socket.error, HTTPException) as err:
+                conn.close()
+                if reused and not isinstance(err, socket.timeout) and (
+                        not sent or method in self.resend_methods):
+                    # NOTE(Sinap): the server can close a keep-alive
+                    # connection at any time, that shows up as an error before
+                    # any response is read. A POST may still have reached the
+                    # server so it's only sent again if it never went out.
+                    self._log.debug('Reused connection failed: %s', err)
+                    continue
+                if isinstance(err, socket.error) and not sent:
+                    # same as urlopen, errors reading the response are
+                    # raised as they are
+                    raise URLError(err)
+                raise
+            return _PooledResponse(resp, conn, pool, url)
 
     def __repr__(self):
-        return '<HTTPClient: {}>'.format(self.host)
+        return '<PooledHTTPClient: {}>'.format(self.host)
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import collections
+import heapq
+import io
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from ._compat import text_type, replace_file
+
+__all__ = ['CatalogIndex', 'SearchHit', 'fold']
+
+SearchHit = collections.namedtuple('SearchHit', ['id', 'title', 'score'])
+SearchHit.__doc__ = """A show found by :meth:`CatalogIndex.search`.
+
+Attributes:
+    id (int): The show ID, see :meth:`FunimationLater.get_show`.
+    title (str):
+    score (float): Higher is a better match.
+"""
+
+_Entry = collections.namedtuple('_Entry', ['id', 'title', 'added', 'folded',
+                                           'tokens'])
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(text):
+    """Normalize `text` for matching.
+
+    Accents are removed, the case is folded and everything that isn't a
+    letter or digit becomes a space, so `Pokémon: XY` and `pokemon xy` fold
+    to the same string.
+
+    Args:
+        text (str):
+
+    Returns:
+        str:
+    """
+    if not isinstance(text, text_type):
+        text = text.decode('utf-8')
+    text = unicodedata.normalize('NFKD', text)
+    text = u''.join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold() if hasattr(text, 'casefold') else text.lower()
+    return u' '.join(_word_re.findall(text.replace(u'_', u' ')))
+
+
+def _ngrams(token, n):
+    if len(token) <= n:
+        return [token]
+    return [token[i:i + n] for i in range(len(token) - n + 1)]
+
+
+class CatalogIndex(object):
+    """An in memory index of show titles for searching without the API.
+
+    Every folded title word is indexed under all of its prefixes so the last
+    word of a query can be incomplete, which is what autocomplete sends. A
+    query where some word matches no title falls back to the `ngram`
+    character n-grams of the words, which finds titles with typos or words
+    in the middle of another one.
+
+    :meth:`FunimationLater.refresh_index` keeps it up to date by applying
+    the :class:`funimationlater.sync.ChangeSet` of each sync with
+    :meth:`apply`.
+
+    The index is safe to share between threads.
+
+    Attributes:
+        watermark (int): The newest `added` timestamp of the indexed shows,
+            None if none of them had one.
+    """
+    version = 1
+    ngram = 3
+    max_prefix = 16
+
+    def __init__(self):
+        super(CatalogIndex, self).__init__()
+        self.watermark = None
+        self._entries = {}
+        self._prefixes = collections.defaultdict(set)
+        # NOTE(Sinap): built by the first query that needs it, most queries
+        # never do and it costs as much as the prefixes.
+        self._ngrams = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_shows(cls, shows):
+        """
+        Args:
+            shows (iterable[funimationlater.models.Show]):
+
+        Returns:
+            CatalogIndex:
+        """
+        index = cls()
+        index.update(shows)
+        return index
+
+    def add(self, show_id, title, added=None):
+        """Add a show or replace the one with the same ID.
+
+        Args:
+            show_id (int):
+            title (str):
+            added (Optional[int]): See
+                :attr:`funimationlater.models.Show.added`.
+
+        Returns:
+            bool: True if the show is new or its title changed.
+        """
+        folded = fold(title)
+        tokens = tuple(folded.split())
+        with self._lock:
+            old = self._entries.get(show_id)
+            changed = old is None or old.title != title
+            if old is not None and old.folded != folded:
+                self._unindex(old)
+            if added is not None and (self.watermark is None or
+                                      added > self.watermark):
+                self.watermark = added
+            if old is not None and added is None:
+                added = old.added
+            self._entries[show_id] = entry = _Entry(show_id, title, added,
+                                                    folded, tokens)
+            if old is None or old.folded != folded:
+                self._index(entry)
+        return changed
+
+    def update(self, shows):
+        """Add several :class:`funimationlater.models.Show`.
+
+        Returns:
+            int: The number of shows that were new or had a new title.
+        """
+        return sum(self.add(show.id, show.title, show.added)
+                   for show in shows)
+
+    def apply(self, changes):
+        """Apply a :class:`funimationlater.sync.ChangeSet`."""
+        self.update(changes.added)
+        self.update(changes.updated)
+        for show_id in changes.removed:
+            self.remove(show_id)
+
+    def remove(self, show_id):
+        """Remove a show, does nothing if it isn't indexed."""
+        with self._lock:
+            entry = self._entries.pop(show_id, None)
+            if entry is not None:
+                self._unindex(entry)
+
+    def _prefix_keys(self, entry):
+        keys = set()
+        for token in entry.tokens:
+            for end in range(1, min(len(token), self.max_prefix) + 1):
+                keys.add(token[:end])
+        return keys
+
+    def _ngram_keys(self, entry):
+        keys = set()
+        for token in entry.tokens:
+            keys.update(_ngrams(token, self.ngram))
+        return keys
+
+    def _index(self, entry):
+        show_id = entry.id
+        postings = self._prefixes
+        for key in self._prefix_keys(entry):
+            postings[key].add(show_id)
+        postings = self._ngrams
+        if postings is not None:
+            for key in self._ngram_keys(entry):
+                postings[key].add(show_id)
+
+    def _unindex(self, entry):
+        pairs = [(self._prefixes, self._prefix_keys(entry))]
+        if self._ngrams is not None:
+            pairs.append((self._ngrams, self._ngram_keys(entry)))
+        for postings, keys in pairs:
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(entry.id)
+                    if not ids:
+                        del postings[key]
+
+    def search(self, query, limit=10):
+        """Find the shows whose titles match `query` best.
+
+        A title matches when every word of the query is the start of one of
+        its words. Whole words score higher than prefixes, and titles that
+        start with the query or are shorter come first.
+
+        Args:
+            query (str):
+            limit (int): The most results to return.
+
+        Returns:
+            list[SearchHit]:
+        """
+        folded = fold(query)
+        words = folded.split()
+        if not words or limit <= 0:
+            return []
+        with self._lock:
+            candidates = None
+            for word in words:
+                ids = self._prefixes.get(word[:self.max_prefix])
+                if not ids:
+                    return self._fuzzy(words, limit)
+                if candidates is None:
+                    candidates = set(ids)
+                else:
+                    candidates &= ids
+                if not candidates:
+                    return self._fuzzy(words, limit)
+            entries = [self._entries[show_id] for show_id in candidates]
+        # NOTE(Sinap): only prefixes up to max_prefix are indexed, longer
+        # words have to be checked against the titles.
+        check = any(len(word) > self.max_prefix for word in words)
+        ranked = []
+        for entry in entries:
+            tokens = entry.tokens
+            if check and not all(any(t.startswith(w) for t in tokens)
+                                 for w in words):
+                continue
+            score = len(words) + 1.0 / (1 + len(tokens))
+            for word in words:
+                if word in tokens:
+                    score += 1.0
+            if entry.folded.startswith(folded):
+                score += 2.0
+            ranked.append((-score, entry.title, entry.id))
+        # NOTE(Sinap): short prefixes match many titles, only build hits for
+        # the ones that are returned.
+        return [SearchHit(show_id, title, -score) for score, title, show_id
+                in heapq.nsmallest(limit, ranked)]
+
+    def _fuzzy(self, words, limit):
+        """Rank titles by the share of the query's n-grams they contain.
+
+        Must be called with the lock held.
+        """
+        if self._ngrams is None:
+            self._ngrams = collections.defaultdict(set)
+            for entry in self._entries.values():
+                for key in self._ngram_keys(entry):
+                    self._ngrams[key].add(entry.id)
+        grams = [gram for word in words for gram in _ngrams(word, self.ngram)]
+        counts = collections.Counter()
+        for gram in grams:
+            counts.update(self._ngrams.get(gram, ()))
+        needed = max(1, len(grams) // 2)
+        hits = []
+        for show_id, count in counts.items():
+            if count < needed:
+                continue
+            entry = self._entries.get(show_id)
+            if entry is not None:
+                hits.append(SearchHit(entry.id, entry.title,
+                                      float(count) / len(grams)))
+        return heapq.nsmallest(limit, hits,
+                               key=lambda hit: (-hit.score, hit.title))
+
+    def save(self, path):
+        """Write the index to `path`.
+
+        Only the shows are written, the postings are rebuilt by :meth:`load`
+        which is about as fast as reading them would be. The file is
+        replaced atomically so a reader never sees half of it.
+        """
+        with self._lock:
+            state = {
+                'version': self.version,
+                'watermark': self.watermark,
+                'shows': [[e.id, e.title, e.added]
+                          for e in self._entries.values()],
+            }
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with io.open(tmp, 'w', encoding='utf-8') as fp:
+            fp.write(text_type(json.dumps(state, ensure_ascii=False,
+                                          separators=(',', ':'))))
+        replace_file(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by :meth:`save`.
+
+        Raises:
+            ValueError: If the file was written by an incompatible version.
+        """
+        with io.open(path, encoding='utf-8') as fp:
+            state = json.load(fp)
+        if state.get('version') != cls.version:
+            raise ValueError('unsupported index version: {}'.format(
+                state.get('version')))
+        index = cls()
+        for show_id, title, added in state['shows']:
+            index.add(show_id, title, added)
+        index.watermark = state['watermark']
+        return index
+
+    def __contains__(self, show_id):
+        return show_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return '<CatalogIndex: {} shows>'.format(len(self))
@@ -1,47 +1,179 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
+import bisect
+import collections
+import re
+
 from .constants import AudioType
-from .response_handler import NullHandler
+from .response_handler import XMLResponse, StreamingXMLResponse
 from .error import UnknownSeason, UnknownEpisode
+from .hls import PlaylistCache, PlaylistHandler
+from .schema import Schema
 
 __all__ = ['Media', 'EpisodeContainer', 'Show', 'ShowDetails', 'Season',
-           'Episode', 'EpisodeDetails']
+           'SeasonRequest', 'Episode', 'EpisodeDetails', 'parse_items']
+
+SeasonRequest = collections.namedtuple(
+    'SeasonRequest', ['number', 'title', 'path', 'params', 'target'])
+SeasonRequest.__doc__ = """Everything needed to request one season of a show.
+
+Attributes:
+    number (int): The season number.
+    title (str): The season title, e.g. `Season 1` or `Movie`.
+    path (str):
+    params (str): The query string including the season.
+    target (str): The key of the response that holds the season.
+"""
+
+
+class _IndexedList(list):
+    """A list that keeps a dict of its items by the keys returned by
+    :meth:`_keys` so lookups don't have to scan it.
+
+    When several items have the same key the first one wins, like it would
+    with a linear search.
+    """
+
+    def __init__(self, iterable=()):
+        super(_IndexedList, self).__init__(iterable)
+        self._reindex()
+
+    def _keys(self, item):
+        raise NotImplementedError
+
+    def _reindex(self):
+        self._index = {}
+        self._add(self)
+
+    def _add(self, items):
+        for item in items:
+            for key in self._keys(item):
+                self._index.setdefault(key, item)
+        self._sorted_keys = None
+
+    def append(self, item):
+        super(_IndexedList, self).append(item)
+        self._add((item,))
+
+    def extend(self, items):
+        items = list(items)
+        super(_IndexedList, self).extend(items)
+        self._add(items)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __reduce__(self):
+        # NOTE(Sinap): pickle and copy would otherwise call the overridden
+        # extend before __init__ has made the index, or share the index.
+        return type(self), (list(self),)
+
+    def clear(self):
+        del self[:]
+
+    def _mutator(name):
+        method = getattr(list, name)
+
+        def wrapper(self, *args, **kwargs):
+            result = method(self, *args, **kwargs)
+            self._reindex()
+            return result
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    # NOTE(Sinap): these can drop or reorder items, rebuilding is simpler
+    # than working out what changed.
+    insert = _mutator('insert')
+    remove = _mutator('remove')
+    pop = _mutator('pop')
+    sort = _mutator('sort')
+    reverse = _mutator('reverse')
+    __setitem__ = _mutator('__setitem__')
+    __delitem__ = _mutator('__delitem__')
+    if hasattr(list, '__setslice__'):
+        __setslice__ = _mutator('__setslice__')
+        __delslice__ = _mutator('__delslice__')
+    del _mutator
+
+    def get_many(self, items):
+        """Look up several items at once.
+
+        Args:
+            items: The keys to look up.
+
+        Returns:
+            list: The items in the same order as `items`.
+        """
+        return [self[item] for item in items]
 
 
-class EpisodeContainer(list):
+class EpisodeContainer(_IndexedList):
     """The purpose of this class is to return the correct episode number
         when using an index.
     """
 
+    def _keys(self, episode):
+        return (episode.episode_number,)
+
     def __getitem__(self, item):
         """Get an episode using index notation.
 
+        Slicing uses episode numbers too and works like `range`, so
+        `season[1:13]` are the episodes numbered from 1 up to, but not
+        including, 13. Fractional episodes like 12.5 are included.
+
         Args:
-            item (int): The episode number
+            item (Union[float,slice]): The episode number or a range of them.
 
         Returns:
             funimationlater.models.Episode: Returns the details of the
-                requested episode
+                requested episode. A slice returns an `EpisodeContainer`
+                sorted by episode number.
 
         Raises:
             InvalidEpisode: If the episode doesn't exist
         """
-        for episode in self:
-            if episode.episode_number == item:
-                return episode
-        raise UnknownEpisode()
-
+        if isinstance(item, slice):
+            return self._slice(item.start, item.stop, item.step)
+        try:
+            return self._index[item]
+        except (KeyError, TypeError):
+            raise UnknownEpisode()
+
+    if hasattr(list, '__getslice__'):
+        def __getslice__(self, start, stop):
+            return self._slice(start, stop)
+
+    def _slice(self, start, stop, step=None):
+        if step is not None:
+            raise ValueError('slicing episodes does not support a step')
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._index)
+        keys = self._sorted_keys
+        low = 0 if start is None else bisect.bisect_left(keys, start)
+        high = len(keys) if stop is None else bisect.bisect_left(keys, stop)
+        return EpisodeContainer(self._index[key] for key in keys[low:high])
+
+
+class SeasonContainer(_IndexedList):
+    def _keys(self, season):
+        if season.number is None:
+            return (season.title,)
+        return (season.title, season.number)
 
-class SeasonContainer(list):
     def __getitem__(self, item):
-        """
+        """Get a season by title or number.
+
         Returns:
-            funimationlater.models.Season:
+            funimationlater.models.Season: None if there's no such season.
         """
-        for season in self:
-            if season.title == item:
-                return season
+        try:
+            return self._index.get(item)
+        except TypeError:
+            return None
 
 
 class Pointer(object):
@@ -97,6 +229,20 @@ class Thumbnail(object):
 
 
 class Media(object):
+    """Base media object.
+
+    The models only keep the fields they use. Set `retain_data` to True to
+    also keep the parsed response in `_data`, which is handy when debugging
+    but costs several times the memory of the model itself.
+
+    Models with a `schema` are parsed straight from the XML, only the paths
+    in the schema are converted. When `retain_data` is set the whole
+    response is converted instead.
+    """
+    __slots__ = ['pointer', 'title', 'client', '_data']
+    retain_data = False
+    schema = None
+
     def __init__(self, data, client):
         """Base media object
 
@@ -117,17 +263,93 @@ class Media(object):
         #              UnicodeEncodeError on title's containing unicode chars.
         self.title = data['title'].encode('utf-8').decode('utf-8')
         self.client = client
-        self._data = data
+        self._data = data if self.retain_data else None
 
     def invoke(self):
-        resp = self.client.get(self.pointer.path, self.pointer.params)
-        return resp[self.pointer.target]
+        """Follow the pointer.
+
+        Returns: The result of :meth:`_build`, or an awaitable of it when the
+            client is asynchronous.
+        """
+        return self._fetch(self.pointer.params, self._build)
+
+    def _fetch(self, params, build, handler=None):
+        target = self.pointer.target
+        return self.client.fetch(self.pointer.path, params,
+                                 lambda resp: build(resp[target]),
+                                 handler=handler)
+
+    @classmethod
+    def response_handler(cls, streaming=False):
+        """Get the response handler for responses holding this model.
+
+        Args:
+            streaming (bool): True for a handler that yields each `item` of
+                the response, see :class:`StreamingXMLResponse`.
+
+        Returns:
+            type:
+        """
+        if cls.schema is None or cls.retain_data:
+            return StreamingXMLResponse if streaming else XMLResponse
+        return cls.schema.handler(streaming)
+
+    def _build(self, data):
+        """Turn the data the pointer points to into a model."""
+        return data
+
+    def __getstate__(self):
+        # NOTE(Sinap): the client holds sockets and locks so it's never
+        # pickled, whoever unpickles a model has to set it again.
+        state = {}
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if slot != 'client' and hasattr(self, slot):
+                    state[slot] = getattr(self, slot)
+        return state
+
+    def __setstate__(self, state):
+        self.client = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
 
     def __repr__(self):
         return '<{}: {}>'.format(self.__class__.__name__, self.title)
 
 
+def parse_items(body, model, client=None):
+    """Build a `model` for every `item` of an XML response.
+
+    This is a plain function so it can run in a process pool, in which case
+    `client` is None and has to be set on the results once they're back.
+
+    Args:
+        body (bytes): The XML.
+        model (type): A :class:`Media` subclass.
+        client (Optional[HTTPClient]):
+
+    Returns:
+        list[Media]:
+    """
+    handler = model.response_handler(streaming=True)
+    return [model(item, client) for item in handler(body, None).handle()]
+
+
 class Show(Media):
+    """
+    Attributes:
+        recent_item (str): The newest episode, e.g. `Episode 17`.
+        added (int): When `recent_item` was added as a UNIX timestamp, None
+            if the response didn't say.
+    """
+    __slots__ = ['thumbnail', 'id', 'show_id', 'recent_item', 'added',
+                 '_details']
+    schema = Schema(['title', 'id', 'thumbnail', 'pointer',
+                     'legend/button/pointer/toggle/data/params',
+                     'content/metadata/recentContentItem',
+                     'content/metadata/recentlyAdded'])
+    _added_re = re.compile(r'\{(\d+)\}')
+
     def __init__(self, data, client):
         super(Show, self).__init__(data, client)
         self.thumbnail = Thumbnail(**data['thumbnail'])
@@ -139,35 +361,69 @@ class Show(Media):
         else:
             pointer = button['pointer']
         self.show_id = pointer['toggle']['data']['params'].split('=')[1]
+        self.recent_item = self.added = None
         if 'content' in data:
-            self.recent_item = data['content']['metadata']['recentContentItem']
-        else:
-            self.recent_item = None
+            metadata = data['content']['metadata']
+            self.recent_item = metadata['recentContentItem']
+            # NOTE(Sinap): looks like `added {1457731800} ago`, the client is
+            # supposed to format the timestamp.
+            match = self._added_re.search(metadata.get('recentlyAdded') or '')
+            if match:
+                self.added = int(match.group(1))
+        self._details = None
 
     def get_details(self):
-        """Get details about the show
+        """Get details about the show.
+
+        The details are only requested once, use :meth:`refresh` to get them
+        again.
 
         Returns:
             funimationlater.models.ShowDetails:
         """
-        return self.invoke()
+        if self._details is None:
+            return self.invoke()
+        return self.client.result(self._details)
 
-    def invoke(self):
-        return ShowDetails(super(Show, self).invoke(), self.client)
+    def refresh(self):
+        """Forget the details and seasons and request them again.
+
+        Returns:
+            funimationlater.models.ShowDetails:
+        """
+        self._details = None
+        return self.get_details()
+
+    def _build(self, data):
+        self._details = ShowDetails(data, self.client)
+        return self._details
 
     def __getitem__(self, item):
         """
         Returns:
-            funimationlater.models.Season:
+            funimationlater.models.Season: An awaitable of it when the
+                client is asynchronous.
         """
-        return self.get_details().get_season(item)
+        return self.client.then(self.get_details(),
+                                lambda details: details.get_season(item))
 
     def __iter__(self):
         """
         Returns:
             funimationlater.models.Season:
+
+        Raises:
+            TypeError: If the client is asynchronous, use
+                `await show.get_details()` and
+                :meth:`ShowDetails.get_seasons` instead.
         """
-        details = self.invoke()
+        if getattr(self.client, 'asynchronous', False):
+            raise TypeError('iterating over a show needs a synchronous '
+                            'client, use get_details().get_seasons()')
+        return self._iter_seasons()
+
+    def _iter_seasons(self):
+        details = self.get_details()
         for season in details.seasons:
             result = details.get_season(season)
             if result:
@@ -175,6 +431,9 @@ class Show(Media):
 
 
 class ShowDetails(Media):
+    __slots__ = ['description', 'format', 'release_year', 'thumbnail',
+                 'seasons', 'season', '_season_requests', '_season_cache']
+
     def __init__(self, data, client):
         super(ShowDetails, self).__init__(data, client)
         hero = data['hero']['item']
@@ -197,6 +456,20 @@ class ShowDetails(Media):
         else:
             self.seasons = {int(button['value']): button['title']}
         self.season = [x for x in self.seasons][0]
+        self._season_requests = None
+        self._season_cache = {}
+
+    @property
+    def season_requests(self):
+        """dict[int,SeasonRequest]: How to request each season."""
+        if self._season_requests is None:
+            self._season_requests = {
+                number: SeasonRequest(
+                    number, title, self.pointer.path,
+                    '{}&season={}'.format(self.pointer.params, number),
+                    self.pointer.target)
+                for number, title in self.seasons.items()}
+        return self._season_requests
 
     @property
     def has_movie(self):
@@ -207,7 +480,7 @@ class ShowDetails(Media):
         return 'OVS' in self.seasons.values()
 
     def get_season(self, season=1):
-        """
+        """Get a season, each season is only requested once.
 
         Args:
             season (int):
@@ -215,18 +488,62 @@ class ShowDetails(Media):
         Returns:
             funimationlater.models.Season:
         """
-        self.season = season
-        self.pointer.params = '{}&season={}'.format(self.pointer.params,
-                                                    self.season)
-        return self.invoke()
+        if season in self._season_cache:
+            return self.client.result(self._season_cache[season])
+        return self.client.fetch(*self._season_fetch(season))
+
+    def get_seasons(self, parallel=True, max_workers=None):
+        """Get every season of the show.
+
+        Seasons that weren't requested before are requested at the same time
+        unless `parallel` is False.
+
+        Args:
+            parallel (bool):
+            max_workers (Optional[int]): The number of seasons requested at
+                once.
+
+        Returns:
+            funimationlater.models.SeasonContainer: The seasons that have
+                episodes, in order.
+        """
+        missing = [self._season_fetch(season)
+                   for season in sorted(self.seasons)
+                   if season not in self._season_cache]
+        return self.client.fetch_many(missing, self._collect_seasons,
+                                      max_workers if parallel else 1)
+
+    def _collect_seasons(self, _):
+        return SeasonContainer(self._season_cache[season]
+                               for season in sorted(self.seasons)
+                               if self._season_cache[season])
+
+    def _season_fetch(self, season):
+        try:
+            request = self.season_requests[season]
+        except KeyError:
+            raise UnknownSeason('valid seasons are: {}'.format(
+                ', '.join(self.seasons.values())))
+        return (request.path, request.params,
+                lambda items: self._build(items, season),
+                Episode.response_handler(streaming=True))
 
     def invoke(self):
-        data = super(ShowDetails, self).invoke()
-        if data['items']:
-            return Season(
-                data['items'], self.client, self.seasons[self.season])
+        return self.get_season(self.season)
+
+    def refresh(self):
+        """Forget the seasons so they are requested again."""
+        self._season_cache.clear()
+
+    def _build(self, items, season=None):
+        items = list(items)
+        if items:
+            result = Season({'item': items}, self.client,
+                            self.seasons[season], season)
         else:
-            return []
+            result = []
+        self._season_cache[season] = result
+        return result
 
     def __getitem__(self, item):
         """Get a specific season using `[]`
@@ -240,11 +557,7 @@ class ShowDetails(Media):
         Raises:
             funimationlater.error.UnknownSeason:
         """
-        for season in self.seasons:
-            if item == season:
-                return self.get_season(item)
-        raise UnknownSeason('valid seasons are: {}'.format(
-            ', '.join(self.seasons.values())))
+        return self.get_season(item)
 
     def __iter__(self):
         """
@@ -256,10 +569,13 @@ class ShowDetails(Media):
 
 
 class Season(Media):
-    def __init__(self, data, client, season):
+    __slots__ = ['season', 'number', '_episodes']
+
+    def __init__(self, data, client, season, number=None):
         data['title'] = season
         super(Season, self).__init__(data, client)
         self.season = season
+        self.number = number
         if isinstance(data['item'], list):
             self._episodes = EpisodeContainer(
                 [Episode(x, self.client) for x in data['item']])
@@ -270,13 +586,23 @@ class Season(Media):
     def __getitem__(self, item):
         """
         Args:
-            item (int): Episode number
+            item (Union[float,slice]): Episode number, or a range of them.
 
         Returns:
             funimationlater.models.Episode:
         """
         return self._episodes[item]
 
+    def get_many(self, numbers):
+        """
+        Args:
+            numbers (list[float]): Episode numbers.
+
+        Returns:
+            list[funimationlater.models.Episode]:
+        """
+        return self._episodes.get_many(numbers)
+
     def __iter__(self):
         """
         Returns:
@@ -287,6 +613,13 @@ class Season(Media):
 
 
 class Episode(Media):
+    __slots__ = ['_audio', 'description', 'duration', 'format',
+                 'episode_number', '_languages', '_original_params']
+    schema = Schema(['title', 'pointer', 'content/description',
+                     'content/metadata/duration', 'content/metadata/format',
+                     'content/metadata/episodeNumber',
+                     'content/metadata/languages'])
+
     # noinspection PyTypeChecker
     def __init__(self, data, client):
         super(Episode, self).__init__(data, client)
@@ -297,12 +630,23 @@ class Episode(Media):
         self.duration = int(metadata['duration'])
         self.format = metadata['format']
         self.episode_number = float(metadata['episodeNumber'])
-        if metadata['languages']:
-            self.languages = metadata['languages'].split(',')
-        else:
-            self.languages = None
+        self._languages = metadata['languages'] or None
         self._original_params = self.pointer.params
 
+    @property
+    def languages(self):
+        """list[str]: None if the languages aren't known."""
+        if self._languages is None:
+            return None
+        return self._languages.split(',')
+
+    @property
+    def original_params(self):
+        """str: The query string of the pointer, before :meth:`get_dub` or
+        :meth:`get_sub` chose the audio.
+        """
+        return self._original_params
+
     def get_dub(self):
         """Get the Dub episode
 
@@ -329,15 +673,32 @@ class Episode(Media):
         return self.invoke()
 
     def invoke(self):
+        params = self._original_params
         if self._audio:
-            self.pointer.params = self.pointer.params.replace(
-                'explicit:', '').format(autoPlay=1, audio=self._audio)
-        else:
-            self.pointer.params = self._original_params
-        return EpisodeDetails(super(Episode, self).invoke(), self.client)
+            params = params.replace('explicit:', '').format(
+                autoPlay=1, audio=self._audio)
+        return self._fetch(params, self._build,
+                           EpisodeDetails.response_handler())
+
+    def _build(self, data):
+        return EpisodeDetails(data, self.client)
 
 
 class EpisodeDetails(Media):
+    __slots__ = ['video_url', 'closed_caption_url', 'video_id', 'thumbnail',
+                 'duration', 'episode', 'season', 'show_name', 'params',
+                 'path', 'target', 'ratings']
+    playlist_cache = PlaylistCache()
+    schema = Schema(['item/video/title', 'item/video/subtitle',
+                     'item/video/id', 'item/video/thumbnail',
+                     'item/video/pointer',
+                     'item/video/content/metadata/duration',
+                     'item/video/content/metadata/episode',
+                     'item/video/content/metadata/season',
+                     'item/video/content/metadata/showName',
+                     'item/hls/url', 'item/hls/closedCaptionUrl',
+                     'item/related/alternate', 'item/ratings/tv'])
+
     def __init__(self, data, client):
         video = data['item']['video']
         super(EpisodeDetails, self).__init__(video, client)
@@ -363,6 +724,24 @@ class EpisodeDetails(Media):
         self.ratings = [(r['@region'], r['#text'] if '#text' in r else '')
                         for r in data['item']['ratings']['tv']]
 
+    def get_playlist(self):
+        """Get the master playlist that lists every stream quality.
+
+        The playlist is requested once and kept in :attr:`playlist_cache`,
+        set it to None to request it every time.
+
+        Returns:
+            funimationlater.hls.MasterPlaylist:
+        """
+        return self._playlist(lambda playlist: playlist)
+
+    def get_variants(self):
+        """
+        Returns:
+            list[funimationlater.hls.Variant]: The streams of every quality.
+        """
+        return self._playlist(lambda playlist: playlist.variants)
+
     def get_stream(self, quality=None):
         """Get the m3u URL for a specific stream quality.
 
@@ -377,24 +756,21 @@ class EpisodeDetails(Media):
             str: A url to an m3u file.
         """
         if quality is None:
-            return self.video_url
-        # replace the response handler with one that does nothing to the
-        # response then put the original back.
-        handler = self.client.handle_response
-        try:
-            self.client.handle_response = NullHandler
-            resp = self.client.get(self.video_url).decode('utf-8')
-            quality = 'Layer{}'.format(quality)
-            for line in resp.split('\n'):
-                if quality in line:
-                    # pull out file from url and replace with file from
-                    # m3u8 file.
-                    url = self.video_url.split('/')[:-1] + [line]
-                    return '/'.join(url)
-        finally:
-            self.client.handle_response = handler
-        # specific quality wasn't found. just return original video url.
-        return self.video_url
+            return self.client.result(self.video_url)
+        return self._playlist(lambda playlist: playlist.stream_url(quality))
+
+    def _playlist(self, callback):
+        cache = self.playlist_cache
+        url = self.video_url
+        playlist = cache.get(url) if cache is not None else None
+        if playlist is not None:
+            return self.client.result(callback(playlist))
+
+        def build(playlist):
+            if cache is not None:
+                cache.set(url, playlist)
+            return callback(playlist)
+        return self.client.fetch(url, None, build, handler=PlaylistHandler)
 
     def get_related(self):
         """Get shows related to this one.
@@ -404,7 +780,6 @@ class EpisodeDetails(Media):
         """
         return self.invoke()
 
-    def invoke(self):
-        data = super(EpisodeDetails, self).invoke()
+    def _build(self, data):
         data['title'] = data['hero']['item']['title']
         return ShowDetails(data, self.client)
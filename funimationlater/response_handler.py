@@ -4,16 +4,75 @@ try:
     import xml.etree.cElementTree as Et
 except ImportError:
     import xml.etree.ElementTree as Et
+from ._compat import string_types
 from .utils import etree_to_dict, CaseInsensitiveDict
 
-__all__ = ['ResponseHandler', 'XMLResponse', 'NullHandler']
+__all__ = ['ResponseHandler', 'XMLResponse', 'StreamingXMLResponse',
+           'NullHandler']
+
+
+class _ChunkReader(object):
+    """A file like object over an iterable of chunks for
+    :func:`Et.iterparse`.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def read(self, size=-1):
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b''
+
+
+def iterparse_chunks(chunks, events=('start', 'end')):
+    """Incrementally parse XML that arrives in chunks.
+
+    Args:
+        chunks (iterable[str]):
+        events (tuple[str]): The events to report.
+
+    Yields:
+        tuple(str, Element): The event and the element.
+    """
+    if not hasattr(Et, 'XMLPullParser'):
+        # NOTE(Sinap): Python 2 doesn't have XMLPullParser.
+        for event in Et.iterparse(_ChunkReader(chunks), events):
+            yield event
+        return
+    parser = Et.XMLPullParser(events)
+    fed = False
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        fed = True
+        for event in parser.read_events():
+            yield event
+    if fed:
+        parser.close()
+        for event in parser.read_events():
+            yield event
 
 
 class ResponseHandler(object):
+    """Base class for response handlers.
+
+    Attributes:
+        streaming (bool): When True the handler is given an iterable of
+            decoded chunks as they arrive instead of the whole body.
+        lazy (bool): True if :meth:`handle` returns before the body was
+            read, the body is read as its result is consumed.
+    """
+    streaming = False
+    lazy = False
+
     def __init__(self, resp, req):
         """
         Args:
-            resp (str):
+            resp (str, iterable[str]): The body or, for streaming handlers,
+                the body in chunks.
             req (urllib2.Request):
         """
         super(ResponseHandler, self).__init__()
@@ -30,7 +89,93 @@ class NullHandler(ResponseHandler):
 
 
 class XMLResponse(ResponseHandler):
+    """Parses the body into a :class:`CaseInsensitiveDict`.
+
+    Attributes:
+        schema (funimationlater.schema.Schema): When set only the parts of
+            the root in the schema are extracted and a plain `dict` of the
+            root tag and those parts is returned.
+    """
+    streaming = True
+    schema = None
+
     def handle(self):
-        if self._resp:
-            data = etree_to_dict(Et.fromstring(self._resp))
-            return CaseInsensitiveDict(data)
+        root = self._parse()
+        if root is None:
+            return None
+        if self.schema is not None:
+            return {root.tag: self.schema.extract(root)}
+        return CaseInsensitiveDict(etree_to_dict(root))
+
+    def _parse(self):
+        """Feed the body to the parser chunk by chunk.
+
+        Returns:
+            Element: The root element, None if the body is empty.
+        """
+        chunks = self._resp
+        if isinstance(chunks, string_types):
+            chunks = [chunks]
+        parser = None
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if parser is None:
+                parser = Et.XMLParser()
+            parser.feed(chunk)
+        if parser is not None:
+            return parser.close()
+
+
+class StreamingXMLResponse(ResponseHandler):
+    """Yields the `item` elements of a response one at a time.
+
+    Each item is converted with :func:`etree_to_dict` as soon as its closing
+    tag is parsed and then removed from the tree, so memory use depends on
+    the size of one item instead of the whole response. Items nested in
+    other items are part of their parent and aren't yielded on their own.
+
+    Attributes:
+        item_tag (str): The tag of the elements to yield.
+        schema (funimationlater.schema.Schema): When set only the parts of
+            each item in the schema are extracted.
+    """
+    streaming = True
+    lazy = True
+    item_tag = 'item'
+    schema = None
+
+    def handle(self):
+        """
+        Returns:
+            generator[dict]: The contents of each item.
+        """
+        chunks = self._resp
+        if isinstance(chunks, string_types):
+            chunks = [chunks]
+        return self._iter_items(chunks)
+
+    def _iter_items(self, chunks):
+        tag = self.item_tag
+        schema = self.schema
+        stack = []
+        depth = 0
+        for event, elem in iterparse_chunks(chunks):
+            if event == 'start':
+                stack.append(elem)
+                if elem.tag == tag:
+                    depth += 1
+                continue
+            stack.pop()
+            if elem.tag != tag:
+                continue
+            depth -= 1
+            if depth:
+                continue
+            if schema is not None:
+                yield schema.extract(elem)
+            else:
+                yield etree_to_dict(elem)[tag]
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
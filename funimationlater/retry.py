@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division
+
+import random
+import socket
+import threading
+import time
+
+try:
+    from http.client import HTTPException
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from httplib import HTTPException
+    from urllib2 import HTTPError, URLError
+
+from .error import RequestTimeout
+from .throttle import parse_retry_after
+
+__all__ = ['RetryPolicy', 'RetryStats', 'Attempts']
+
+CONNECT = 'connect'
+READ = 'read'
+STATUS = 'status'
+
+
+class RetryStats(object):
+    """Counters for a :class:`RetryPolicy`.
+
+    Attributes:
+        requests (int): Requests sent with the policy, retries not included.
+        retries (int): Attempts after the first one.
+        connect_errors (int): Retries after the connection failed.
+        read_errors (int): Retries after reading the response failed.
+        status_errors (int): Retries after a retryable status code.
+        giveups (int): Requests that failed after running out of retries or
+            time.
+        retry_time (float): Seconds added to requests by failed attempts and
+            the backoff between them.
+    """
+
+    def __init__(self):
+        super(RetryStats, self).__init__()
+        self.requests = 0
+        self.retries = 0
+        self.connect_errors = 0
+        self.read_errors = 0
+        self.status_errors = 0
+        self.giveups = 0
+        self.retry_time = 0.0
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def __repr__(self):
+        return '<RetryStats: requests={} retries={} giveups={} ' \
+               'retry_time={:.3f}>'.format(self.requests, self.retries,
+                                           self.giveups, self.retry_time)
+
+
+class RetryPolicy(object):
+    """Decides if and when a failed request is sent again.
+
+    Only idempotent methods are retried, so a POST such as the login is sent
+    once unless `methods` says otherwise. The delay before each retry is
+    chosen at random between 0 and `backoff_factor * 2 ** retry`, capped at
+    `max_backoff` ("full jitter") so clients that failed together don't
+    retry together. A `Retry-After` header is used when it asks for longer.
+
+    Connection errors, errors while reading the response and status codes
+    each have their own limit, a server that can't be reached usually
+    deserves fewer attempts than one that answered `503`.
+
+    Attributes:
+        stats (RetryStats):
+    """
+    status_codes = frozenset([429, 500, 502, 503, 504])
+    methods = frozenset(['GET', 'HEAD'])
+    read_errors = (socket.error, HTTPException, EOFError)
+
+    def __init__(self, total=3, connect=None, read=None, status=None,
+                 backoff_factor=0.25, max_backoff=10.0, deadline=None,
+                 status_codes=None, methods=None, jitter=True):
+        """
+        Args:
+            total (int): The most retries for a request.
+            connect (Optional[int]): The most retries after connection
+                errors, defaults to `total`.
+            read (Optional[int]): The most retries after read errors,
+                defaults to `total`.
+            status (Optional[int]): The most retries after a status code in
+                `status_codes`, defaults to `total`.
+            backoff_factor (float): Seconds before the first retry, doubled
+                for every retry after it.
+            max_backoff (float): The longest backoff.
+            deadline (Optional[float]): Seconds a request can take including
+                all its retries. A retry that would start after it is not
+                made.
+            status_codes (Optional[iterable[int]]): Status codes that are
+                retried.
+            methods (Optional[iterable[str]]): Methods that are retried.
+            jitter (bool): Randomize the backoff.
+        """
+        super(RetryPolicy, self).__init__()
+        self.total = total
+        self.limits = {
+            CONNECT: total if connect is None else connect,
+            READ: total if read is None else read,
+            STATUS: total if status is None else status,
+        }
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        if status_codes is not None:
+            self.status_codes = frozenset(status_codes)
+        if methods is not None:
+            self.methods = frozenset(m.upper() for m in methods)
+        self.jitter = jitter
+        self.stats = RetryStats()
+
+    def attempts(self, method, deadline=None):
+        """Start keeping track of the attempts of a request.
+
+        Args:
+            method (str): The HTTP method of the request.
+            deadline (Optional[Deadline]): No retry is made that would start
+                after it.
+
+        Returns:
+            Attempts:
+        """
+        self.stats.incr('requests')
+        return Attempts(self, method.upper() in self.methods, deadline)
+
+    def classify(self, err=None, status=None):
+        """
+        Returns:
+            str: `connect`, `read` or `status` if the error or status code
+                can be retried, otherwise None.
+        """
+        if isinstance(err, HTTPError):
+            status, err = err.code, None
+        if isinstance(err, RequestTimeout):
+            # NOTE(Sinap): streamed bodies raise it while they're read, a
+            # deadline that passed can't be retried.
+            return {'connect': CONNECT, 'read': READ}.get(err.phase)
+        if err is None:
+            return STATUS if status in self.status_codes else None
+        if isinstance(err, URLError):
+            # NOTE(Sinap): urlopen and the pooled clients raise URLError when
+            # the request couldn't be sent and let errors reading the
+            # response through as they are.
+            return CONNECT
+        if isinstance(err, self.read_errors):
+            return READ
+        return None
+
+    def backoff(self, retry):
+        """The seconds to wait before retry number `retry`, starting at 0."""
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** retry)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def __repr__(self):
+        return '<RetryPolicy: total={} backoff_factor={} deadline={}>'.format(
+            self.total, self.backoff_factor, self.deadline)
+
+
+class Attempts(object):
+    """The attempts of one request, see :meth:`RetryPolicy.attempts`."""
+
+    def __init__(self, policy, retryable, deadline=None):
+        super(Attempts, self).__init__()
+        self.policy = policy
+        self.retryable = retryable
+        self.deadline = deadline
+        self.counts = {CONNECT: 0, READ: 0, STATUS: 0}
+        self.retries = 0
+        self.start = self._attempt_start = time.time()
+
+    def delay(self, err=None, status=None, headers=None):
+        """Record a failed attempt.
+
+        Args:
+            err (Optional[Exception]): The exception raised by the attempt.
+            status (Optional[int]): The status code of the response if there
+                was no exception.
+            headers (Optional[dict]): The response headers.
+
+        Returns:
+            float: Seconds to wait before the next attempt, None if the
+                request shouldn't be sent again.
+        """
+        policy = self.policy
+        kind = policy.classify(err, status)
+        if kind is None or not self.retryable:
+            return None
+        if isinstance(err, HTTPError):
+            headers = err.hdrs
+        if self.retries >= policy.total or \
+                self.counts[kind] >= policy.limits[kind]:
+            policy.stats.incr('giveups')
+            return None
+        delay = policy.backoff(self.retries)
+        if kind == STATUS and headers is not None:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        now = time.time()
+        if (policy.deadline is not None and
+                now + delay - self.start > policy.deadline) or \
+                (self.deadline is not None and
+                 self.deadline.expires < now + delay):
+            policy.stats.incr('giveups')
+            return None
+        self.counts[kind] += 1
+        self.retries += 1
+        stats = policy.stats
+        stats.incr('retries')
+        stats.incr(kind + '_errors')
+        stats.incr('retry_time', now - self._attempt_start + delay)
+        self._attempt_start = now + delay
+        return delay
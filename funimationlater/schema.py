@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from .response_handler import XMLResponse, StreamingXMLResponse
+from .utils import etree_to_dict
+
+__all__ = ['Schema']
+
+
+class Schema(object):
+    """The parts of an XML element a model reads.
+
+    The paths are compiled into a tree once and :meth:`extract` walks the
+    element with it, only converting the elements at the end of a path with
+    :func:`funimationlater.utils.etree_to_dict`, or taking their text when
+    they only have text. Everything else in the document is skipped by the
+    conversion, the parser still builds it.
+
+    The result is shaped like the output of `etree_to_dict` limited to the
+    paths, so the models can be built from either one. A tag that appears
+    more than once along a path is a `list`, just like `etree_to_dict`.
+    """
+
+    def __init__(self, paths):
+        """
+        Args:
+            paths (list[str]): `/` separated tags relative to the element
+                passed to :meth:`extract`.
+        """
+        super(Schema, self).__init__()
+        self.paths = tuple(paths)
+        self._tree = {}
+        for path in self.paths:
+            node = self._tree
+            tags = path.split('/')
+            for tag in tags[:-1]:
+                node = node.setdefault(tag, {})
+                if node is None:
+                    # a shorter path already takes the whole element
+                    break
+            else:
+                node[tags[-1]] = None
+        self._handlers = {}
+
+    def extract(self, elem):
+        """
+        Args:
+            elem (Element): The element of the model.
+
+        Returns:
+            dict:
+        """
+        return self._extract(elem, self._tree)
+
+    def _extract(self, elem, tree):
+        result = {}
+        for child in elem:
+            tag = child.tag
+            if tag not in tree:
+                continue
+            subtree = tree[tag]
+            if not len(child) and not child.attrib:
+                # NOTE(Sinap): the same as etree_to_dict without the call,
+                # most of the paths end at an element with only text.
+                text = child.text
+                value = (text.strip() if text else '') or None
+            elif subtree is None or not len(child):
+                # an element without children ends up as text in
+                # etree_to_dict, do the same so both look alike
+                value = etree_to_dict(child)[tag]
+            else:
+                value = self._extract(child, subtree)
+            if tag in result:
+                existing = result[tag]
+                if type(existing) is list:
+                    existing.append(value)
+                else:
+                    result[tag] = [existing, value]
+            else:
+                result[tag] = value
+        return result
+
+    def handler(self, streaming=False):
+        """Get a response handler that uses this schema.
+
+        Args:
+            streaming (bool): If True the handler is a
+                :class:`StreamingXMLResponse` that yields each extracted item,
+                otherwise a :class:`XMLResponse` that returns a `dict` of the
+                root tag and the extracted root.
+
+        Returns:
+            type:
+        """
+        handler = self._handlers.get(streaming)
+        if handler is None:
+            base = StreamingXMLResponse if streaming else XMLResponse
+            handler = type('Schema' + base.__name__, (base,), {'schema': self})
+            self._handlers[streaming] = handler
+        return handler
+
+    def __repr__(self):
+        return '<Schema: {}>'.format(', '.join(self.paths))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+
+__all__ = ['SingleFlight']
+
+
+class _Call(object):
+    __slots__ = ['done', 'result', 'error']
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Makes concurrent calls with the same key share one call.
+
+    The first caller for a key runs the function, everyone who asks for the
+    same key while it's running waits for it and gets the same result or
+    the same exception. Once it's done the next call runs the function
+    again, nothing is cached.
+
+    Attributes:
+        calls (int): The number of times a function was actually run.
+        coalesced (int): The number of calls that waited for another one
+            instead.
+    """
+
+    def __init__(self):
+        super(SingleFlight, self).__init__()
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Call `func` unless a call for `key` is already running.
+
+        Args:
+            key: Any hashable value.
+            func: Called without arguments.
+
+        Returns: Whatever `func` returns.
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result
+
+    def __len__(self):
+        """The number of calls running."""
+        return len(self._in_flight)
+
+    def __repr__(self):
+        return '<{}: calls={} coalesced={}>'.format(
+            self.__class__.__name__, self.calls, self.coalesced)
@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""A compact binary format for sharing the catalog between processes.
+
+The file holds one column per field, an array of fixed size numbers, plus a
+table of every distinct string. :class:`Snapshot` maps the file into memory
+and reads the columns where they are, so any number of processes can open
+the same file and share its pages, and opening it costs the same no matter
+how large it is. Shows, seasons and episodes are read through small view
+objects that only decode the fields that are used::
+
+    writer = SnapshotWriter()
+    for show in api.iter_all_shows():
+        details = show.get_details()
+        writer.add(show, details.get_seasons())
+    writer.write('catalog.snap')
+
+    with Snapshot.open('catalog.snap') as snapshot:
+        show = snapshot.show(91448)
+        for season in show.seasons:
+            print(season.title, [e.episode_number for e in season.episodes])
+
+Requires Python 3.
+"""
+from __future__ import absolute_import
+
+import array
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+from ._compat import text_type, replace_file
+
+__all__ = ['Snapshot', 'SnapshotWriter', 'ShowView', 'SeasonView',
+           'EpisodeView']
+
+MAGIC = b'FLSNAP'
+VERSION = 1
+NONE = 0xFFFFFFFF
+NO_NUMBER = -1
+
+# NOTE(Sinap): the name and array typecode of every column, the order here is
+# the order in the file.
+SHOW_COLUMNS = [
+    ('id', 'q'), ('title', 'I'), ('show_id', 'I'), ('thumbnail', 'I'),
+    ('recent_item', 'I'), ('added', 'q'), ('first_season', 'I'),
+    ('season_count', 'I'),
+]
+SEASON_COLUMNS = [
+    ('number', 'q'), ('title', 'I'), ('first_episode', 'I'),
+    ('episode_count', 'I'),
+]
+EPISODE_COLUMNS = [
+    ('title', 'I'), ('episode_number', 'd'), ('duration', 'q'),
+    ('languages', 'I'), ('format', 'I'), ('description', 'I'),
+    ('path', 'I'), ('params', 'I'),
+]
+STRING_COLUMNS = frozenset(['title', 'show_id', 'thumbnail', 'recent_item',
+                            'languages', 'format', 'description', 'path',
+                            'params'])
+TABLES = [('shows', SHOW_COLUMNS), ('seasons', SEASON_COLUMNS),
+          ('episodes', EPISODE_COLUMNS)]
+
+# magic, version, byte order, table row counts, string count
+_header = struct.Struct('<6sHBxIIII')
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _join(values):
+    return None if values is None else ','.join(values)
+
+
+class SnapshotWriter(object):
+    """Collects shows and their seasons and writes them with :meth:`write`.
+
+    Strings are stored once no matter how often they're used, most
+    episodes of a show share their format and languages for example.
+    """
+
+    def __init__(self):
+        super(SnapshotWriter, self).__init__()
+        self._shows = []
+        self._strings = self._blobs = self._rows = None
+
+    def add(self, show, seasons=()):
+        """Add a show.
+
+        Args:
+            show (funimationlater.models.Show):
+            seasons (iterable[funimationlater.models.Season]): Its seasons,
+                if they should be in the snapshot.
+        """
+        self._shows.append((show, list(seasons)))
+
+    def _string(self, value):
+        if value is None:
+            return NONE
+        if not isinstance(value, text_type):
+            value = value.decode('utf-8')
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._blobs)
+            self._blobs.append(value.encode('utf-8'))
+        return index
+
+    def _append(self, table, **values):
+        columns = self._rows[table]
+        for name, column in columns.items():
+            value = values[name]
+            if name in STRING_COLUMNS:
+                value = self._string(value)
+            elif value is None:
+                value = NO_NUMBER
+            column.append(value)
+
+    def _build(self):
+        self._strings = {}
+        self._blobs = []
+        self._rows = {}
+        for table, columns in TABLES:
+            self._rows[table] = dict((name, array.array(code))
+                                     for name, code in columns)
+        # NOTE(Sinap): sorted by ID so Snapshot.show can bisect the column.
+        for show, seasons in sorted(self._shows, key=lambda s: s[0].id):
+            self._append(
+                'shows', id=show.id, title=show.title, show_id=show.show_id,
+                thumbnail=show.thumbnail.url, recent_item=show.recent_item,
+                added=show.added,
+                first_season=len(self._rows['seasons']['number']),
+                season_count=len(seasons))
+            for season in seasons:
+                episodes = list(season)
+                self._append(
+                    'seasons', number=season.number, title=season.season,
+                    first_episode=len(self._rows['episodes']['title']),
+                    episode_count=len(episodes))
+                for episode in episodes:
+                    self._append(
+                        'episodes', title=episode.title,
+                        episode_number=episode.episode_number,
+                        duration=episode.duration,
+                        languages=_join(episode.languages),
+                        format=episode.format,
+                        description=episode.description,
+                        path=episode.pointer.path,
+                        params=episode.original_params)
+
+    def write(self, path):
+        """Write the snapshot, replacing `path` atomically.
+
+        Returns:
+            int: The size of the file.
+        """
+        self._build()
+        counts = [len(self._rows[table][columns[0][0]])
+                  for table, columns in TABLES]
+        offsets = array.array('Q', [0])
+        for blob in self._blobs:
+            offsets.append(offsets[-1] + len(blob))
+        parts = [_header.pack(MAGIC, VERSION,
+                              sys.byteorder == 'little', *(
+                                  counts + [len(self._blobs)]))]
+        size = _header.size
+
+        def add(data):
+            padding = _align(size) - size
+            parts.append(b'\0' * padding + data)
+            return size + padding + len(data)
+
+        for table, columns in TABLES:
+            for name, _ in columns:
+                size = add(self._rows[table][name].tobytes())
+        size = add(offsets.tobytes())
+        size = add(b''.join(self._blobs))
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as fp:
+            for part in parts:
+                fp.write(part)
+        replace_file(tmp, path)
+        return size
+
+
+class Snapshot(object):
+    """A catalog written by :class:`SnapshotWriter`.
+
+    Only the header is read when it's opened, the columns are read straight
+    from the memory map when a view accesses them. Views must not be used
+    after the snapshot is closed.
+    """
+
+    def __init__(self, buf, close=None):
+        """
+        Args:
+            buf: The file contents, a `mmap` or anything else that supports
+                the buffer protocol.
+            close: Called by :meth:`close`.
+        """
+        super(Snapshot, self).__init__()
+        self._buf = buf
+        self._close = close
+        # NOTE(Sinap): every memoryview of the buffer, they must be released
+        # before a mmap can be closed.
+        self._views = [memoryview(buf)]
+        try:
+            self._load(self._views[0])
+        except Exception:
+            # NOTE(Sinap): the views would keep a mmap from being closed.
+            self.close()
+            raise
+
+    def _load(self, view):
+        if len(view) < _header.size:
+            raise ValueError('not a snapshot, the file is too short')
+        magic, version, little, n_shows, n_seasons, n_episodes, n_strings = \
+            _header.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a snapshot or unsupported version')
+        swap = bool(little) != (sys.byteorder == 'little')
+        offset = _header.size
+        counts = {'shows': n_shows, 'seasons': n_seasons,
+                  'episodes': n_episodes}
+        self._columns = {}
+        for table, columns in TABLES:
+            self._columns[table] = cols = {}
+            for name, code in columns:
+                offset = _align(offset)
+                cols[name], offset = self._column(view, offset, code,
+                                                  counts[table], swap)
+        offset = _align(offset)
+        self._string_offsets, offset = self._column(view, offset, 'Q',
+                                                    n_strings + 1, swap)
+        offset = _align(offset)
+        if offset + self._string_offsets[-1] > len(view):
+            raise ValueError('the snapshot is truncated')
+        self._strings = view[offset:]
+        self._views.append(self._strings)
+        self._show_ids = self._columns['shows']['id']
+
+    @classmethod
+    def open(cls, path):
+        """Map the snapshot at `path` into memory.
+
+        Returns:
+            Snapshot:
+        """
+        with open(path, 'rb') as fp:
+            buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buf, buf.close)
+
+    def close(self):
+        self._columns = self._strings = self._string_offsets = None
+        self._show_ids = None
+        for view in reversed(self._views):
+            view.release()
+        del self._views[:]
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _column(self, view, offset, code, count, swap):
+        size = array.array(code).itemsize * count
+        if offset + size > len(view):
+            raise ValueError('the snapshot is truncated')
+        data = view[offset:offset + size]
+        self._views.append(data)
+        if swap:
+            # NOTE(Sinap): written on a machine with the other byte order,
+            # the column has to be copied.
+            values = array.array(code)
+            values.frombytes(data.tobytes())
+            values.byteswap()
+            return values, offset + size
+        column = data.cast(code)
+        self._views.append(column)
+        return column, offset + size
+
+    def string(self, index):
+        """Decode the string at `index` of the string table."""
+        if index == NONE:
+            return None
+        offsets = self._string_offsets
+        return self._strings[offsets[index]:offsets[index + 1]].tobytes() \
+            .decode('utf-8')
+
+    def show(self, show_id):
+        """Find a show by ID.
+
+        Raises:
+            KeyError: If it's not in the snapshot.
+        """
+        ids = self._show_ids
+        index = bisect.bisect_left(ids, show_id)
+        if index == len(ids) or ids[index] != show_id:
+            raise KeyError(show_id)
+        return ShowView(self, index)
+
+    def __contains__(self, show_id):
+        try:
+            self.show(show_id)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ShowView(self, index % len(self))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ShowView(self, index)
+
+    def __len__(self):
+        return len(self._show_ids)
+
+    def __repr__(self):
+        return '<Snapshot: {} shows>'.format(len(self))
+
+
+class _View(object):
+    """A row of one of the tables of a :class:`Snapshot`."""
+    __slots__ = ['snapshot', 'index']
+    table = None
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+
+    def _get(self, name):
+        value = self.snapshot._columns[self.table][name][self.index]
+        if name in STRING_COLUMNS:
+            return self.snapshot.string(value)
+        return value
+
+    def __eq__(self, other):
+        return type(other) is type(self) and \
+            other.snapshot is self.snapshot and other.index == self.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.snapshot), self.index))
+
+    def __repr__(self):
+        return '<{}: {}>'.format(self.__class__.__name__, self.title)
+
+
+def _field(name):
+    return property(lambda self: self._get(name))
+
+
+def _number(name):
+    def get(self):
+        value = self._get(name)
+        return None if value == NO_NUMBER else value
+    return property(get)
+
+
+class ShowView(_View):
+    """Has the same fields as :class:`funimationlater.models.Show` except
+    the thumbnail is just its URL.
+    """
+    __slots__ = []
+    table = 'shows'
+    id = _field('id')
+    title = _field('title')
+    show_id = _field('show_id')
+    thumbnail = _field('thumbnail')
+    recent_item = _field('recent_item')
+    added = _number('added')
+
+    @property
+    def seasons(self):
+        """list[SeasonView]:"""
+        first = self._get('first_season')
+        return [SeasonView(self.snapshot, first + i)
+                for i in range(self._get('season_count'))]
+
+
+class SeasonView(_View):
+    __slots__ = []
+    table = 'seasons'
+    number = _number('number')
+    title = _field('title')
+
+    @property
+    def episodes(self):
+        """list[EpisodeView]:"""
+        first = self._get('first_episode')
+        return [EpisodeView(self.snapshot, first + i)
+                for i in range(self._get('episode_count'))]
+
+    def __iter__(self):
+        return iter(self.episodes)
+
+    def __len__(self):
+        return self._get('episode_count')
+
+
+class EpisodeView(_View):
+    __slots__ = []
+    table = 'episodes'
+    title = _field('title')
+    episode_number = _field('episode_number')
+    duration = _number('duration')
+    format = _field('format')
+    description = _field('description')
+    path = _field('path')
+    params = _field('params')
+
+    @property
+    def languages(self):
+        """list[str]: None if the languages aren't known."""
+        languages = self._get('languages')
+        return None if languages is None else languages.split(',')
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import logging
+
+from .constants import ShowTypes, SortBy, SortOrder
+
+__all__ = ['CatalogSync', 'ChangeSet']
+
+
+class ChangeSet(object):
+    """The difference between two versions of the catalog.
+
+    Attributes:
+        added (list[funimationlater.models.Show]): Shows that are new.
+        updated (list[funimationlater.models.Show]): Shows whose title,
+            newest episode or timestamp changed.
+        removed (list[int]): IDs of shows that are gone, only known after a
+            full sync.
+        full (bool): True if the whole catalog was requested.
+    """
+    __slots__ = ['added', 'updated', 'removed', 'full']
+
+    def __init__(self, added=None, updated=None, removed=None, full=False):
+        self.added = added or []
+        self.updated = updated or []
+        self.removed = removed or []
+        self.full = full
+
+    def apply(self, shows):
+        """Apply the changes to a `dict` of shows by ID.
+
+        Args:
+            shows (dict):
+
+        Returns:
+            dict: `shows`
+        """
+        for show in self.added:
+            shows[show.id] = show
+        for show in self.updated:
+            shows[show.id] = show
+        for show_id in self.removed:
+            shows.pop(show_id, None)
+        return shows
+
+    def __len__(self):
+        return len(self.added) + len(self.updated) + len(self.removed)
+
+    def __repr__(self):
+        return '<ChangeSet: added={} updated={} removed={} full={}>'.format(
+            len(self.added), len(self.updated), len(self.removed), self.full)
+
+
+_NEXT_PAGE = object()
+
+
+def _fingerprint(show):
+    return show.title, show.recent_item, show.added
+
+
+class CatalogSync(object):
+    """Keeps a copy of the catalog up to date without downloading all of it.
+
+    The longlist sorted by date, newest first, is paged until it reaches a
+    show that is older than the newest one of the last sync, the
+    `watermark`. Everything before that is compared to the snapshot.
+
+    The show at the watermark has to be in the snapshot unchanged, otherwise
+    something was missed, e.g. the snapshot is from another catalog or the
+    order changed, and the whole catalog is requested instead. The same
+    happens when the watermark isn't reached within `max_pages`.
+
+    Removed shows don't show up in the date sorted list, only a full sync
+    finds them. Pass `full_every` to do one every so many syncs.
+
+    Attributes:
+        shows (dict): The snapshot, :class:`funimationlater.models.Show` by
+            ID.
+        watermark (int): The newest `added` timestamp in the snapshot.
+        syncs (int): The number of incremental syncs.
+        full_syncs (int): The number of syncs that requested everything.
+    """
+
+    def __init__(self, api, shows=None, page_size=50, max_pages=10,
+                 full_every=None):
+        """
+        Args:
+            api (funimationlater.FunimationLater):
+            shows (Optional[iterable[funimationlater.models.Show]]): A
+                snapshot from an earlier sync, the first sync is a full one
+                without it.
+            page_size (int): Shows per request.
+            max_pages (int): Pages to request before giving up on an
+                incremental sync.
+            full_every (Optional[int]): Do a full sync after this many
+                incremental ones.
+        """
+        super(CatalogSync, self).__init__()
+        self.api = api
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.full_every = full_every
+        self.shows = {}
+        self.watermark = None
+        self.syncs = 0
+        self.full_syncs = 0
+        self._since_full = 0
+        self._log = logging.getLogger(__name__)
+        if shows is not None:
+            ChangeSet(added=list(shows)).apply(self.shows)
+            self.watermark = self._newest(self.shows.values())
+
+    def sync(self, full=False, page_size=None):
+        """Bring :attr:`shows` up to date.
+
+        Args:
+            full (bool): Request the whole catalog even if an incremental
+                sync is possible.
+            page_size (Optional[int]): Shows per request for this sync
+                only, defaults to :attr:`page_size`.
+
+        Returns:
+            ChangeSet: What changed since the last sync, already applied to
+                :attr:`shows`.
+        """
+        changes = None
+        if self._incremental_due(full):
+            changes = self._incremental(page_size or self.page_size)
+        if changes is None:
+            changes = self._diff(self.api.iter_all_shows(), full=True)
+        return self._finish(changes)
+
+    def _incremental_due(self, full):
+        return not full and self.watermark is not None and (
+            self.full_every is None or self._since_full < self.full_every)
+
+    def _finish(self, changes):
+        if changes.full:
+            self.full_syncs += 1
+            self._since_full = 0
+        else:
+            self.syncs += 1
+            self._since_full += 1
+        changes.apply(self.shows)
+        self.watermark = self._newest(self.shows.values())
+        return changes
+
+    def _incremental(self, page_size):
+        """Page through the shows newest first until the watermark.
+
+        Returns:
+            ChangeSet: None if a full sync is needed.
+        """
+        seen = []
+        for page in range(self.max_pages):
+            shows = self.api.get_shows(
+                **self._page_params(page, page_size)) or []
+            changes = self._scan(shows, seen, page_size)
+            if changes is not _NEXT_PAGE:
+                return changes
+        self._log.debug('Watermark not reached after %s pages',
+                        self.max_pages)
+        return None
+
+    @staticmethod
+    def _page_params(page, page_size):
+        return dict(show_type=ShowTypes.SHOWS, sort_by=SortBy.DATE,
+                    sort_order=SortOrder.DESC, limit=page_size,
+                    offset=page * page_size)
+
+    def _scan(self, shows, seen, page_size):
+        """Look for the watermark in a page of shows, the shows before it
+        are added to `seen`.
+
+        Returns:
+            ChangeSet: None if a full sync is needed, `_NEXT_PAGE` if the
+                watermark isn't on this page.
+        """
+        for show in shows:
+            if show.added is None or show.added >= self.watermark:
+                seen.append(show)
+                continue
+            known = self.shows.get(show.id)
+            if known is None or _fingerprint(known) != _fingerprint(show):
+                self._log.debug('Gap at show %s, syncing everything',
+                                show.id)
+                return None
+            return self._diff(seen)
+        if len(shows) < page_size:
+            # NOTE(Sinap): the whole catalog was read, which is as good as a
+            # full sync.
+            return self._diff(seen, full=True)
+        return _NEXT_PAGE
+
+    def _diff(self, shows, full=False):
+        changes = ChangeSet(full=full)
+        ids = set()
+        for show in shows:
+            ids.add(show.id)
+            known = self.shows.get(show.id)
+            if known is None:
+                changes.added.append(show)
+            elif _fingerprint(known) != _fingerprint(show):
+                changes.updated.append(show)
+        if full:
+            changes.removed = [show_id for show_id in self.shows
+                               if show_id not in ids]
+        return changes
+
+    @staticmethod
+    def _newest(shows):
+        added = [show.added for show in shows if show.added is not None]
+        return max(added) if added else None
+
+    def __repr__(self):
+        return '<CatalogSync: {} shows, watermark={}>'.format(
+            len(self.shows), self.watermark)
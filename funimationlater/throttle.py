@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division
+
+import threading
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+__all__ = ['TokenBucket', 'AdaptiveConcurrency', 'Throttle',
+           'parse_retry_after']
+
+
+def parse_retry_after(value, now=None):
+    """Parse a `Retry-After` header.
+
+    Args:
+        value (str): Either seconds or an HTTP date.
+        now (Optional[float]): The current time.
+
+    Returns:
+        float: Seconds to wait, None if `value` can't be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, mktime_tz(parsed) - now)
+
+
+class TokenBucket(object):
+    """Allows `rate` requests per second with bursts of up to `capacity`.
+
+    Not thread-safe on its own, :class:`Throttle` locks around it.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (Optional[float]): The most tokens that can be saved up,
+                defaults to `rate` but at least 1.
+        """
+        super(TokenBucket, self).__init__()
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.tokens = self.capacity
+        self._updated = None
+
+    def take(self, now):
+        """Take a token if there is one.
+
+        Args:
+            now (float):
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until one is
+                available.
+        """
+        if self._updated is not None:
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdaptiveConcurrency(object):
+    """Limits the number of requests in flight and adjusts the limit.
+
+    The limit grows by one for every `limit` successful responses and is
+    halved when the server answers `429` or `503`, at most once per
+    `cooldown` seconds so a burst of errors doesn't drop it to the minimum.
+    After one of those responses no request is sent until its `Retry-After`
+    passed, or `backoff` seconds if it didn't have one.
+
+    Not thread-safe on its own, :class:`Throttle` locks around it.
+
+    Attributes:
+        limit (float): The current limit, rounded down when used.
+        in_flight (int): Requests that were sent and not released yet.
+        blocked_until (float): No requests are sent before this time.
+    """
+    backoff_codes = (429, 503)
+
+    def __init__(self, initial=4, minimum=1, maximum=32, backoff=1.0,
+                 cooldown=1.0):
+        super(AdaptiveConcurrency, self).__init__()
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._decreased = None
+
+    def wait_time(self, now):
+        """
+        Returns:
+            float: 0 if a request can be sent now, the seconds to wait if
+                the server asked us to, None to wait for a release.
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        return 0.0
+
+    def release(self, status, retry_after, now):
+        """Record the outcome of a request.
+
+        Args:
+            status (int): The status code, None if there was no response.
+            retry_after (Optional[float]): Seconds from `Retry-After`.
+            now (float):
+
+        Returns:
+            bool: True if this response made us back off.
+        """
+        self.in_flight -= 1
+        if status in self.backoff_codes:
+            wait = self.backoff if retry_after is None else retry_after
+            self.blocked_until = max(self.blocked_until, now + wait)
+            if self._decreased is None or \
+                    now - self._decreased >= self.cooldown:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._decreased = now
+            return True
+        if status is not None and status < 500:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        return False
+
+
+class _HostState(object):
+    __slots__ = ['bucket', 'concurrency']
+
+    def __init__(self, bucket, concurrency):
+        self.bucket = bucket
+        self.concurrency = concurrency
+
+
+class Throttle(object):
+    """A rate limit and an adaptive concurrency limit for every host.
+
+    Clients call :meth:`acquire` before sending a request and
+    :meth:`release` with the status code once the response arrived. Either
+    part can be disabled by passing None for `rate` or `concurrency`.
+
+    Attributes:
+        waits (int): Requests that had to wait before being sent.
+        backoffs (int): Responses that made the throttle back off.
+    """
+
+    def __init__(self, rate=10.0, burst=None, concurrency=4,
+                 max_concurrency=32, min_concurrency=1, backoff=1.0):
+        """
+        Args:
+            rate (Optional[float]): Requests per second per host.
+            burst (Optional[float]): See :class:`TokenBucket`.
+            concurrency (Optional[int]): The initial concurrency limit per
+                host.
+            max_concurrency (int): The concurrency limit never grows past
+                this.
+            min_concurrency (int): Or drops below this.
+            backoff (float): Seconds to pause a host after a `429` or `503`
+                without `Retry-After`.
+        """
+        super(Throttle, self).__init__()
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.backoff = backoff
+        self.waits = 0
+        self.backoffs = 0
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            bucket = None
+            if self.rate:
+                bucket = TokenBucket(self.rate, self.burst)
+            concurrency = None
+            if self.concurrency:
+                concurrency = AdaptiveConcurrency(
+                    self.concurrency, self.min_concurrency,
+                    self.max_concurrency, self.backoff)
+            state = self._hosts[host] = _HostState(bucket, concurrency)
+        return state
+
+    def try_acquire(self, host):
+        """Acquire a slot for `host` without blocking.
+
+        Returns:
+            float: 0 if the request can be sent, otherwise the seconds to
+                wait before trying again, None if it's waiting for another
+                request to be released.
+        """
+        with self._cond:
+            return self._try_acquire(host, time.time())
+
+    def _try_acquire(self, host, now):
+        state = self._state(host)
+        if state.concurrency is not None:
+            wait = state.concurrency.wait_time(now)
+            if wait != 0:
+                return wait
+        if state.bucket is not None:
+            wait = state.bucket.take(now)
+            if wait:
+                return wait
+        if state.concurrency is not None:
+            state.concurrency.in_flight += 1
+        return 0.0
+
+    def acquire(self, host):
+        """Block until a request to `host` can be sent."""
+        with self._cond:
+            waited = False
+            while True:
+                wait = self._try_acquire(host, time.time())
+                if wait == 0:
+                    break
+                waited = True
+                self._cond.wait(wait)
+            if waited:
+                self.waits += 1
+
+    def release(self, host, status=None, retry_after=None):
+        """Record the response of a request sent after :meth:`acquire`.
+
+        Args:
+            host (str):
+            status (Optional[int]): The status code, None if the request
+                failed without a response.
+            retry_after (Optional[str]): The `Retry-After` header.
+        """
+        with self._cond:
+            state = self._state(host)
+            if state.concurrency is not None:
+                if state.concurrency.release(status,
+                                             parse_retry_after(retry_after),
+                                             time.time()):
+                    self.backoffs += 1
+            self._cond.notify_all()
+
+    def limit(self, host):
+        """
+        Returns:
+            int: The current concurrency limit for `host`, None if there is
+                none.
+        """
+        with self._cond:
+            concurrency = self._state(host).concurrency
+            return None if concurrency is None else int(concurrency.limit)
+
+    def __repr__(self):
+        return '<Throttle: rate={} concurrency={} waits={} ' \
+               'backoffs={}>'.format(self.rate, self.concurrency, self.waits,
+                                     self.backoffs)
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import contextlib
+import socket
+import threading
+import time
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+try:
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from urllib2 import HTTPError, URLError
+
+from .error import RequestTimeout
+
+__all__ = ['Timeout', 'Deadline', 'deadline', 'current_deadline', 'bind',
+           'as_request_timeout', 'guard_body']
+
+
+class Timeout(object):
+    """Connect and read timeouts in seconds, None waits forever.
+
+    The read timeout applies to every read from the socket, not the whole
+    response, use :func:`deadline` to limit that.
+    """
+    __slots__ = ['connect', 'read']
+
+    def __init__(self, connect=None, read=None):
+        self.connect = connect
+        self.read = read
+
+    @classmethod
+    def coerce(cls, value):
+        """
+        Args:
+            value (Union[None, float, Timeout]): A number is used for both
+                timeouts.
+
+        Returns:
+            Timeout:
+        """
+        if isinstance(value, cls):
+            return value
+        return cls(value, value)
+
+    def merge(self, other):
+        """Override these timeouts with the ones `other` sets.
+
+        Args:
+            other (Union[None, float, Timeout]):
+
+        Returns:
+            Timeout:
+        """
+        if other is None:
+            return self
+        other = self.coerce(other)
+        return Timeout(
+            self.connect if other.connect is None else other.connect,
+            self.read if other.read is None else other.read)
+
+    def capped(self, remaining):
+        """Limit both timeouts to `remaining` seconds."""
+        connect, read = self.connect, self.read
+        return Timeout(
+            remaining if connect is None else min(connect, remaining),
+            remaining if read is None else min(read, remaining))
+
+    def __eq__(self, other):
+        return isinstance(other, Timeout) and \
+            (self.connect, self.read) == (other.connect, other.read)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<Timeout: connect={} read={}>'.format(self.connect, self.read)
+
+
+class Deadline(object):
+    """A point in time requests must finish by."""
+    __slots__ = ['expires']
+
+    def __init__(self, seconds):
+        self.expires = time.time() + seconds
+
+    def remaining(self):
+        """float: Seconds left, 0 or less once it passed."""
+        return self.expires - time.time()
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def __repr__(self):
+        return '<Deadline: remaining={:.3f}>'.format(self.remaining())
+
+
+if contextvars is not None:
+    _current = contextvars.ContextVar('funimationlater_deadline',
+                                      default=None)
+
+    def current_deadline():
+        """
+        Returns:
+            Deadline: The deadline of the innermost :func:`deadline` block,
+                None outside of one.
+        """
+        return _current.get()
+
+    def _set(value):
+        return _current.set(value)
+
+    def _reset(token):
+        _current.reset(token)
+else:
+    _local = threading.local()
+
+    def current_deadline():
+        return getattr(_local, 'deadline', None)
+
+    def _set(value):
+        token = current_deadline()
+        _local.deadline = value
+        return token
+
+    def _reset(token):
+        _local.deadline = token
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """Limit the requests sent inside the `with` block to `seconds` in total,
+    including redirects, retries and the backoff between them::
+
+        with deadline(5):
+            details = api.get_show(91448)
+            season = details.get_season(1)
+
+    A nested block can only make the deadline shorter. When it passes the
+    request raises :class:`funimationlater.error.RequestTimeout`.
+
+    Args:
+        seconds (float):
+
+    Returns:
+        Deadline:
+    """
+    new = Deadline(seconds)
+    current = current_deadline()
+    if current is not None and current.expires < new.expires:
+        new = current
+    token = _set(new)
+    try:
+        yield new
+    finally:
+        _reset(token)
+
+
+def bind(func):
+    """Make `func` use the current deadline when it's called from another
+    thread, such as a thread pool worker.
+    """
+    if contextvars is not None:
+        context = contextvars.copy_context()
+
+        def wrapper(*args, **kwargs):
+            # NOTE(Sinap): a context can only be entered by one thread at a
+            # time and the wrapper can be submitted to a pool many times.
+            return context.copy().run(func, *args, **kwargs)
+        return wrapper
+    bound = current_deadline()
+
+    def wrapper(*args, **kwargs):
+        token = _set(bound)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _reset(token)
+    return wrapper
+
+
+def as_request_timeout(err, url, timeout):
+    """Turn a socket timeout into a :class:`RequestTimeout`.
+
+    Args:
+        err (Exception): Raised while sending a request.
+        url (str):
+        timeout (Timeout): The timeouts of the request.
+
+    Returns:
+        RequestTimeout: None if `err` isn't a timeout.
+    """
+    if isinstance(err, HTTPError):
+        return None
+    if isinstance(err, URLError):
+        if isinstance(err.reason, socket.timeout):
+            return RequestTimeout(url, 'connect', timeout.connect)
+        return None
+    if isinstance(err, socket.timeout):
+        return RequestTimeout(url, 'read', timeout.read)
+    return None
+
+
+def guard_body(chunks, url, timeout, deadline=None):
+    """Read a streamed body with the timeouts of its request.
+
+    A streamed body is read after the request returned, by whoever consumes
+    the handler's result, so timeouts raised while reading it are turned
+    into :class:`RequestTimeout` here and the deadline is checked before
+    every read.
+
+    Args:
+        chunks (iterable[bytes]): The body, e.g. from
+            :func:`funimationlater.encoding.iter_body`.
+        url (str):
+        timeout (Timeout): The timeouts of the request.
+        deadline (Optional[Deadline]):
+
+    Yields:
+        bytes:
+    """
+    chunks = iter(chunks)
+    try:
+        while True:
+            if deadline is not None and deadline.expired:
+                raise RequestTimeout(url, 'deadline')
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            except (URLError, socket.timeout) as err:
+                timeout_error = as_request_timeout(err, url, timeout)
+                if timeout_error is None:
+                    raise
+                raise timeout_error
+            yield chunk
+    finally:
+        # NOTE(Sinap): closes the response unless it was read to the end.
+        if hasattr(chunks, 'close'):
+            chunks.close()
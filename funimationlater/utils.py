@@ -1,58 +1,129 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, absolute_import
 
-import collections
 import time
 from contextlib import contextmanager
 from functools import wraps
 
-from ._compat import iteritems
+from ._compat import iteritems, intern, Mapping, MutableMapping
 
 __all__ = ['CaseInsensitiveDict', 'etree_to_dict', 'timethis', 'timeblock']
 
 
-class CaseInsensitiveDict(collections.MutableMapping):
-    def __init__(self, data=None, **kwargs):
+class CaseInsensitiveDict(MutableMapping):
+    """A `dict` with case insensitive keys that remembers the case the keys
+    were set with.
+
+    Values are stored under the interned lowercase key, so lookups with a key
+    that's already lowercase don't have to lowercase it again.
+
+    With `recursive` the nested `dict` values, and the ones in nested lists,
+    are case insensitive too. They're converted the first time they are
+    looked up.
+    """
+
+    def __init__(self, data=None, recursive=False, **kwargs):
+        """
+        Args:
+            data (Optional[Union[dict,iterable]]): The initial items.
+            recursive (bool): Make nested dicts case insensitive.
+            **kwargs: More initial items.
+        """
         self._store = {}
+        self._keys = {}
+        self.recursive = recursive
         if data is None:
             data = {}
         self.update(data, **kwargs)
 
     def __setitem__(self, key, value):
-        self._store[key.lower()] = (key, value)
+        lower = _lower(key)
+        self._store[lower] = value
+        self._keys[lower] = key
 
     def __getitem__(self, key):
-        return self._store[key.lower()][1]
+        value = self._store.get(key, _missing)
+        if value is _missing:
+            # NOTE(Sinap): every stored key is lowercase so if the key was
+            # found it's the right one, otherwise try again lowercased.
+            key = _lowered.get(key) or _lower(key)
+            value = self._store[key]
+        if self.recursive and type(value) in (dict, list):
+            value = self._store[key] = self._convert(value)
+        return value
+
+    def _convert(self, value):
+        if type(value) is dict:
+            return CaseInsensitiveDict(value, True)
+        return [self._convert(x) if type(x) in (dict, list) else x
+                for x in value]
+
+    def __contains__(self, key):
+        return key in self._store or _lower(key) in self._store
 
     def __len__(self):
         return len(self._store)
 
     def __iter__(self):
-        return (k for k, _ in self._store.values())
+        return iter(self._keys.values())
 
     def __delitem__(self, key):
-        del self._store[key.lower()]
+        lower = _lower(key)
+        del self._store[lower]
+        del self._keys[lower]
 
     def __eq__(self, other):
-        if isinstance(other, collections.Mapping):
-            other = CaseInsensitiveDict(other)
-        else:
-            raise NotImplementedError
-        return dict(self.lower_items()) == dict(other.lower_items())
+        if isinstance(other, CaseInsensitiveDict):
+            return self._store == other._store
+        if isinstance(other, Mapping):
+            return self._store == {_lower(k): v for k, v in iteritems(other)}
+        raise NotImplementedError
+
+    def __ne__(self, other):
+        return not self == other
 
     def __repr__(self):
         return '%s(%r)' % (self.__class__.__name__, dict(self.items()))
 
     def lower_items(self):
-        return ((k, v) for k, v in self._store.items())
+        return iteritems(self._store)
 
     def copy(self):
-        return CaseInsensitiveDict(self._store.values())
+        copy = CaseInsensitiveDict.__new__(CaseInsensitiveDict)
+        copy._store = self._store.copy()
+        copy._keys = self._keys.copy()
+        copy.recursive = self.recursive
+        return copy
+
+
+_missing = object()
+_lowered = {}
+
+
+def _lower(key):
+    """Lowercase and intern `key`, the results are cached for the first
+    few thousand keys seen.
+    """
+    lower = _lowered.get(key)
+    if lower is None:
+        lower = key.lower()
+        try:
+            lower = intern(lower)
+        except TypeError:
+            # NOTE(Sinap): only `str` can be interned on python 2.
+            pass
+        if len(_lowered) < 4096:
+            _lowered[key] = lower
+    return lower
 
 
 def etree_to_dict(t):
     """Converts an XML string to a `dict`.
 
+    Elements with only text become the text, or None if they're empty.
+    Elements with children or attributes become a `dict` where a tag that
+    appears more than once maps to a `list`.
+
     Args:
         t (str, Element): The string to convert.
          keys begining with '@' are attributes and '#text' key is the elements
@@ -61,25 +132,58 @@ def etree_to_dict(t):
     Returns:
         dict: The `dict` representation of the XML.
     """
-    attrib = t.attrib
-    tag = t.tag
-    d = {tag: {} if attrib else None}
-    children = list(t)
-    if children:
-        dd = collections.defaultdict(list)
-        for dc in map(etree_to_dict, children):
-            for k, v in iteritems(dc):
-                dd[k].append(v)
-        d = {tag: {k: v[0] if len(v) == 1 else v for k, v in iteritems(dd)}}
-    if attrib:
-        d[tag].update({'@' + k: v for k, v in iteritems(attrib)})
-    text = t.text.strip() if t.text else ''
-    if text:
-        if children or attrib:
-            d[tag]['#text'] = text
+    # NOTE(Sinap): this is called for every item of the longlist responses
+    # so it walks the tree with a stack instead of recursing and builds each
+    # dict in place instead of merging one dict per child.
+    result = {}
+    stack = [(t, iter(t), {})]
+    while stack:
+        elem, children, value = stack[-1]
+        for child in children:
+            if len(child):
+                stack.append((child, iter(child), {}))
+                break
+            attrib = child.attrib
+            text = child.text
+            text = text.strip() if text else ''
+            if attrib:
+                child_value = {'@' + k: v for k, v in iteritems(attrib)}
+                if text:
+                    child_value['#text'] = text
+            else:
+                child_value = text or None
+            tag = child.tag
+            if tag in value:
+                existing = value[tag]
+                if type(existing) is list:
+                    existing.append(child_value)
+                else:
+                    value[tag] = [existing, child_value]
+            else:
+                value[tag] = child_value
         else:
-            d[tag] = text
-    return d
+            stack.pop()
+            attrib = elem.attrib
+            text = elem.text
+            text = text.strip() if text else ''
+            if value or attrib:
+                for k, v in iteritems(attrib):
+                    value['@' + k] = v
+                if text:
+                    value['#text'] = text
+            else:
+                value = text or None
+            parent = stack[-1][2] if stack else result
+            tag = elem.tag
+            if tag in parent:
+                existing = parent[tag]
+                if type(existing) is list:
+                    existing.append(value)
+                else:
+                    parent[tag] = [existing, value]
+            else:
+                parent[tag] = value
+    return result
 
 
 def timethis(func):
@@ -36,6 +36,7 @@ setup(
     package_dir={'funimationlater': 'funimationlater'},
     include_package_data=True,
     install_requires=[
+        'futures; python_version < "3"',
     ],
     license='MIT',
     zip_safe=False,
@@ -50,6 +51,7 @@ setup(
         'Programming Language :: Python :: 3',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
+        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: Implementation :: PyPy',
     ],
 )
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+A local HTTP/1.1 server for tests that need real sockets.
+"""
+import gzip
+import io
+import os
+import socket
+import threading
+import time
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def read_resource(name):
+    with open(os.path.join(RESOURCES, name), 'rb') as fp:
+        return fp.read()
+
+
+def gzip_payload(data):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as fp:
+        fp.write(data)
+    return buf.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self._fail():
+            return
+        if self.path.startswith('/missing'):
+            self._reply(404, b'<error>not found</error>')
+        elif self.path.startswith('/gzip'):
+            self._reply(200, gzip_payload(self.server.payload),
+                        {'Content-Encoding': 'gzip'})
+        elif self.path.startswith('/redirect'):
+            self._reply(302, b'', {'Location': '/moved'})
+        elif self.path.startswith('/busy'):
+            self._reply(429, b'', {'Retry-After': '0.2'})
+        elif self.path.startswith('/slow'):
+            self.server.gate.wait(5)
+            self._reply(200, '<path>{}</path>'.format(
+                self.path).encode('utf-8'))
+        elif self.path.startswith('/stall'):
+            # half of the body, then nothing until `gate` is set
+            self._reply_in_parts(2, lambda: self.server.gate.wait(5))
+        elif self.path.startswith('/trickle'):
+            self._reply_in_parts(8, lambda: time.sleep(0.05))
+        elif self.path.startswith('/etag'):
+            headers = {'ETag': '"v1"',
+                       'Last-Modified': 'Sat, 01 Jan 2000 00:00:00 GMT'}
+            if self.headers.get('If-None-Match') == '"v1"':
+                self._reply(304, b'', headers)
+            else:
+                self._reply(200, self.server.payload, headers)
+        else:
+            self._reply(200, '<path>{}</path>'.format(
+                self.path).encode('utf-8'))
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self._fail():
+            self._reply(200, b'<ok/>')
+
+    def _fail(self):
+        """`/flaky/<n>/` answers 503, `/drop/<n>/` closes the connection
+        without a response and `/cut/<n>/` closes it halfway through the
+        body for the first `n` requests to the same path. `/cut/<n>/gzip`
+        cuts off a gzip encoded body.
+        """
+        kind, _, rest = self.path.strip('/').partition('/')
+        if kind not in ('flaky', 'drop', 'cut'):
+            return False
+        with self.server.lock:
+            count = self.server.failures.get(self.path, 0)
+            self.server.failures[self.path] = count + 1
+        if count >= int(rest.split('/')[0]):
+            return False
+        if kind == 'flaky':
+            self._reply(503, b'', {'Retry-After': '0'})
+        elif kind == 'cut':
+            # waits for `gate` so several callers can line up behind it
+            self.server.gate.wait(5)
+            self._reply_cut()
+        else:
+            self.server.requests.append(self.path)
+            self.close_connection = True
+        return True
+
+    def _reply(self, code, body, headers=None):
+        self.server.connections.add(self.client_address)
+        self.server.requests.append(self.path)
+        self.send_response(code)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_cut(self):
+        """Promise all of `payload` but close the connection after half of
+        it.
+        """
+        body, headers = self._cut_payload()
+        self.server.requests.append(self.path)
+        self.send_response(200)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[:len(body) // 2])
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _cut_payload(self):
+        if self.path.rstrip('/').endswith('gzip'):
+            return (gzip_payload(self.server.payload),
+                    {'Content-Encoding': 'gzip'})
+        return self.server.payload, {}
+
+    def _reply_in_parts(self, parts, pause):
+        """Send `big_payload` in `parts` pieces with `pause` between them."""
+        body = self.server.big_payload
+        self.server.requests.append(self.path)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        size = len(body) // parts + 1
+        try:
+            for start in range(0, len(body), size):
+                if start:
+                    pause()
+                self.wfile.write(body[start:start + size])
+                self.wfile.flush()
+        except socket.error:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients closing keep-alive connections isn't an error here
+        pass
+
+
+class StubServer(object):
+    """A local HTTP/1.1 server running in a background thread."""
+
+    def __init__(self, handler=StubHandler):
+        self.httpd = ThreadedHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.connections = set()
+        self.httpd.requests = []
+        self.httpd.failures = {}
+        self.httpd.lock = threading.Lock()
+        # `/slow` waits until this is set
+        self.httpd.gate = threading.Event()
+        self.httpd.gate.set()
+        self.httpd.payload = b'<items>' + b'<item>foo</item>' * 1000 + \
+            b'</items>'
+        # several times CHUNK_SIZE, for `/stall` and `/trickle`
+        self.httpd.big_payload = b'<items>' + \
+            b'<item>foo</item>' * 40000 + b'</items>'
+        self.url = 'http://127.0.0.1:{}'.format(self.httpd.server_port)
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ApiHandler(StubHandler):
+    """Serves the recorded payloads in `resources` like the real API."""
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        qry = parse_qs(parts.query)
+        path = parts.path
+        if path.startswith('/xml'):
+            path = path[len('/xml'):]
+        if path == '/detail/':
+            if qry.get('pk') != ['91448']:
+                return self._reply(404, b'')
+            body = read_resource('show_details.xml')
+        elif path == '/player/':
+            if qry.get('id') not in (['110'], ['120'], ['125'], ['130']):
+                return self._reply(404, b'')
+            body = read_resource('player.xml')
+        elif path == '/longlist/content/page/':
+            if 'showid' in qry:
+                body = read_resource('season.xml')
+            else:
+                body = read_resource('all_shows.xml')
+        elif path.startswith('/hls/'):
+            body = read_resource('master.m3u8')
+        else:
+            return self._reply(404, b'')
+        self._reply(200, body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if form.get('password') == ['secret']:
+            body = (b'<authentication><parameters><header>'
+                    b'<Authorization>Token ' +
+                    form['username'][0].encode('utf-8') +
+                    b'</Authorization></header></parameters>'
+                    b'</authentication>')
+        else:
+            body = b'<authentication><error>bad login</error></authentication>'
+        self._reply(200, body)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.aio`.
+"""
+import sys
+import unittest
+
+import funimationlater
+from .stubserver import StubServer, ApiHandler
+
+if sys.version_info >= (3, 6):
+    import asyncio
+    from funimationlater.aio import (AsyncFunimationLater, AsyncHTTPClient,
+                                     AsyncSingleFlight, bounded_gather)
+
+
+@unittest.skipIf(sys.version_info < (3, 6), 'requires Python 3.6')
+class TestAsyncFunimationLater(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        self.loop = asyncio.new_event_loop()
+        client = AsyncHTTPClient(self.server.url + '/xml')
+        self.api = AsyncFunimationLater(client)
+
+    def tearDown(self):
+        self.api.client.close()
+        self.loop.close()
+        self.server.__exit__()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_get_all_shows(self):
+        shows = self.run_async(self.api.get_all_shows())
+        self.assertEqual(len(shows), 20)
+        self.assertIsInstance(shows[0], funimationlater.Show)
+
+    def test_login(self):
+        self.run_async(self.api.login('foo', 'secret'))
+        self.assertTrue(self.api.logged_in)
+        self.assertEqual(self.api.client.headers['Authorization'], 'Token foo')
+        self.assertRaises(funimationlater.AuthenticationFailed, self.run_async,
+                          self.api.login('foo', 'wrong'))
+
+    def test_login_required(self):
+        # NOTE(Sinap): the check is part of the coroutine like every other
+        # error, calling the method doesn't raise.
+        coro = self.api.get_my_queue()
+        self.assertRaises(funimationlater.LoginRequired, self.run_async, coro)
+        for coro in (self.api.get_history(), self.api.add_to_queue('HVO'),
+                     self.api.remove_from_queue('HVO')):
+            self.assertRaises(funimationlater.LoginRequired, self.run_async,
+                              coro)
+
+    def test_get_show_and_season(self):
+        details = self.run_async(self.api.get_show(91448))
+        self.assertEqual(details.title, 'Heavy Object')
+        season = self.run_async(details.get_season(2))
+        self.assertEqual(season.title, 'Season 2')
+        self.assertIs(self.run_async(details.get_season(2)), season)
+        seasons = self.run_async(details.get_seasons())
+        self.assertEqual([s.title for s in seasons], ['Season 1', 'Season 2'])
+        self.assertIs(list(seasons)[1], season)
+        episode = season[2.5]
+        self.assertEqual(episode.title, 'Recap')
+        sub = self.run_async(episode.get_sub())
+        self.assertIsInstance(sub, funimationlater.EpisodeDetails)
+        self.assertIn('audio=ja', self.server.httpd.requests[-1])
+
+    def test_get_shows_many(self):
+        results = self.run_async(self.api.get_shows_many(
+            [91448, 1, 91448], limit=2, return_exceptions=True))
+        self.assertEqual(results[0].title, 'Heavy Object')
+        self.assertIsInstance(results[1], funimationlater.UnknownShow)
+        self.assertEqual(results[2].title, 'Heavy Object')
+        # keep-alive connections are reused, never more than `limit` opened
+        self.assertLessEqual(len(self.server.httpd.connections), 2)
+
+    def test_get_episodes_many(self):
+        episodes = self.run_async(self.api.get_episodes_many(
+            [(91448, 110), (91448, 120, 'en')]))
+        self.assertEqual([e.video_id for e in episodes], [110, 110])
+
+    def test_async_iter(self):
+        async_iter = self.api.__aiter__()
+        first = self.run_async(async_iter.__anext__())
+        self.assertEqual(first.title, 'Heavy Object')
+        self.assertRaises(TypeError, iter, self.api)
+        self.assertRaises(TypeError, self.api.iter_shows)
+        self.assertRaises(TypeError, self.api.iter_all_shows)
+
+    def test_show_getitem(self):
+        show = self.run_async(self.api.get_all_shows())[0]
+        season = self.run_async(show[2])
+        self.assertEqual(season.title, 'Season 2')
+        self.assertIs(self.run_async(show[2]), season)
+        self.assertRaises(TypeError, iter, show)
+
+    def test_refresh_index(self):
+        index = self.run_async(self.api.build_index())
+        self.assertEqual(len(index), 20)
+        del self.api.catalog_sync.shows[91448]
+        index.remove(91448)
+        self.assertEqual(self.run_async(self.api.refresh_index()), 1)
+        self.assertIn(91448, self.api.index)
+        hits = self.run_async(self.api.search_local(u'heavy object'))
+        self.assertEqual(hits[0].id, 91448)
+
+    def test_api_getitem(self):
+        details = self.run_async(self.api[91448])
+        self.assertEqual(details.title, 'Heavy Object')
+        self.assertRaises(funimationlater.UnknownShow, self.run_async,
+                          self.api[1])
+
+    def test_bounded_gather_limits_concurrency(self):
+        state = {'running': 0, 'peak': 0}
+
+        def done(_):
+            state['running'] -= 1
+
+        def work(item):
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+            future = asyncio.ensure_future(
+                asyncio.sleep(0.01, result=item * 2))
+            future.add_done_callback(done)
+            return future
+
+        results = self.run_async(bounded_gather(work, range(10), limit=3))
+        self.assertEqual(results, [i * 2 for i in range(10)])
+        self.assertEqual(state['peak'], 3)
+
+
+@unittest.skipIf(sys.version_info < (3, 6), 'requires Python 3.6')
+class TestAsyncSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        self.loop = asyncio.new_event_loop()
+        self.flight = AsyncSingleFlight()
+        self.client = AsyncHTTPClient(self.server.url + '/xml',
+                                      single_flight=self.flight)
+
+    def tearDown(self):
+        self.client.close()
+        self.loop.close()
+        self.server.__exit__()
+
+    def gather(self, coros, **kwargs):
+        tasks = [self.loop.create_task(coro) for coro in coros]
+        return self.loop.run_until_complete(asyncio.gather(*tasks, **kwargs))
+
+    def test_identical_gets_are_coalesced(self):
+        api = AsyncFunimationLater(self.client)
+        shows = self.gather([api.get_show(91448) for _ in range(5)])
+        self.assertEqual(len(self.server.httpd.requests), 1)
+        self.assertEqual((self.flight.calls, self.flight.coalesced), (1, 4))
+        self.assertEqual(len(set(map(id, shows))), 5)
+
+    def test_errors_are_shared(self):
+        results = self.gather([self.client.get('missing/') for _ in range(3)],
+                              return_exceptions=True)
+        self.assertEqual(len(self.server.httpd.requests), 1)
+        for result in results:
+            self.assertIsInstance(result, funimationlater.DetailedHTTPError)
+            self.assertEqual(result.code, 404)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from http.client import IncompleteRead
+except ImportError:
+    from httplib import IncompleteRead
+
+import mock
+
+from funimationlater.cache import (LRUCache, ResponseCache, CacheStats,
+                                   CacheEntry, SQLiteStore, canonical_url)
+from funimationlater.httpclient import PooledHTTPClient
+from .stubserver import StubServer
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        stats = CacheStats()
+        cache = LRUCache(2, stats)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(stats.evictions, 1)
+
+
+class TestSQLiteStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_entries_persist(self):
+        store = SQLiteStore(self.path)
+        store.set(('a',), CacheEntry(b'body', {'ETag': '"x"'}, 5, 10))
+        other = SQLiteStore(self.path)
+        entry = other.get(('a',))
+        self.assertEqual(entry.body, b'body')
+        self.assertEqual(entry.headers, {'ETag': '"x"'})
+        self.assertEqual((entry.stored_at, entry.ttl), (5, 10))
+        self.assertIsNone(other.get(('b',)))
+        other.delete(('a',))
+        self.assertNotIn(('a',), store)
+
+    def test_size_is_bounded(self):
+        store = SQLiteStore(self.path, max_size=300)
+        for i in range(5):
+            store.set((i,), CacheEntry(os.urandom(100)))
+        self.assertLessEqual(store.size(), 300)
+        self.assertIn((4,), store)
+        self.assertNotIn((0,), store)
+        self.assertEqual(store.stats.evictions, 5 - len(store))
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_ttl_for(self):
+        cache = ResponseCache(ttl=10, ttls={'detail/': 100,
+                                            'detail/special/': 1})
+        self.assertEqual(cache.ttl_for('/detail/?pk=1'), 100)
+        self.assertEqual(cache.ttl_for('detail/special/'), 1)
+        self.assertEqual(cache.ttl_for('/player/'), 10)
+        self.assertIsNone(cache.ttl_for('/myqueue/get-items/?'))
+        self.assertIsNone(cache.ttl_for('/history/get-items/?'))
+
+    def test_key_is_canonical_and_per_user(self):
+        cache = ResponseCache()
+        self.assertEqual(
+            cache.key('HTTPS://Foo.bar/x?b=2&a=1', {}),
+            cache.key('https://foo.bar/x?a=1&b=2', {'User-Agent': 'foo'}))
+        self.assertNotEqual(
+            cache.key('https://foo.bar/x', {'Authorization': 'Token a'}),
+            cache.key('https://foo.bar/x', {'authorization': 'Token b'}))
+
+    def test_canonical_url(self):
+        self.assertEqual(canonical_url('http://a.b?z=1&a=&a=0'),
+                         'http://a.b/?a=&a=0&z=1')
+
+    def test_expired_entries_are_dropped(self):
+        cache = ResponseCache()
+        with mock.patch('funimationlater.cache.time.time', return_value=0):
+            cache.set('key', b'body', ttl=10)
+            self.assertEqual(cache.get('key').body, b'body')
+        with mock.patch('funimationlater.cache.time.time', return_value=11):
+            self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats.hits, 1)
+        self.assertEqual(cache.stats.misses, 1)
+        self.assertEqual(cache.stats.expirations, 1)
+
+    def test_stale_entries_with_validators_are_kept(self):
+        cache = ResponseCache()
+        with mock.patch('funimationlater.cache.time.time', return_value=0):
+            cache.set('key', b'body', ttl=10, headers={'ETag': '"v1"',
+                                                       'Server': 'foo'})
+        with mock.patch('funimationlater.cache.time.time', return_value=11):
+            self.assertIsNone(cache.get('key'))
+            entry = cache.lookup('key')
+        self.assertEqual(entry.validators, {'If-None-Match': '"v1"'})
+        self.assertEqual(cache.stats.expirations, 0)
+
+
+class TestCachingClient(unittest.TestCase):
+    def test_get_is_cached(self):
+        with StubServer() as server:
+            client = PooledHTTPClient(server.url, cache=ResponseCache())
+            first = client.get('detail/', {'pk': 1})
+            second = client.get('detail/', {'pk': 1})
+            self.assertEqual(first, second)
+            # the parsed responses are never shared
+            self.assertIsNot(first, second)
+            client.get('detail/', {'pk': 2})
+            self.assertEqual(server.httpd.requests,
+                             ['/detail/?pk=1', '/detail/?pk=2'])
+            self.assertEqual(client.cache.stats.hits, 1)
+            self.assertEqual(client.cache.stats.misses, 2)
+
+    def test_truncated_body_is_not_cached(self):
+        with StubServer() as server:
+            for path in ('cut/1/', 'cut/1/gzip'):
+                client = PooledHTTPClient(server.url, cache=ResponseCache())
+                self.assertRaises(IncompleteRead, client.get, path)
+                self.assertEqual(client.get(path)['path'], '/' + path)
+                self.assertEqual(server.httpd.requests.count('/' + path), 2)
+                self.assertEqual(client.cache.stats.hits, 0)
+                client.close()
+
+    def test_user_endpoints_are_not_cached(self):
+        with StubServer() as server:
+            client = PooledHTTPClient(server.url, cache=ResponseCache())
+            client.get('/myqueue/get-items/?')
+            client.get('/myqueue/get-items/?')
+            self.assertEqual(len(server.httpd.requests), 2)
+
+    def test_cache_is_per_user(self):
+        with StubServer() as server:
+            client = PooledHTTPClient(server.url, cache=ResponseCache())
+            client.get('detail/')
+            client.add_headers({'Authorization': 'Token foo'})
+            client.get('detail/')
+            client.get('detail/')
+            self.assertEqual(len(server.httpd.requests), 2)
+
+    def test_stale_entries_are_revalidated(self):
+        with StubServer() as server:
+            server.httpd.payload = b'<payload/>'
+            client = PooledHTTPClient(server.url, cache=ResponseCache(ttl=0))
+            first = client.get('etag')
+            second = client.get('etag')
+            self.assertEqual(first, second)
+            self.assertEqual(len(server.httpd.requests), 2)
+            self.assertEqual(client.cache.stats.revalidations, 1)
+            # the 304 had no body, only the first response was read
+            self.assertEqual(client.transfer_stats.responses, 1)
+
+    def test_disk_cache_is_shared(self):
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, 'cache.db')
+        try:
+            with StubServer() as server:
+                for _ in range(2):
+                    cache = ResponseCache(store=SQLiteStore(path))
+                    client = PooledHTTPClient(server.url, cache=cache)
+                    client.get('detail/')
+                    client.close()
+                self.assertEqual(server.httpd.requests, ['/detail/'])
+        finally:
+            shutil.rmtree(tmp)
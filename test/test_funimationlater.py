@@ -3,9 +3,12 @@
 Tests for `funimationlater` module.
 """
 import os
+import threading
 import unittest
 import mock
+from concurrent.futures import ProcessPoolExecutor
 import funimationlater
+from .stubserver import StubServer, ApiHandler
 
 
 class TestFunimationLater(unittest.TestCase):
@@ -61,9 +64,210 @@ class TestFunimationLater(unittest.TestCase):
             self.assertIsInstance(shows, list)
             self.assertIsInstance(shows[0], funimationlater.Show)
 
+    def test_iter_all_shows(self):
+        with mock.patch('funimationlater.httpclient.urlopen',
+                        return_value=open(
+                            os.path.normpath(
+                                './test/resources/all_shows.xml'))):
+            api = funimationlater.FunimationLater()
+            shows = api.iter_all_shows()
+            self.assertNotIsInstance(shows, list)
+            first = next(shows)
+            self.assertEqual(first.title, 'Heavy Object')
+            self.assertEqual(len(list(shows)), 19)
+
     def test_get_show_raises_error(self):
         with mock.patch('funimationlater.funimationlater.HTTPClient.get',
                         side_effect=funimationlater.DetailedHTTPError(
                             '', 404, 'NOT FOUND', {}, mock.Mock())):
             api = funimationlater.FunimationLater()
             self.assertRaises(funimationlater.UnknownShow, api.get_show, 1)
+
+    def test_get_show_raises_server_errors(self):
+        with mock.patch('funimationlater.funimationlater.HTTPClient.get',
+                        side_effect=funimationlater.DetailedHTTPError(
+                            '', 503, 'UNAVAILABLE', {}, mock.Mock())):
+            api = funimationlater.FunimationLater()
+            self.assertRaises(funimationlater.DetailedHTTPError,
+                              api.get_show, 1)
+
+
+class TestIterShows(unittest.TestCase):
+    def setUp(self):
+        self.api = funimationlater.FunimationLater()
+        self.offsets = []
+        self.requested = threading.Condition()
+        self.total = 7
+
+    def fake_get_shows(self, show_type, limit, offset, **kwargs):
+        with self.requested:
+            self.offsets.append(offset)
+            self.requested.notify_all()
+        return list(range(offset, min(offset + limit, self.total))) or None
+
+    def test_iter_shows(self):
+        with mock.patch.object(self.api, 'get_shows',
+                               side_effect=self.fake_get_shows):
+            shows = list(self.api.iter_shows(page_size=3, prefetch=2))
+        self.assertEqual(shows, list(range(7)))
+        self.assertEqual(sorted(self.offsets)[:3], [0, 3, 6])
+
+    def test_iter_shows_without_prefetch(self):
+        with mock.patch.object(self.api, 'get_shows',
+                               side_effect=self.fake_get_shows):
+            shows = list(self.api.iter_shows(page_size=3, prefetch=0))
+        self.assertEqual(shows, list(range(7)))
+        self.assertEqual(self.offsets, [0, 3, 6])
+
+    def test_iter_shows_empty_last_page(self):
+        self.total = 6
+        with mock.patch.object(self.api, 'get_shows',
+                               side_effect=self.fake_get_shows):
+            self.assertEqual(list(self.api.iter_shows(page_size=3)),
+                             list(range(6)))
+
+    def test_next_page_is_prefetched(self):
+        self.total = 100
+        with mock.patch.object(self.api, 'get_shows',
+                               side_effect=self.fake_get_shows):
+            shows = self.api.iter_shows(page_size=10, prefetch=1)
+            self.assertEqual(next(shows), 0)
+            # the caller is still on page 0 but page 1 was requested
+            with self.requested:
+                for _ in range(50):
+                    if 10 in self.offsets:
+                        break
+                    self.requested.wait(0.1)
+            self.assertIn(10, self.offsets)
+            shows.close()
+
+    def test_iter_uses_default_limit(self):
+        with mock.patch.object(self.api, 'get_shows',
+                               side_effect=self.fake_get_shows):
+            self.assertEqual(list(self.api), list(range(7)))
+
+
+class TestBulkFetch(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        client = funimationlater.PooledHTTPClient(self.server.url + '/xml')
+        self.api = funimationlater.FunimationLater(http_client=client)
+
+    def tearDown(self):
+        self.api.client.close()
+        self.server.__exit__()
+
+    def test_get_shows_many_in_order(self):
+        results = list(self.api.get_shows_many([91448, 1, 91448],
+                                               max_workers=2))
+        self.assertEqual([r.key for r in results], [91448, 1, 91448])
+        self.assertIsInstance(results[0].result, funimationlater.ShowDetails)
+        self.assertIsNone(results[0].error)
+        self.assertIsNone(results[1].result)
+        self.assertIsInstance(results[1].error, funimationlater.UnknownShow)
+
+    def test_get_shows_many_as_completed(self):
+        results = list(self.api.get_shows_many(range(5), ordered=False))
+        self.assertEqual(sorted(r.key for r in results), list(range(5)))
+        self.assertTrue(all(r.error for r in results))
+
+    def test_get_episodes_many(self):
+        results = list(self.api.get_episodes_many(
+            [(91448, 110), (91448, 999, 'en')]))
+        self.assertEqual(results[0].key, (91448, 110))
+        self.assertEqual(results[0].result.video_id, 110)
+        self.assertIsInstance(results[1].error,
+                              funimationlater.UnknownEpisode)
+
+
+class TestShowDetailsCache(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        client = funimationlater.PooledHTTPClient(self.server.url + '/xml')
+        self.api = funimationlater.FunimationLater(http_client=client)
+        self.show = self.api.get_all_shows()[0]
+        del self.server.httpd.requests[:]
+
+    def tearDown(self):
+        self.api.client.close()
+        self.server.__exit__()
+
+    def paths(self):
+        return [r.split('?')[0] for r in self.server.httpd.requests]
+
+    def test_iter_requests_details_once(self):
+        seasons = list(self.show)
+        self.assertEqual([s.title for s in seasons], ['Season 1', 'Season 2'])
+        self.assertEqual(self.paths(), ['/xml/detail/'] +
+                         ['/xml/longlist/content/page/'] * 2)
+
+    def test_getitem_is_cached(self):
+        first = self.show[1]
+        self.assertIs(self.show[1], first)
+        self.assertIs(self.show.get_details(), self.show.get_details())
+        self.assertEqual(len(self.server.httpd.requests), 2)
+
+    def test_refresh(self):
+        details = self.show.get_details()
+        self.show[1]
+        self.assertIsNot(self.show.refresh(), details)
+        self.show[1]
+        self.assertEqual(len(self.server.httpd.requests), 4)
+        details = self.show.get_details()
+        details.refresh()
+        details.get_season(1)
+        self.assertEqual(len(self.server.httpd.requests), 5)
+
+    def test_season_params_do_not_accumulate(self):
+        details = self.show.get_details()
+        params = details.pointer.params
+        details.get_season(1)
+        details.get_season(2)
+        self.assertEqual(details.pointer.params, params)
+        self.assertTrue(self.server.httpd.requests[-1].endswith(
+            'showid=91448&season=2'))
+        self.assertRaises(funimationlater.UnknownSeason, details.get_season, 9)
+
+    def test_get_seasons(self):
+        details = self.show.get_details()
+        details.get_season(1)
+        seasons = details.get_seasons()
+        self.assertEqual([s.title for s in seasons], ['Season 1', 'Season 2'])
+        self.assertIs(list(seasons)[0], details.get_season(1))
+        # only the missing season was requested
+        self.assertEqual(len(self.server.httpd.requests), 3)
+        self.assertEqual(len(details.get_seasons(parallel=False)), 2)
+        self.assertEqual(len(self.server.httpd.requests), 3)
+
+
+class TestParsePool(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        self.client = funimationlater.PooledHTTPClient(
+            self.server.url + '/xml')
+
+    def tearDown(self):
+        self.client.close()
+        self.server.__exit__()
+
+    def test_large_responses_are_parsed_in_pool(self):
+        pool = ProcessPoolExecutor(1)
+        try:
+            api = funimationlater.FunimationLater(http_client=self.client,
+                                                  parse_pool=pool)
+            api.parse_threshold = 1024
+            shows = api.get_all_shows()
+        finally:
+            pool.shutdown()
+        self.assertEqual(len(shows), 20)
+        self.assertTrue(all(show.client is self.client for show in shows))
+        self.assertEqual(shows[0].get_details().title, 'Heavy Object')
+
+    def test_small_responses_are_parsed_inline(self):
+        pool = mock.Mock()
+        api = funimationlater.FunimationLater(http_client=self.client,
+                                              parse_pool=pool)
+        shows = api.get_all_shows()
+        self.assertEqual(len(shows), 20)
+        self.assertFalse(pool.submit.called)
+        self.assertIs(shows[0].client, self.client)
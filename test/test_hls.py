@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.hls`.
+"""
+import sys
+import unittest
+try:
+    from http.client import IncompleteRead
+except ImportError:
+    from httplib import IncompleteRead
+
+import mock
+
+import funimationlater
+from funimationlater.hls import (PlaylistCache, fetch_playlists,
+                                 parse_attributes, parse_master_playlist)
+from .stubserver import StubServer, ApiHandler, read_resource
+
+if sys.version_info >= (3, 6):
+    import asyncio
+    from funimationlater.aio import AsyncFunimationLater, AsyncHTTPClient
+
+BASE = 'https://cdn.example.com/038C48/SV/480/HVOENG0001/master.m3u8'
+
+
+class TestParseMasterPlaylist(unittest.TestCase):
+    def setUp(self):
+        self.playlist = parse_master_playlist(read_resource('master.m3u8'),
+                                              BASE)
+
+    def test_attributes(self):
+        self.assertEqual(
+            parse_attributes('BANDWIDTH=1,CODECS="a,b",RESOLUTION=2x3'),
+            {'BANDWIDTH': '1', 'CODECS': 'a,b', 'RESOLUTION': '2x3'})
+
+    def test_variants(self):
+        self.assertEqual(len(self.playlist), 4)
+        variant = self.playlist.variants[1]
+        self.assertEqual(variant.uri, 'https://cdn.example.com/038C48/SV/480/'
+                                      'HVOENG0001/HVOENG0001-480-4000K_'
+                                      'Layer5.m3u8')
+        self.assertEqual(variant.bandwidth, 1200000)
+        self.assertEqual(variant.resolution, (854, 480))
+        self.assertEqual(variant.codecs, ('avc1.4d401e', 'mp4a.40.2'))
+        self.assertEqual(variant.quality, 5)
+
+    def test_variant_without_layer_or_resolution(self):
+        audio = self.playlist.variants[3]
+        self.assertEqual(audio.uri,
+                         'https://cdn.example.com/audio/'
+                         'HVOENG0001-audio.m3u8')
+        self.assertIsNone(audio.resolution)
+        self.assertIsNone(audio.quality)
+
+    def test_qualities(self):
+        self.assertEqual(self.playlist.qualities, [1, 5, 10])
+        self.assertEqual(self.playlist.best().quality, 10)
+
+    def test_stream_url(self):
+        # NOTE(Sinap): Layer1 must not match Layer10.
+        self.assertTrue(self.playlist.stream_url(1).endswith('_Layer1.m3u8'))
+        self.assertEqual(self.playlist.stream_url(7), BASE)
+        self.assertEqual(self.playlist.stream_url(), BASE)
+
+    def test_empty(self):
+        playlist = parse_master_playlist(b'#EXTM3U\n', BASE)
+        self.assertEqual(len(playlist), 0)
+        self.assertIsNone(playlist.best())
+        self.assertEqual(playlist.stream_url(5), BASE)
+
+
+class TestPlaylistCache(unittest.TestCase):
+    def test_expires(self):
+        cache = PlaylistCache(ttl=10)
+        playlist = parse_master_playlist(b'', BASE)
+        with mock.patch('funimationlater.hls.time.time', return_value=100):
+            cache.set(BASE, playlist)
+            self.assertIs(cache.get(BASE), playlist)
+        with mock.patch('funimationlater.hls.time.time', return_value=111):
+            self.assertIsNone(cache.get(BASE))
+        self.assertEqual(len(cache), 0)
+
+    def test_truncated_playlist_is_not_cached(self):
+        cache = PlaylistCache()
+        with StubServer() as server:
+            client = funimationlater.PooledHTTPClient(server.url)
+            url = server.url + '/cut/1/'
+            self.assertRaises(IncompleteRead, fetch_playlists, client, [url],
+                              cache)
+            self.assertEqual(len(cache), 0)
+            playlist = fetch_playlists(client, [url], cache)[0]
+            self.assertIs(cache.get(url), playlist)
+            client.close()
+
+
+class TestEpisodeStreams(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        client = funimationlater.PooledHTTPClient(self.server.url + '/xml')
+        self.api = funimationlater.FunimationLater(http_client=client)
+        self.episode = self.episode_with_playlist(1)
+        self.cache = funimationlater.EpisodeDetails.playlist_cache
+        self.cache.clear()
+        del self.server.httpd.requests[:]
+
+    def tearDown(self):
+        self.cache.clear()
+        self.api.client.close()
+        self.server.__exit__()
+
+    def episode_with_playlist(self, n):
+        episode = self.api.get_episode(91448, 110)
+        episode.video_url = '{}/hls/{}/master.m3u8'.format(self.server.url, n)
+        return episode
+
+    def playlist_requests(self):
+        return [r for r in self.server.httpd.requests
+                if r.startswith('/hls/')]
+
+    def test_qualities_share_one_request(self):
+        url = self.episode.video_url
+        self.assertEqual(self.episode.get_stream(), url)
+        self.assertEqual(self.episode.get_stream(5),
+                         url.replace('master.m3u8',
+                                     'HVOENG0001-480-4000K_Layer5.m3u8'))
+        self.assertTrue(self.episode.get_stream(10).endswith('Layer10.m3u8'))
+        self.assertEqual(self.episode.get_stream(7), url)
+        self.assertEqual(len(self.episode.get_variants()), 4)
+        self.assertEqual(self.playlist_requests(), ['/hls/1/master.m3u8'])
+
+    def test_handler_is_not_swapped(self):
+        handler = self.api.client.handle_response
+        with mock.patch.object(self.api.client, 'get',
+                               wraps=self.api.client.get) as get:
+            self.episode.get_stream(5)
+        self.assertIs(self.api.client.handle_response, handler)
+        self.assertIsNotNone(get.call_args[1]['handler'])
+
+    def test_without_cache(self):
+        with mock.patch.object(funimationlater.EpisodeDetails,
+                               'playlist_cache', None):
+            self.episode.get_stream(5)
+            self.episode.get_stream(5)
+        self.assertEqual(len(self.playlist_requests()), 2)
+
+    def test_get_playlists_many(self):
+        episodes = [self.episode, self.episode_with_playlist(2),
+                    self.episode_with_playlist(1)]
+        del self.server.httpd.requests[:]
+        playlists = self.api.get_playlists_many(episodes, max_workers=2)
+        self.assertEqual([p.url for p in playlists],
+                         [e.video_url for e in episodes])
+        self.assertIs(playlists[0], playlists[2])
+        self.assertEqual(sorted(self.playlist_requests()),
+                         ['/hls/1/master.m3u8', '/hls/2/master.m3u8'])
+        self.assertIs(self.episode.get_playlist(), playlists[0])
+        self.assertEqual(len(self.playlist_requests()), 2)
+
+
+@unittest.skipIf(sys.version_info < (3, 6), 'requires Python 3.6')
+class TestAsyncEpisodeStreams(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        self.loop = asyncio.new_event_loop()
+        self.api = AsyncFunimationLater(
+            AsyncHTTPClient(self.server.url + '/xml'))
+        funimationlater.EpisodeDetails.playlist_cache.clear()
+
+    def tearDown(self):
+        funimationlater.EpisodeDetails.playlist_cache.clear()
+        self.api.client.close()
+        self.loop.close()
+        self.server.__exit__()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_get_stream(self):
+        episode = self.run_async(self.api.get_episode(91448, 110))
+        episode.video_url = self.server.url + '/hls/1/master.m3u8'
+        self.assertEqual(self.run_async(episode.get_stream()),
+                         episode.video_url)
+        self.assertTrue(
+            self.run_async(episode.get_stream(5)).endswith('Layer5.m3u8'))
+        playlists = self.run_async(self.api.get_playlists_many([episode]))
+        self.assertEqual(playlists[0].qualities, [1, 5, 10])
+        self.assertEqual(len([r for r in self.server.httpd.requests
+                              if r.startswith('/hls/')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
+import gzip
+import io
+import threading
 import unittest
+import zlib
 try:
+    from http.client import IncompleteRead
     from urllib.parse import urlencode
     from urllib.request import Request
 except ImportError:
+    from httplib import IncompleteRead
     from urllib import urlencode
     from urllib2 import Request
 from io import StringIO
@@ -11,7 +17,12 @@ from io import StringIO
 import mock
 
 import funimationlater.httpclient as http
-from funimationlater.response_handler import NullHandler
+from funimationlater.cache import ResponseCache
+from funimationlater.encoding import ContentDecoder
+from funimationlater.error import UnsupportedEncoding
+from funimationlater.response_handler import (NullHandler,
+                                              StreamingXMLResponse)
+from .stubserver import StubServer
 
 
 def extract_dict1_from_dict2(dict1, dict2):
@@ -96,3 +107,224 @@ class TestHTTPClient(unittest.TestCase):
             self.assertIsInstance(request, Request)
             self.assertIsInstance(actual, dict)
             self.assertEqual(actual, expected)
+
+    def test_gzip_response_is_decoded(self):
+        with StubServer() as server:
+            client = http.HTTPClient(server.url)
+            resp = client.get('/gzip')
+            self.assertEqual(len(resp['items']['item']), 1000)
+            stats = client.transfer_stats
+            self.assertEqual(stats.decoded_bytes, len(server.httpd.payload))
+            self.assertLess(stats.wire_bytes, stats.decoded_bytes)
+            self.assertLess(stats.ratio, 1)
+
+    def test_gzip_response_with_null_handler(self):
+        with StubServer() as server:
+            client = http.HTTPClient(server.url, NullHandler)
+            self.assertEqual(client.get('/gzip'), server.httpd.payload)
+
+    def test_per_request_handler(self):
+        with mock.patch('funimationlater.httpclient.urlopen') as opener:
+            opener.return_value = StringIO(u'<foo>bar</foo>')
+            client = http.HTTPClient(self.host)
+            self.assertEqual(client.get('/', handler=NullHandler),
+                             u'<foo>bar</foo>')
+            self.assertIsNot(client.handle_response, NullHandler)
+
+
+class TestStreamingXMLResponse(unittest.TestCase):
+    xml = (b'<items><item><id>1</id><item><id>nested</id></item></item>'
+           b'<item><id>2</id></item><other/><item><id>3</id></item></items>')
+
+    def test_yields_top_level_items(self):
+        # feed it a few bytes at a time like a slow connection
+        chunks = [self.xml[i:i + 7] for i in range(0, len(self.xml), 7)]
+        items = list(StreamingXMLResponse(iter(chunks), None).handle())
+        self.assertEqual([x['id'] for x in items], ['1', '2', '3'])
+        self.assertEqual(items[0]['item'], {'id': 'nested'})
+
+    def test_items_are_parsed_lazily(self):
+        split = self.xml.index(b'<item><id>2')
+        chunks = iter([self.xml[:split], self.xml[split:]])
+        items = StreamingXMLResponse(chunks, None).handle()
+        self.assertEqual(next(items)['id'], '1')
+        # only the first chunk was needed for the first item
+        self.assertEqual(list(chunks), [self.xml[split:]])
+
+    def test_empty_body(self):
+        self.assertEqual(list(StreamingXMLResponse(b'', None).handle()), [])
+
+
+class TestContentDecoder(unittest.TestCase):
+    payload = b'<foo>' + b'bar' * 100 + b'</foo>'
+
+    def _decode(self, encoding, data):
+        decoder = ContentDecoder(encoding)
+        # feed it one byte at a time to make sure decoding is incremental
+        out = [decoder.decompress(data[i:i + 1]) for i in range(len(data))]
+        return b''.join(out) + decoder.flush()
+
+    def test_zlib_deflate(self):
+        data = zlib.compress(self.payload)
+        self.assertEqual(self._decode('deflate', data), self.payload)
+
+    def test_raw_deflate(self):
+        obj = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = obj.compress(self.payload) + obj.flush()
+        self.assertEqual(self._decode('deflate', data), self.payload)
+
+    def test_unsupported_encoding(self):
+        self.assertRaises(UnsupportedEncoding, ContentDecoder, 'br')
+
+    def test_truncated_stream(self):
+        buf = io.BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb') as fp:
+            fp.write(self.payload)
+        data = buf.getvalue()
+        decoder = ContentDecoder('gzip')
+        decoder.decompress(data[:len(data) // 2])
+        self.assertRaises(IncompleteRead, decoder.flush)
+
+    def test_empty_body(self):
+        self.assertEqual(ContentDecoder('gzip').flush(), b'')
+
+
+class TestTruncatedBody(unittest.TestCase):
+    """The server promises a `Content-Length` but closes the connection
+    halfway through the body.
+    """
+
+    def setUp(self):
+        self.server = StubServer().__enter__()
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def clients(self, handler=None):
+        return [http.HTTPClient(self.server.url, handler),
+                http.PooledHTTPClient(self.server.url, handler)]
+
+    def test_gzip_body(self):
+        for client in self.clients(NullHandler):
+            self.assertRaises(IncompleteRead, client.get, 'cut/9/gzip')
+
+    def test_plain_body(self):
+        for client in self.clients():
+            self.assertRaises(IncompleteRead, client.get, 'cut/9/')
+        for client in self.clients(NullHandler):
+            self.assertRaises(IncompleteRead, client.get, 'cut/9/')
+
+    def test_pooled_client_recovers(self):
+        client = http.PooledHTTPClient(self.server.url)
+        self.assertRaises(IncompleteRead, client.get, 'cut/1/')
+        self.assertEqual(client.get('cut/1/')['path'], '/cut/1/')
+        client.close()
+
+
+class TestPooledHTTPClient(unittest.TestCase):
+    def test_connection_is_reused(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url)
+            for i in range(3):
+                resp = client.get('/foo', {'i': i})
+                self.assertEqual(resp['path'], '/foo?i={}'.format(i))
+            self.assertEqual(len(server.httpd.connections), 1)
+            client.close()
+
+    def test_stale_connection_is_replaced(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url)
+            client.get('/foo')
+            pool = client.pools.pool_for('http', '127.0.0.1',
+                                         server.httpd.server_port)
+            pool._idle[0][0].sock.close()
+            self.assertEqual(client.get('/bar')['path'], '/bar')
+            self.assertEqual(len(server.httpd.connections), 2)
+
+    def test_idle_timeout(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url, idle_timeout=0)
+            client.get('/foo')
+            client.get('/bar')
+            self.assertEqual(len(server.httpd.connections), 2)
+
+    def test_follows_redirects(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url)
+            self.assertEqual(client.get('/redirect')['path'], '/moved')
+
+    def test_error_raises_detailed_http_error(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url)
+            with self.assertRaises(http.DetailedHTTPError) as ctx:
+                client.get('/missing')
+            self.assertEqual(ctx.exception.code, 404)
+
+
+class TestConcurrentClient(unittest.TestCase):
+    """Many threads sharing one client, each with its own handler, while
+    another thread keeps adding headers.
+    """
+    threads = 16
+    requests = 25
+
+    def hammer(self, client, server):
+        start = threading.Event()
+        errors = []
+
+        def worker(n):
+            handler = NullHandler if n % 2 else None
+            start.wait()
+            try:
+                for i in range(self.requests):
+                    path = '/t{}/{}'.format(n, i)
+                    resp = client.get(path, handler=handler)
+                    if handler is NullHandler:
+                        expected = '<path>{}</path>'.format(path)
+                        if resp != expected.encode('utf-8'):
+                            errors.append((path, resp))
+                    elif resp['path'] != path:
+                        errors.append((path, resp))
+            except Exception as err:
+                errors.append(err)
+
+        def add_headers():
+            start.wait()
+            try:
+                for i in range(200):
+                    # NOTE(Sinap): the stub server takes at most 100 headers.
+                    client.add_headers({'X-Test-{}'.format(i % 50): str(i)})
+            except Exception as err:
+                errors.append(err)
+
+        workers = [threading.Thread(target=worker, args=(n,))
+                   for n in range(self.threads)]
+        workers.append(threading.Thread(target=add_headers))
+        for thread in workers:
+            thread.start()
+        start.set()
+        for thread in workers:
+            thread.join(60)
+        self.assertFalse(any(thread.is_alive() for thread in workers))
+        self.assertEqual(errors, [])
+        self.assertEqual(len(server.httpd.requests),
+                         self.threads * self.requests)
+        self.assertEqual(client.headers['X-Test-49'], '199')
+        self.assertEqual(len(client._previous_requests), 5)
+
+    def test_http_client(self):
+        with StubServer() as server:
+            self.hammer(http.HTTPClient(server.url), server)
+
+    def test_pooled_http_client(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url, pool_size=4)
+            self.hammer(client, server)
+            client.close()
+
+    def test_cached_client(self):
+        with StubServer() as server:
+            client = http.PooledHTTPClient(server.url,
+                                           cache=ResponseCache(ttl=60))
+            self.hammer(client, server)
+            client.close()
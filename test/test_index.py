@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.index`.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+import funimationlater
+from funimationlater.index import CatalogIndex, fold
+from .stubserver import StubServer, ApiHandler
+
+
+class TestCatalogIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = CatalogIndex()
+        self.index.add(1, u'Attack on Titan', 100)
+        self.index.add(2, u'Attack on Titan: Junior High', 200)
+        self.index.add(3, u'Pokémon: XY', 50)
+        self.index.add(4, u'Titan Attack', 150)
+
+    def titles(self, query, limit=10):
+        return [hit.title for hit in self.index.search(query, limit)]
+
+    def test_fold(self):
+        self.assertEqual(fold(u'Pokémon: XY'), u'pokemon xy')
+        self.assertEqual(fold(u'  PSYCHO-PASS 2 '), u'psycho pass 2')
+        self.assertEqual(fold(b'Ma\xc3\x9fe'), u'masse')
+
+    def test_prefix_search(self):
+        self.assertEqual(self.titles(u'attack on t'),
+                         [u'Attack on Titan', u'Attack on Titan: Junior High'])
+        self.assertEqual(self.titles(u'POKEMON'), [u'Pokémon: XY'])
+        self.assertEqual(self.titles(u'jun'),
+                         [u'Attack on Titan: Junior High'])
+
+    def test_ranking(self):
+        # titles starting with the query first, then shorter ones
+        self.assertEqual(self.titles(u'titan'), [
+            u'Titan Attack', u'Attack on Titan',
+            u'Attack on Titan: Junior High'])
+        self.assertEqual(self.titles(u'titan', limit=1), [u'Titan Attack'])
+
+    def test_fuzzy_fallback(self):
+        # ties are sorted by title
+        self.assertEqual(self.titles(u'atack'), [
+            u'Attack on Titan', u'Attack on Titan: Junior High',
+            u'Titan Attack'])
+        self.assertEqual(self.titles(u'kemo'), [u'Pokémon: XY'])
+        self.assertEqual(self.titles(u'zzz'), [])
+        self.assertEqual(self.titles(u''), [])
+
+    def test_long_words(self):
+        self.index.add(5, u'Supercalifragilisticexpialidocious')
+        self.assertEqual(
+            self.titles(u'supercalifragilisticexpialidocious'),
+            [u'Supercalifragilisticexpialidocious'])
+        self.assertEqual(self.titles(u'supercalifragilisticexpiala'), [])
+
+    def test_update_and_remove(self):
+        self.assertFalse(self.index.add(3, u'Pokémon: XY'))
+        self.assertTrue(self.index.add(3, u'Pokémon: Sun & Moon'))
+        self.assertEqual(self.titles(u'xy'), [])
+        self.assertEqual(self.titles(u'moon'), [u'Pokémon: Sun & Moon'])
+        self.index.remove(3)
+        self.index.remove(3)
+        self.assertEqual(self.titles(u'pokemon'), [])
+        self.assertNotIn(3, self.index)
+        self.assertEqual(len(self.index), 3)
+
+    def test_watermark(self):
+        self.assertEqual(self.index.watermark, 200)
+        self.index.add(5, u'Old', 10)
+        self.index.add(6, u'Unknown')
+        self.assertEqual(self.index.watermark, 200)
+
+    def test_save_and_load(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'index.json')
+            self.index.save(path)
+            loaded = CatalogIndex.load(path)
+        finally:
+            shutil.rmtree(tmp)
+        self.assertEqual(len(loaded), 4)
+        self.assertEqual(loaded.watermark, 200)
+        self.assertEqual(loaded.search(u'pokemon'),
+                         self.index.search(u'pokemon'))
+
+
+class TestSearchLocal(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(ApiHandler).__enter__()
+        client = funimationlater.PooledHTTPClient(self.server.url + '/xml')
+        self.api = funimationlater.FunimationLater(http_client=client)
+
+    def tearDown(self):
+        self.api.client.close()
+        self.server.__exit__()
+
+    def test_search_local_builds_the_index_once(self):
+        hits = self.api.search_local(u'psycho')
+        self.assertEqual([(hit.id, hit.title) for hit in hits],
+                         [(29962, u'PSYCHO-PASS')])
+        self.api.search_local(u'gundam')
+        self.assertEqual(len(self.server.httpd.requests), 1)
+        self.assertEqual(len(self.api.index), 20)
+        self.assertEqual(self.api.index.watermark, 1457731800)
+
+    def test_refresh_index(self):
+        self.api.build_index()
+        # pretend the newest show is new since the index was built
+        del self.api.catalog_sync.shows[91448]
+        self.api.index.remove(91448)
+        del self.server.httpd.requests[:]
+        # only the newest show is at the watermark, paging stops at the next
+        self.assertEqual(self.api.refresh_index(), 1)
+        self.assertIn(91448, self.api.index)
+        self.assertEqual(len(self.server.httpd.requests), 1)
+        self.assertIn('sort=start_timestamp', self.server.httpd.requests[0])
+        self.assertEqual(self.api.refresh_index(), 0)
+        self.assertEqual(self.api.catalog_sync.syncs, 2)
+
+    def test_refresh_index_page_size(self):
+        self.api.build_index()
+        del self.server.httpd.requests[:]
+        self.api.refresh_index(page_size=5)
+        self.assertIn('limit=5', self.server.httpd.requests[0])
+        # only that refresh uses it
+        self.assertEqual(self.api.catalog_sync.page_size, 20)
+
+    def test_refresh_loaded_index_builds_it_again(self):
+        self.api.index = CatalogIndex()
+        self.api.index.add(1, u'Gone')
+        self.assertEqual(self.api.refresh_index(), 20)
+        self.assertNotIn(1, self.api.index)
+        self.assertIsNotNone(self.api.catalog_sync)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.models`.
+"""
+import copy
+import os
+import pickle
+import unittest
+import xml.etree.ElementTree as Et
+
+import mock
+
+import funimationlater
+from funimationlater.models import (Media, Show, Season, Episode,
+                                    EpisodeContainer, SeasonContainer)
+from funimationlater.utils import etree_to_dict
+
+
+def load_item(name):
+    path = os.path.join(os.path.dirname(__file__), 'resources', name)
+    root = Et.parse(path).getroot()
+    return etree_to_dict(root.find('.//item'))['item']
+
+
+def episode(number):
+    return mock.Mock(episode_number=float(number))
+
+
+def season(title, number):
+    return mock.Mock(title=title, number=number)
+
+
+class TestEpisodeContainer(unittest.TestCase):
+    def setUp(self):
+        self.episodes = EpisodeContainer(
+            episode(n) for n in [3, 1, 2, 2.5, 12, 12.5, 13])
+
+    def test_getitem(self):
+        self.assertEqual(self.episodes[2].episode_number, 2)
+        self.assertEqual(self.episodes[12.5].episode_number, 12.5)
+        self.assertRaises(funimationlater.UnknownEpisode,
+                          self.episodes.__getitem__, 4)
+        self.assertRaises(funimationlater.UnknownEpisode,
+                          self.episodes.__getitem__, [1])
+
+    def test_slice(self):
+        numbers = [e.episode_number for e in self.episodes[1:13]]
+        self.assertEqual(numbers, [1, 2, 2.5, 3, 12, 12.5])
+        self.assertEqual(len(self.episodes[12:]), 3)
+        self.assertEqual(len(self.episodes[:2]), 1)
+        self.assertIsInstance(self.episodes[:], EpisodeContainer)
+        self.assertRaises(ValueError, self.episodes.__getitem__,
+                          slice(1, 10, 2))
+
+    def test_get_many(self):
+        numbers = [e.episode_number for e in self.episodes.get_many([13, 1])]
+        self.assertEqual(numbers, [13, 1])
+
+    def test_index_follows_mutations(self):
+        self.episodes.append(episode(14))
+        self.episodes.extend([episode(15)])
+        self.episodes += [episode(16)]
+        self.assertEqual(self.episodes[16].episode_number, 16)
+        self.assertEqual(len(self.episodes[13:]), 4)
+        self.episodes.remove(self.episodes[14])
+        del self.episodes[0]
+        self.assertRaises(funimationlater.UnknownEpisode,
+                          self.episodes.__getitem__, 14)
+        self.assertRaises(funimationlater.UnknownEpisode,
+                          self.episodes.__getitem__, 3)
+        self.episodes.clear()
+        self.assertEqual(len(self.episodes[:]), 0)
+
+    def test_copy_has_its_own_index(self):
+        episodes = copy.copy(self.episodes)
+        episodes.append(episode(14))
+        self.assertEqual(episodes[14].episode_number, 14)
+        self.assertRaises(funimationlater.UnknownEpisode,
+                          self.episodes.__getitem__, 14)
+
+    def test_first_duplicate_wins(self):
+        first, second = episode(1), episode(1)
+        self.assertIs(EpisodeContainer([first, second])[1], first)
+
+
+class TestSeasonContainer(unittest.TestCase):
+    def test_getitem(self):
+        seasons = SeasonContainer([season('Season 1', 1), season('OVA', None)])
+        self.assertIs(seasons[1], seasons['Season 1'])
+        self.assertEqual(seasons['OVA'].title, 'OVA')
+        self.assertIsNone(seasons[2])
+        self.assertIsNone(seasons[[]])
+
+
+class TestCompactModels(unittest.TestCase):
+    def test_raw_data_is_not_retained(self):
+        show = Show(load_item('all_shows.xml'), None)
+        self.assertIsNone(show._data)
+        self.assertFalse(hasattr(show, '__dict__'))
+        self.assertRaises(AttributeError, setattr, show, 'foo', 1)
+
+    def test_retain_data(self):
+        data = load_item('season.xml')
+        with mock.patch.object(Media, 'retain_data', True):
+            episode = Episode(data, None)
+        self.assertIs(episode._data, data)
+
+    def test_lazy_languages(self):
+        data = load_item('season.xml')
+        data['content']['metadata']['languages'] = 'English,Japanese'
+        self.assertEqual(Episode(data, None).languages,
+                         ['English', 'Japanese'])
+        data['content']['metadata']['languages'] = None
+        self.assertIsNone(Episode(data, None).languages)
+
+    def test_pickle(self):
+        show = Show(load_item('all_shows.xml'), mock.Mock())
+        copy = pickle.loads(pickle.dumps(show, pickle.HIGHEST_PROTOCOL))
+        self.assertIsNone(copy.client)
+        self.assertEqual(copy.title, show.title)
+        self.assertEqual(copy.pointer.params, show.pointer.params)
+        self.assertEqual(copy.thumbnail.url, show.thumbnail.url)
+        episode = Episode(load_item('season.xml'), None)
+        copy = pickle.loads(pickle.dumps(episode, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.languages, episode.languages)
+
+    def test_pickle_season(self):
+        season = Season({'item': [load_item('season.xml')]}, None,
+                        'Season 1', 1)
+        for protocol in (2, pickle.HIGHEST_PROTOCOL):
+            copy = pickle.loads(pickle.dumps(season, protocol))
+            self.assertEqual(copy.title, 'Season 1')
+            self.assertEqual(copy.number, 1)
+            number = list(season)[0].episode_number
+            self.assertEqual(copy[number].title, season[number].title)
+            self.assertIsInstance(copy._episodes, EpisodeContainer)
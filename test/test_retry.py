@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.retry`.
+"""
+import socket
+import sys
+import unittest
+try:
+    from http.client import HTTPException, IncompleteRead
+    from urllib.error import HTTPError, URLError
+except ImportError:
+    from httplib import HTTPException, IncompleteRead
+    from urllib2 import HTTPError, URLError
+
+import funimationlater
+from funimationlater.httpclient import HTTPClient, PooledHTTPClient
+from funimationlater.response_handler import StreamingXMLResponse
+from funimationlater.retry import RetryPolicy
+from .stubserver import StubServer
+
+if sys.version_info >= (3, 6):
+    import asyncio
+    from funimationlater.aio import AsyncHTTPClient
+
+
+def http_error(code, headers=None):
+    return HTTPError('http://foo', code, 'error', headers or {}, None)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_classify(self):
+        policy = RetryPolicy()
+        self.assertEqual(policy.classify(URLError(socket.timeout())),
+                         'connect')
+        self.assertEqual(policy.classify(socket.timeout()), 'read')
+        self.assertEqual(policy.classify(IncompleteRead(b'')), 'read')
+        self.assertEqual(policy.classify(http_error(502)), 'status')
+        self.assertEqual(policy.classify(status=503), 'status')
+        self.assertIsNone(policy.classify(http_error(404)))
+        self.assertIsNone(policy.classify(ValueError()))
+        self.assertEqual(policy.classify(
+            funimationlater.RequestTimeout('url', 'read', 1)), 'read')
+        self.assertIsNone(policy.classify(
+            funimationlater.RequestTimeout('url', 'deadline')))
+
+    def test_backoff_is_exponential_and_capped(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+        self.assertEqual([policy.backoff(n) for n in range(4)], [1, 2, 4, 5])
+        policy.jitter = True
+        for n in range(4):
+            self.assertTrue(0 <= policy.backoff(n) <= min(5, 2 ** n))
+
+    def test_limits(self):
+        policy = RetryPolicy(total=3, connect=1, jitter=False)
+        attempts = policy.attempts('GET')
+        self.assertIsNotNone(attempts.delay(URLError('refused')))
+        self.assertIsNone(attempts.delay(URLError('refused')))
+        self.assertIsNotNone(attempts.delay(socket.timeout()))
+        self.assertIsNotNone(attempts.delay(status=500))
+        self.assertIsNone(attempts.delay(status=500))
+        self.assertEqual(policy.stats.retries, 3)
+        self.assertEqual(policy.stats.connect_errors, 1)
+        self.assertEqual(policy.stats.read_errors, 1)
+        self.assertEqual(policy.stats.status_errors, 1)
+        self.assertEqual(policy.stats.giveups, 2)
+
+    def test_post_is_not_retried(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.attempts('POST').delay(http_error(503)))
+        policy = RetryPolicy(methods=['get', 'post'])
+        self.assertIsNotNone(policy.attempts('POST').delay(http_error(503)))
+
+    def test_retry_after(self):
+        policy = RetryPolicy(backoff_factor=0, jitter=False)
+        attempts = policy.attempts('GET')
+        self.assertEqual(
+            attempts.delay(http_error(503, {'Retry-After': '3'})), 3)
+
+    def test_deadline(self):
+        policy = RetryPolicy(backoff_factor=2, jitter=False, deadline=1)
+        self.assertIsNone(policy.attempts('GET').delay(http_error(503)))
+        self.assertEqual(policy.stats.giveups, 1)
+
+
+class TestRetryingClient(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().__enter__()
+        self.retry = RetryPolicy(backoff_factor=0.01)
+
+    def tearDown(self):
+        self.server.__exit__()
+
+    def test_status_is_retried(self):
+        client = HTTPClient(self.server.url, retry=self.retry)
+        resp = client.get('flaky/2/')
+        self.assertEqual(resp['path'], '/flaky/2/')
+        self.assertEqual(self.server.httpd.requests.count('/flaky/2/'), 3)
+        self.assertEqual(self.retry.stats.status_errors, 2)
+        self.assertGreater(self.retry.stats.retry_time, 0)
+
+    def test_gives_up(self):
+        client = HTTPClient(self.server.url, retry=self.retry)
+        with self.assertRaises(funimationlater.DetailedHTTPError) as ctx:
+            client.get('flaky/5/')
+        self.assertEqual(ctx.exception.code, 503)
+        self.assertEqual(self.server.httpd.requests.count('/flaky/5/'), 4)
+        self.assertEqual(self.retry.stats.giveups, 1)
+
+    def test_dropped_connection_is_retried(self):
+        client = PooledHTTPClient(self.server.url, retry=self.retry)
+        resp = client.get('drop/1/')
+        self.assertEqual(resp['path'], '/drop/1/')
+        self.assertEqual(self.retry.stats.read_errors, 1)
+        client.close()
+
+    def test_body_cut_off_is_retried(self):
+        for cls in (HTTPClient, PooledHTTPClient):
+            for path in ('cut/1/{}', 'cut/1/{}/gzip'):
+                path = path.format(cls.__name__)
+                retry = RetryPolicy(backoff_factor=0.01)
+                client = cls(self.server.url, retry=retry)
+                self.assertEqual(client.get(path)['path'], '/' + path)
+                self.assertEqual(retry.stats.read_errors, 1)
+
+    def test_lazy_handler_is_given_the_whole_body(self):
+        handler = type('Paths', (StreamingXMLResponse,), {'item_tag': 'path'})
+        client = PooledHTTPClient(self.server.url, retry=self.retry)
+        self.assertEqual(list(client.get('cut/1/', handler=handler)),
+                         ['/cut/1/'])
+        self.assertEqual(self.retry.stats.retries, 1)
+        client.close()
+
+    def test_post_is_not_retried(self):
+        client = PooledHTTPClient(self.server.url, retry=self.retry)
+        with self.assertRaises(funimationlater.DetailedHTTPError):
+            client.post('flaky/1/', {'foo': 'bar'})
+        self.assertEqual(self.server.httpd.requests.count('/flaky/1/'), 1)
+        client.close()
+
+    def test_post_on_reused_connection_is_sent_once(self):
+        client = PooledHTTPClient(self.server.url)
+        client.get('foo/')
+        with self.assertRaises((socket.error, HTTPException)):
+            client.post('drop/1/', {'foo': 'bar'})
+        self.assertEqual(self.server.httpd.requests.count('/drop/1/'), 1)
+        client.close()
+
+    def test_post_on_reused_connection_is_left_to_the_policy(self):
+        retry = RetryPolicy(backoff_factor=0.01, methods=['GET', 'POST'])
+        client = PooledHTTPClient(self.server.url, retry=retry)
+        client.get('foo/')
+        client.post('drop/1/', {'foo': 'bar'})
+        self.assertEqual(self.server.httpd.requests.count('/drop/1/'), 2)
+        self.assertEqual(retry.stats.read_errors, 1)
+        client.close()
+
+    @unittest.skipIf(sys.version_info < (3, 6), 'requires Python 3.6')
+    def test_async_post_on_reused_connection_is_sent_once(self):
+        loop = asyncio.new_event_loop()
+        client = AsyncHTTPClient(self.server.url)
+        try:
+            loop.run_until_complete(client.get('foo/'))
+            with self.assertRaises(OSError):
+                loop.run_until_complete(client.post('drop/1/', {'foo': 1}))
+        finally:
+            client.close()
+            loop.close()
+        self.assertEqual(self.server.httpd.requests.count('/drop/1/'), 1)
+
+    @unittest.skipIf(sys.version_info < (3, 6), 'requires Python 3.6')
+    def test_async_client(self):
+        loop = asyncio.new_event_loop()
+        client = AsyncHTTPClient(self.server.url, retry=self.retry)
+        try:
+            resp = loop.run_until_complete(client.get('drop/1/'))
+            self.assertEqual(resp['path'], '/drop/1/')
+            resp = loop.run_until_complete(client.get('flaky/1/'))
+            self.assertEqual(resp['path'], '/flaky/1/')
+        finally:
+            client.close()
+            loop.close()
+        self.assertEqual(self.retry.stats.retries, 2)
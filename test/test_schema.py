@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.schema`.
+"""
+import os
+import unittest
+import xml.etree.cElementTree as Et
+
+import mock
+
+from funimationlater.models import Show, Episode, EpisodeDetails
+from funimationlater.response_handler import (XMLResponse,
+                                              StreamingXMLResponse)
+from funimationlater.schema import Schema
+from funimationlater.utils import etree_to_dict
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def read_resource(name):
+    with open(os.path.join(RESOURCES, name), 'rb') as fp:
+        return fp.read()
+
+
+def state(obj):
+    """The slots of a model and the objects in them, for comparing models."""
+    if isinstance(obj, list):
+        return [state(x) for x in obj]
+    slots = [slot for cls in type(obj).__mro__
+             for slot in getattr(cls, '__slots__', ())
+             if slot not in ('client', '_data')]
+    if not slots:
+        return obj
+    return {slot: state(getattr(obj, slot, None)) for slot in slots}
+
+
+class TestSchema(unittest.TestCase):
+    def test_extract(self):
+        schema = Schema(['a/b', 'a/c/d', 'e', 'f/g'])
+        root = Et.fromstring(
+            '<root x="1"><a y="2"><b z="3">1</b><b/><c><d>2</d><h/></c></a>'
+            '<e><i>3</i></e><f>text</f><j/></root>')
+        self.assertEqual(schema.extract(root), {
+            'a': {'b': [{'@z': '3', '#text': '1'}, None],
+                  'c': {'d': '2'}},
+            'e': {'i': '3'},
+            'f': 'text'})
+
+    def test_leaves_match_etree_to_dict(self):
+        root = Et.fromstring('<root><a> 1 </a><b>  </b><c x="1"/><d/>'
+                             '<e x="2"> 3 </e></root>')
+        self.assertEqual(Schema(['a', 'b', 'c', 'd', 'e']).extract(root),
+                         etree_to_dict(root)['root'])
+
+    def test_shorter_path_wins(self):
+        root = Et.fromstring('<root><a><b>1</b><c>2</c></a></root>')
+        for paths in (['a/b', 'a'], ['a', 'a/b']):
+            self.assertEqual(Schema(paths).extract(root),
+                             {'a': {'b': '1', 'c': '2'}})
+
+    def test_handler(self):
+        schema = Schema(['title'])
+        handler = schema.handler(streaming=True)
+        self.assertIs(handler, schema.handler(streaming=True))
+        self.assertTrue(issubclass(handler, StreamingXMLResponse))
+        self.assertTrue(issubclass(schema.handler(), XMLResponse))
+        xml = b'<a><item><title>1</title><id>1</id></item></a>'
+        self.assertEqual(list(handler(xml, None).handle()), [{'title': '1'}])
+        self.assertEqual(schema.handler()(xml, None).handle(), {'a': {}})
+
+
+class TestModelSchemas(unittest.TestCase):
+    def assertSameModels(self, model, name, streaming):
+        xml = read_resource(name)
+        extracted = model.schema.handler(streaming)(xml, None).handle()
+        if streaming:
+            full = list(StreamingXMLResponse(xml, None).handle())
+            extracted = list(extracted)
+        else:
+            root = Et.fromstring(xml)
+            full = [etree_to_dict(root)[root.tag]]
+            extracted = [extracted[root.tag]]
+        self.assertEqual(len(full), len(extracted))
+        for a, b in zip(full, extracted):
+            self.assertEqual(state(model(a, None)), state(model(b, None)))
+
+    def test_show(self):
+        self.assertSameModels(Show, 'all_shows.xml', True)
+
+    def test_episode(self):
+        self.assertSameModels(Episode, 'season.xml', True)
+
+    def test_episode_details(self):
+        self.assertSameModels(EpisodeDetails, 'player.xml', False)
+
+    def test_retain_data_skips_the_schema(self):
+        with mock.patch.object(Show, 'retain_data', True, create=True):
+            self.assertIs(Show.response_handler(), XMLResponse)
+            self.assertIs(Show.response_handler(streaming=True),
+                          StreamingXMLResponse)
+            self.assertIsNot(Episode.response_handler(), XMLResponse)
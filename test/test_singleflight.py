@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.singleflight`.
+"""
+import threading
+import time
+import unittest
+try:
+    from http.client import IncompleteRead
+except ImportError:
+    from httplib import IncompleteRead
+
+from funimationlater.httpclient import PooledHTTPClient
+from funimationlater.singleflight import SingleFlight
+from .stubserver import StubServer
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def run_concurrently(self, flight, func, count=5):
+        results = [None] * count
+        release = threading.Event()
+
+        def leader_func():
+            release.wait(5)
+            return func()
+
+        def run(index):
+            try:
+                results[index] = flight.do('key', leader_func)
+            except Exception as err:
+                results[index] = err
+
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(count)]
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: flight.coalesced == count - 1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_calls_are_shared(self):
+        flight = SingleFlight()
+        calls = []
+        results = self.run_concurrently(flight, lambda: calls.append(1) or [])
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual((flight.calls, flight.coalesced), (1, 4))
+        self.assertEqual(len(flight), 0)
+
+    def test_errors_are_shared(self):
+        error = ValueError('boom')
+
+        def fail():
+            raise error
+
+        results = self.run_concurrently(SingleFlight(), fail)
+        self.assertTrue(all(result is error for result in results))
+
+    def test_nothing_is_cached(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+        self.assertEqual(flight.coalesced, 0)
+
+
+class TestCoalescingClient(unittest.TestCase):
+    def test_identical_gets_are_coalesced(self):
+        with StubServer() as server:
+            server.httpd.gate = threading.Event()
+            flight = SingleFlight()
+            client = PooledHTTPClient(server.url, single_flight=flight)
+            results = []
+            threads = [threading.Thread(
+                target=lambda: results.append(client.get('slow/', {'a': 1})))
+                for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            wait_for(lambda: flight.coalesced == 3)
+            server.httpd.gate.set()
+            for thread in threads:
+                thread.join(5)
+            client.close()
+        self.assertEqual(server.httpd.requests, ['/slow/?a=1'])
+        self.assertEqual(len(results), 4)
+        # every caller parsed its own copy
+        self.assertEqual(len(set(map(id, results))), 4)
+        self.assertEqual(results[0], results[3])
+
+    def test_truncated_body_is_not_shared(self):
+        with StubServer() as server:
+            server.httpd.gate = threading.Event()
+            flight = SingleFlight()
+            client = PooledHTTPClient(server.url, single_flight=flight)
+            errors = []
+
+            def get():
+                try:
+                    client.get('cut/1/')
+                except IncompleteRead as err:
+                    errors.append(err)
+            threads = [threading.Thread(target=get) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            wait_for(lambda: flight.coalesced == 2)
+            server.httpd.gate.set()
+            for thread in threads:
+                thread.join(5)
+            self.assertEqual(len(errors), 3)
+            self.assertEqual(client.get('cut/1/')['path'], '/cut/1/')
+            client.close()
+        self.assertEqual(server.httpd.requests, ['/cut/1/', '/cut/1/'])
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.snapshot`.
+"""
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from funimationlater.models import Episode, Season, Show, parse_items
+from .stubserver import read_resource
+
+if sys.version_info >= (3,):
+    from funimationlater.snapshot import Snapshot, SnapshotWriter
+
+
+def read_titles(path):
+    with Snapshot.open(path) as snapshot:
+        return [show.title for show in snapshot]
+
+
+@unittest.skipIf(sys.version_info < (3,), 'requires Python 3')
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'catalog.snap')
+        self.shows = parse_items(read_resource('all_shows.xml'), Show)
+        episodes = parse_items(read_resource('season.xml'), Episode)
+        self.season = Season({'item': []}, None, 'Season 1', 1)
+        self.season._episodes = episodes
+        writer = SnapshotWriter()
+        for show in self.shows:
+            writer.add(show, [self.season] if show.id == 91448 else [])
+        self.size = writer.write(self.path)
+        self.snapshot = Snapshot.open(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        shutil.rmtree(self.tmp)
+
+    def test_size(self):
+        self.assertEqual(os.path.getsize(self.path), self.size)
+
+    def test_shows(self):
+        self.assertEqual(len(self.snapshot), len(self.shows))
+        # sorted by ID
+        ids = [show.id for show in self.snapshot]
+        self.assertEqual(ids, sorted(s.id for s in self.shows))
+        for show in self.shows:
+            view = self.snapshot.show(show.id)
+            self.assertEqual(
+                (view.id, view.title, view.show_id, view.thumbnail,
+                 view.recent_item, view.added),
+                (show.id, show.title, show.show_id, show.thumbnail.url,
+                 show.recent_item, show.added))
+        self.assertEqual(self.snapshot[-1].id, max(ids))
+
+    def test_missing_show(self):
+        self.assertNotIn(1, self.snapshot)
+        self.assertIn(91448, self.snapshot)
+        with self.assertRaises(KeyError):
+            self.snapshot.show(1)
+        with self.assertRaises(IndexError):
+            self.snapshot[len(self.shows)]
+
+    def test_seasons_and_episodes(self):
+        self.assertEqual(self.snapshot.show(94310).seasons, [])
+        seasons = self.snapshot.show(91448).seasons
+        self.assertEqual([(s.number, s.title) for s in seasons],
+                         [(1, 'Season 1')])
+        episodes = list(seasons[0])
+        self.assertEqual(len(seasons[0]), len(self.season._episodes))
+        for view, episode in zip(episodes, self.season):
+            self.assertEqual(
+                (view.title, view.episode_number, view.duration,
+                 view.languages, view.format, view.description, view.path,
+                 view.params),
+                (episode.title, episode.episode_number, episode.duration,
+                 episode.languages, episode.format, episode.description,
+                 episode.pointer.path, episode.original_params))
+
+    def test_strings_are_stored_once(self):
+        views = list(self.snapshot.show(91448).seasons[0])
+        indexes = self.snapshot._columns['episodes']['languages']
+        self.assertEqual(len(set(indexes)), 1)
+        self.assertEqual(views[0].languages, views[1].languages)
+
+    def test_shared_between_processes(self):
+        with ProcessPoolExecutor(2) as pool:
+            results = list(pool.map(read_titles, [self.path] * 2))
+        self.assertEqual(results[0], [show.title for show in self.snapshot])
+        self.assertEqual(results[0], results[1])
+
+    def test_close_releases_the_map(self):
+        snapshot = Snapshot.open(self.path)
+        ids = snapshot._columns['shows']['id']
+        self.assertEqual(snapshot.show(91448).seasons[0].title, 'Season 1')
+        snapshot.close()
+        snapshot.close()
+        self.assertRaises(ValueError, len, ids)
+
+    def test_not_a_snapshot(self):
+        with self.assertRaises(ValueError):
+            Snapshot(b'\0' * 64)
+
+    def test_corrupt_snapshot_closes_the_map(self):
+        with open(self.path, 'rb') as fp:
+            data = fp.read()
+        for corrupt in (b'NOSNAP' + data[6:], data[:self.size // 2],
+                        data[:-1], data[:10]):
+            with open(self.path, 'wb') as fp:
+                fp.write(corrupt)
+            with open(self.path, 'rb') as fp:
+                buf = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            with self.assertRaises(ValueError):
+                Snapshot(buf, buf.close)
+            self.assertTrue(buf.closed)
+            self.assertRaises(ValueError, Snapshot.open, self.path)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.sync`.
+"""
+import collections
+import unittest
+
+from funimationlater.constants import SortBy, SortOrder
+from funimationlater.index import CatalogIndex
+from funimationlater.sync import CatalogSync, ChangeSet
+
+FakeShow = collections.namedtuple('FakeShow',
+                                  ['id', 'title', 'recent_item', 'added'])
+
+
+class FakeApi(object):
+    """Serves `shows` like the longlist sorted by date."""
+
+    def __init__(self, shows):
+        self.shows = list(shows)
+        self.pages = []
+        self.full = 0
+
+    def get_shows(self, show_type, sort_by, sort_order, limit, offset):
+        assert (sort_by, sort_order) == (SortBy.DATE, SortOrder.DESC)
+        self.pages.append(offset)
+        shows = sorted(self.shows, key=lambda s: -s.added)
+        return shows[offset:offset + limit] or None
+
+    def iter_all_shows(self):
+        self.full += 1
+        return iter(sorted(self.shows, key=lambda s: s.title))
+
+    def touch(self, show_id, recent_item, added):
+        self.shows = [s._replace(recent_item=recent_item, added=added)
+                      if s.id == show_id else s for s in self.shows]
+
+
+def make_shows(count):
+    return [FakeShow(i, 'Show {}'.format(i), 'Episode 1', 1000 + i)
+            for i in range(count)]
+
+
+class TestCatalogSync(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeApi(make_shows(25))
+        self.sync = CatalogSync(self.api, page_size=5)
+
+    def test_first_sync_is_full(self):
+        changes = self.sync.sync()
+        self.assertTrue(changes.full)
+        self.assertEqual(len(changes.added), 25)
+        self.assertEqual(self.sync.watermark, 1024)
+        self.assertEqual(self.api.pages, [])
+
+    def test_incremental_sync(self):
+        self.sync.sync()
+        self.api.touch(3, 'Episode 2', 2000)
+        self.api.shows.append(FakeShow(99, 'New', 'Episode 1', 2001))
+        changes = self.sync.sync()
+        self.assertFalse(changes.full)
+        self.assertEqual([s.id for s in changes.added], [99])
+        self.assertEqual([s.id for s in changes.updated], [3])
+        self.assertEqual(changes.removed, [])
+        # the watermark show was on the first page
+        self.assertEqual(self.api.pages, [0])
+        self.assertEqual(self.api.full, 1)
+        self.assertEqual(self.sync.shows[3].recent_item, 'Episode 2')
+        self.assertEqual(self.sync.watermark, 2001)
+
+    def test_nothing_changed(self):
+        self.sync.sync()
+        changes = self.sync.sync()
+        self.assertEqual(len(changes), 0)
+        self.assertEqual((self.sync.syncs, self.sync.full_syncs), (1, 1))
+
+    def test_gap_falls_back_to_full_sync(self):
+        self.sync.sync()
+        # a show below the watermark changed, the snapshot can't be trusted
+        self.api.touch(23, 'Episode 9', 1023)
+        del self.api.shows[0]
+        changes = self.sync.sync()
+        self.assertTrue(changes.full)
+        self.assertEqual([s.id for s in changes.updated], [23])
+        self.assertEqual(changes.removed, [0])
+        self.assertNotIn(0, self.sync.shows)
+
+    def test_max_pages(self):
+        self.sync.sync()
+        for i in range(12):
+            self.api.shows.append(FakeShow(100 + i, 'New', 'Ep', 3000 + i))
+        self.sync.max_pages = 2
+        changes = self.sync.sync()
+        self.assertTrue(changes.full)
+        self.assertEqual(len(changes.added), 12)
+
+    def test_end_of_catalog_counts_as_full(self):
+        self.sync.sync()
+        self.sync.watermark = 0
+        changes = self.sync.sync()
+        self.assertTrue(changes.full)
+        self.assertEqual(self.api.full, 1)
+
+    def test_full_every(self):
+        self.sync.full_every = 1
+        self.sync.sync()
+        self.assertFalse(self.sync.sync().full)
+        self.assertTrue(self.sync.sync().full)
+
+    def test_snapshot(self):
+        sync = CatalogSync(self.api, shows=make_shows(25), page_size=5)
+        self.assertEqual(sync.watermark, 1024)
+        self.assertFalse(sync.sync().full)
+
+
+class TestChangeSet(unittest.TestCase):
+    def test_apply(self):
+        old, new = FakeShow(1, 'Old', None, 1), FakeShow(2, 'New', None, 2)
+        shows = {1: old, 3: FakeShow(3, 'Gone', None, 3)}
+        changes = ChangeSet(added=[new], updated=[old._replace(title='Up')],
+                            removed=[3])
+        self.assertEqual(len(changes), 3)
+        changes.apply(shows)
+        self.assertEqual(sorted(shows), [1, 2])
+        self.assertEqual(shows[1].title, 'Up')
+
+        index = CatalogIndex.from_shows([old])
+        index.apply(changes)
+        self.assertEqual([h.title for h in index.search('up')], ['Up'])
+        self.assertEqual(len(index), 2)
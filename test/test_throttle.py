@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.throttle`.
+"""
+import threading
+import time
+import unittest
+
+import funimationlater
+from funimationlater.httpclient import PooledHTTPClient
+from funimationlater.throttle import (TokenBucket, AdaptiveConcurrency,
+                                      Throttle, parse_retry_after)
+from .stubserver import StubServer
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('5'), 5)
+        self.assertEqual(parse_retry_after(' 1.5 '), 1.5)
+        self.assertEqual(parse_retry_after('Sat, 01 Jan 2000 00:00:10 GMT',
+                                           now=946684800), 10)
+        self.assertEqual(parse_retry_after('Sat, 01 Jan 2000 00:00:10 GMT'),
+                         0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_take(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertEqual(bucket.take(0), 0.5)
+        self.assertEqual(bucket.take(0.5), 0)
+        # never more than `capacity` tokens are saved up
+        self.assertEqual(bucket.take(100), 0)
+        self.assertEqual(bucket.take(100), 0)
+        self.assertGreater(bucket.take(100), 0)
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def test_limit_grows_on_success(self):
+        concurrency = AdaptiveConcurrency(initial=2, maximum=3)
+        concurrency.in_flight = 2
+        self.assertIsNone(concurrency.wait_time(0))
+        for now in range(10):
+            concurrency.in_flight += 1
+            concurrency.release(200, None, now)
+        self.assertEqual(concurrency.limit, 3)
+        self.assertEqual(concurrency.wait_time(10), 0)
+
+    def test_backs_off(self):
+        concurrency = AdaptiveConcurrency(initial=8, backoff=2, cooldown=1)
+        concurrency.in_flight = 3
+        self.assertTrue(concurrency.release(429, 5, 100))
+        self.assertTrue(concurrency.release(503, None, 100.5))
+        self.assertEqual(concurrency.limit, 4)
+        self.assertEqual(concurrency.wait_time(101), 4)
+        self.assertEqual(concurrency.wait_time(105), 0)
+        self.assertFalse(concurrency.release(500, None, 106))
+        self.assertEqual(concurrency.limit, 4)
+
+
+class TestThrottle(unittest.TestCase):
+    def test_acquire_waits_for_release(self):
+        throttle = Throttle(rate=None, concurrency=1)
+        throttle.acquire('host')
+        self.assertIsNone(throttle.try_acquire('host'))
+        self.assertEqual(throttle.try_acquire('other'), 0)
+        acquired = threading.Event()
+        thread = threading.Thread(
+            target=lambda: throttle.acquire('host') or acquired.set())
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        throttle.release('host', 200)
+        self.assertTrue(acquired.wait(5))
+        thread.join(5)
+        self.assertEqual(throttle.waits, 1)
+
+    def test_rate(self):
+        throttle = Throttle(rate=20, burst=1, concurrency=None)
+        start = time.time()
+        for _ in range(3):
+            throttle.acquire('host')
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+
+class TestThrottledClient(unittest.TestCase):
+    def test_retry_after_is_honored(self):
+        throttle = Throttle(rate=None)
+        with StubServer() as server:
+            client = PooledHTTPClient(server.url, throttle=throttle)
+            with self.assertRaises(funimationlater.DetailedHTTPError) as ctx:
+                client.get('busy/')
+            self.assertEqual(ctx.exception.code, 429)
+            start = time.time()
+            client.get('detail/')
+            self.assertGreaterEqual(time.time() - start, 0.15)
+            client.close()
+        self.assertEqual(throttle.backoffs, 1)
+        self.assertEqual(throttle.limit(server.url.split('//')[1]), 2)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `funimationlater.timeouts`.
+"""
+import socket
+import sys
+import threading
+import time
+import unittest
+try:
+    from urllib.error import URLError
+except ImportError:
+    from urllib2 import URLError
+
+import mock
+
+import funimationlater
+from funimationlater.httpclient import HTTPClient, PooledHTTPClient
+from funimationlater.response_handler import StreamingXMLResponse
+from funimationlater.retry import RetryPolicy
+from funimationlater.timeouts import (Timeout, deadline, current_deadline,
+                                      bind, as_request_timeout)
+from .stubserver import StubServer
+
+if sys.version_info >= (3, 6):
+    import asyncio
+    from funimationlater.aio import AsyncHTTPClient
+
+
+class TestTimeout(unittest.TestCase):
+    def test_coerce_and_merge(self):
+        self.assertEqual(Timeout.coerce(2), Timeout(2, 2))
+        self.assertEqual(Timeout.coerce(None), Timeout())
+        timeout = Timeout(1, 10)
+        self.assertIs(Timeout.coerce(timeout), timeout)
+        self.assertEqual(timeout.merge(None), timeout)
+        self.assertEqual(timeout.merge(Timeout(read=5)), Timeout(1, 5))
+        self.assertEqual(timeout.merge(3), Timeout(3, 3))
+
+    def test_capped(self):
+        self.assertEqual(Timeout(1, 10).capped(5), Timeout(1, 5))
+        self.assertEqual(Timeout().capped(5), Timeout(5, 5))
+
+    def test_as_request_timeout(self):
+        err = as_request_timeout(URLError(socket.timeout()), 'url',
+                                 Timeout(1, 2))
+        self.assertEqual((err.phase, err.timeout), ('connect', 1))
+        err = as_request_timeout(socket.timeout(), 'url', Timeout(1, 2))
+        self.assertEqual((err.phase, err.timeout), ('read', 2))
+        self.assertIsNone(as_request_timeout(URLError('refused'), 'url',
+                                             Timeout()))
+
+
+class TestDeadline(unittest.TestCase):
+    def test_nested_deadline_is_never_longer(self):
+        self.assertIsNone(current_deadline())
+        with deadline(1) as outer:
+            with deadline(10) as inner:
+                self.assertIs(inner, outer)
+            with deadline(0.5) as inner:
+                self.assertLess(inner.expires, outer.expires)
+                self.assertIs(current_deadline(), inner)
+            self.assertIs(current_deadline(), outer)
+        self.assertIsNone(current_deadline())
+
+    def test_bind(self):
+        seen = []
+
+        def run():
+            seen.append(current_deadline())
+        with deadline(1) as expected:
+            thread = threading.Thread(target=bind(run))
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [expected])
+
+
+class TestClientTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer().__enter__()
+        self.server.httpd.gate.clear()
+
+    def tearDown(self):
+        self.server.httpd.gate.set()
+        self.server.__exit__()
+
+    def assertTimesOut(self, func, phase='read'):
+        start = time.time()
+        with self.assertRaises(funimationlater.RequestTimeout) as ctx:
+            func()
+        self.assertEqual(ctx.exception.phase, phase)
+        self.assertLess(time.time() - start, 2)
+        return ctx.exception
+
+    def test_read_timeout(self):
+        for cls in (HTTPClient, PooledHTTPClient):
+            client = cls(self.server.url, timeout=0.1)
+            err = self.assertTimesOut(lambda: client.get('slow/'))
+            self.assertEqual(err.timeout, 0.1)
+            self.assertNotIsInstance(err, funimationlater.DetailedHTTPError)
+
+    def test_connect_timeout_is_only_used_to_connect(self):
+        threading.Timer(0.3, self.server.httpd.gate.set).start()
+        client = HTTPClient(self.server.url, timeout=Timeout(connect=0.1))
+        self.assertEqual(client.get('slow/')['path'], '/slow/')
+
+    def test_separate_connect_and_read_timeouts(self):
+        client = HTTPClient(self.server.url, timeout=Timeout(2, 0.1))
+        with mock.patch('socket.create_connection',
+                        wraps=socket.create_connection) as create:
+            err = self.assertTimesOut(lambda: client.get('slow/'))
+        self.assertEqual(create.call_args[0][1], 2)
+        self.assertEqual(err.timeout, 0.1)
+
+    def test_per_call_timeout(self):
+        client = PooledHTTPClient(self.server.url, timeout=30)
+        err = self.assertTimesOut(
+            lambda: client.get('slow/', timeout=Timeout(read=0.1)))
+        self.assertEqual(err.timeout, 0.1)
+
+    def test_deadline_limits_the_request(self):
+        client = PooledHTTPClient(self.server.url)
+        with deadline(0.2):
+            self.assertTimesOut(lambda: client.get('slow/'))
+            time.sleep(0.2)
+            self.assertTimesOut(lambda: client.get('detail/'), 'deadline')
+
+    def test_streamed_body_read_timeout(self):
+        for cls in (HTTPClient, PooledHTTPClient):
+            client = cls(self.server.url, timeout=0.3)
+            items = client.get('stall/', handler=StreamingXMLResponse)
+            err = self.assertTimesOut(lambda: list(items))
+            self.assertEqual(err.timeout, 0.3)
+
+    def test_deadline_limits_streamed_body(self):
+        client = PooledHTTPClient(self.server.url)
+        with deadline(0.15):
+            items = client.get('trickle/', handler=StreamingXMLResponse)
+            self.assertTimesOut(lambda: list(items), 'deadline')
+
+    def test_deadline_stops_retries(self):
+        retry = RetryPolicy(backoff_factor=1, jitter=False)
+        client = PooledHTTPClient(self.server.url, retry=retry)
+        with deadline(0.5):
+            with self.assertRaises(funimationlater.DetailedHTTPError):
+                client.get('flaky/5/')
+        self.assertEqual(retry.stats.retries, 0)
+        self.assertEqual(retry.stats.giveups, 1)
+
+    @unittest.skipIf(sys.version_info < (3, 6), 'requires Python 3.6')
+    def test_async_client(self):
+        loop = asyncio.new_event_loop()
+        client = AsyncHTTPClient(self.server.url, timeout=0.1)
+
+        async def run():
+            with deadline(5):
+                return await client.get('slow/')
+        try:
+            self.assertTimesOut(lambda: loop.run_until_complete(run()))
+        finally:
+            client.close()
+            loop.close()
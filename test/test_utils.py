@@ -1,11 +1,41 @@
 # -*- coding: utf-8 -*-
+import collections
+import os
 import unittest
 import mock
 import xml.etree.cElementTree as Et
 from io import StringIO
+from funimationlater._compat import iteritems
 from funimationlater.utils import (etree_to_dict, CaseInsensitiveDict,
                                    timethis, timeblock)
 
+RESOURCES = os.path.join(os.path.dirname(__file__), 'resources')
+
+
+def reference_etree_to_dict(t):
+    """The original recursive implementation, `etree_to_dict` must return
+    the same thing.
+    """
+    attrib = t.attrib
+    tag = t.tag
+    d = {tag: {} if attrib else None}
+    children = list(t)
+    if children:
+        dd = collections.defaultdict(list)
+        for dc in map(reference_etree_to_dict, children):
+            for k, v in iteritems(dc):
+                dd[k].append(v)
+        d = {tag: {k: v[0] if len(v) == 1 else v for k, v in iteritems(dd)}}
+    if attrib:
+        d[tag].update({'@' + k: v for k, v in iteritems(attrib)})
+    text = t.text.strip() if t.text else ''
+    if text:
+        if children or attrib:
+            d[tag]['#text'] = text
+        else:
+            d[tag] = text
+    return d
+
 
 class TestUtils(unittest.TestCase):
     def test_etree_to_dict(self):
@@ -18,6 +48,28 @@ class TestUtils(unittest.TestCase):
         actual = etree_to_dict(Et.fromstring(xml))
         self.assertDictEqual(actual, expected)
 
+    def test_etree_to_dict_matches_reference(self):
+        xml = """<root a="1">  text
+            <empty/><blank>   </blank><attr b="2"/><attr c="3">x</attr>
+            <dup>1</dup><dup/><dup><n>1</n><n>2</n><n>3</n></dup>
+            <nested><dup><x>1</x></dup><dup>2</dup></nested>
+            <mixed d="4"><e>5</e>tail</mixed></root>"""
+        root = Et.fromstring(xml)
+        self.assertEqual(etree_to_dict(root), reference_etree_to_dict(root))
+        for xml in ('<a/>', '<a>b</a>', '<a b="c"/>', '<a b="c">d</a>'):
+            root = Et.fromstring(xml)
+            self.assertEqual(etree_to_dict(root),
+                             reference_etree_to_dict(root))
+
+    def test_etree_to_dict_matches_reference_on_recorded_payloads(self):
+        for name in sorted(os.listdir(RESOURCES)):
+            if not name.endswith('.xml'):
+                continue
+            root = Et.parse(os.path.join(RESOURCES, name)).getroot()
+            for elem in root.iter():
+                self.assertEqual(etree_to_dict(elem),
+                                 reference_etree_to_dict(elem), name)
+
     def test_case_insensitive_dict_setitem(self):
         ci_dict = CaseInsensitiveDict()
         ci_dict['MixEdCase'] = 42
@@ -53,6 +105,33 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(ci_dict, copy)
         self.assertEqual(expected, copy)
 
+    def test_case_insensitive_dict_copy_is_independent(self):
+        ci_dict = CaseInsensitiveDict({'Foo': 1}, recursive=True)
+        copy = ci_dict.copy()
+        copy['BAR'] = 2
+        self.assertNotIn('bar', ci_dict)
+        self.assertTrue(copy.recursive)
+        self.assertEqual(list(copy), ['Foo', 'BAR'])
+
+    def test_case_insensitive_dict_keeps_key_case(self):
+        ci_dict = CaseInsensitiveDict({'Foo': 1})
+        ci_dict['FOO'] = 2
+        self.assertEqual(dict(ci_dict), {'FOO': 2})
+        self.assertEqual(list(ci_dict.lower_items()), [('foo', 2)])
+        self.assertNotEqual(ci_dict, {'foo': 1})
+        self.assertEqual(ci_dict, CaseInsensitiveDict({'fOO': 2}))
+
+    def test_case_insensitive_dict_recursive(self):
+        data = {'Player': {'Item': [{'Title': 'foo'}, 'bar', [{'A': 1}]]}}
+        ci_dict = CaseInsensitiveDict(data, recursive=True)
+        items = ci_dict['player']['item']
+        self.assertEqual(items[0]['TITLE'], 'foo')
+        self.assertEqual(items[1], 'bar')
+        self.assertEqual(items[2][0]['a'], 1)
+        self.assertIs(ci_dict['PLAYER'], ci_dict['player'])
+        self.assertRaises(KeyError, CaseInsensitiveDict(data)['player']
+                          .__getitem__, 'item')
+
     def test_timethis(self):
         with mock.patch('sys.stdout', new=StringIO()) as fake_out:
             seconds = 0.7